@@ -0,0 +1,116 @@
+"""
+Compare the columnar attendance archive with the CSV export: bytes on disk, write time and the
+time to read everything back as (class, roll, name, date, status) records - csv.reader plus
+unpivoting the students x dates matrix versus attendance_archive.load_archive.
+
+    python benchmarks/bench_archive.py [--classes 40] [--students 40] [--days 80] [--backend sqlite|mysql]
+
+Synthetic classes get random absences (about 10%) on every school day of the range. The SQLite
+run uses a scratch database file; the MySQL run uses the ATTENDANCE_DB_* environment variables
+and drops its bench_archive_* tables afterwards. Parquet is measured only when pyarrow is installed.
+"""
+import argparse
+import csv
+import gzip
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import Main_database as dbmod
+import attendance_archive
+from attendance_export import export_attendance
+
+def populate(db: dbmod.AttendanceDB, tmp: str, classes: int, students: int, days: int) -> list:
+    roster = os.path.join(tmp, "roster.csv")
+    with open(roster, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        for roll in range(1, students + 1):
+            writer.writerow([f"Student {roll:05d}", roll])
+    start = date(2024, 1, 1)
+    # enough calendar days to cover the requested school days
+    end = start + timedelta(days=days * 7 // 5 + 7)
+    school_days = db.school_days(start, end)[:days]
+    rng = random.Random(42)
+    names = [f"bench_archive_{i:03d}" for i in range(classes)]
+    for name in names:
+        db.create_table_for_class(name)
+        db.import_csv(roster, name)
+        absent = {d: rng.sample(range(1, students + 1), students // 10) for d in school_days}
+        db.mark_attendance_range(name, school_days[0], school_days[-1], absent)
+    return names
+
+def read_csv(path: str) -> int:
+    """Parse the matrix export back into (class, roll, name, date, status) record columns."""
+    opener = gzip.open if path.endswith(".gz") else open
+    columns = ([], [], [], [], [])
+    with opener(path, "rt", newline="", encoding="utf-8") as fh:
+        reader = csv.reader(fh)
+        days = next(reader)[3:]
+        for row in reader:
+            for day, status in zip(days, row[3:]):
+                if status:
+                    for column, value in zip(columns, (row[0], int(row[1]), row[2], day, status)):
+                        column.append(value)
+    return len(columns[0])
+
+def tree_size(root: str) -> int:
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(root) for f in files)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--classes", type=int, default=40)
+    parser.add_argument("--students", type=int, default=40)
+    parser.add_argument("--days", type=int, default=80)
+    parser.add_argument("--backend", choices=dbmod.AttendanceDB.BACKENDS, default="sqlite")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.backend == "sqlite":
+            db = dbmod.AttendanceDB.sqlite(os.path.join(tmp, "bench.sqlite3"))
+        else:
+            db = dbmod.AttendanceDB(
+                host=os.environ.get("ATTENDANCE_DB_HOST", "localhost"),
+                user=os.environ.get("ATTENDANCE_DB_USER", "root"),
+                password=os.environ.get("ATTENDANCE_DB_PASSWORD", ""),
+                database=os.environ.get("ATTENDANCE_DB_NAME", "attendance"),
+            )
+        names = populate(db, tmp, args.classes, args.students, args.days)
+        records = args.classes * args.students * args.days
+        print(f"{records:,} records ({args.classes} classes x {args.students} students x {args.days} days)")
+        print(f"{'format':<16} {'MB':>9} {'write s':>9} {'read s':>9}")
+        try:
+            for label, path in (("csv", "all.csv"), ("csv.gz", "all.csv.gz")):
+                path = os.path.join(tmp, path)
+                started = time.perf_counter()
+                export_attendance(db, path, names)
+                written = time.perf_counter() - started
+                started = time.perf_counter()
+                assert read_csv(path) == records
+                print(f"{label:<16} {os.path.getsize(path) / 1e6:>9.2f} {written:>9.2f} "
+                      f"{time.perf_counter() - started:>9.2f}")
+            formats = ["npz"] if attendance_archive.pa is None else ["parquet", "npz"]
+            for fmt in formats:
+                if fmt == "npz" and attendance_archive.np is None:
+                    continue
+                root = os.path.join(tmp, f"archive_{fmt}")
+                report = attendance_archive.archive_attendance(db, root, names, fmt=fmt)
+                started = time.perf_counter()
+                columns = attendance_archive.load_archive(root)
+                loaded = time.perf_counter() - started
+                assert len(columns["roll"]) == records
+                print(f"{fmt:<16} {tree_size(root) / 1e6:>9.2f} {report.elapsed:>9.2f} {loaded:>9.2f}")
+        finally:
+            if args.backend != "sqlite":
+                with db.session() as cur:
+                    for name in names:
+                        cur.execute(f"DROP TABLE IF EXISTS `{name}`;")
+            db.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
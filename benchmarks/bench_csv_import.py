@@ -0,0 +1,73 @@
+"""
+Compare AttendanceDB.import_csv(method="batched") with method="load_data" on synthetic rosters.
+
+    python benchmarks/bench_csv_import.py [--sizes 10000 100000 1000000] [--chunk-size 1000]
+                                          [--backend mysql|sqlite]
+
+The MySQL run needs a server with local_infile=ON; connection settings come from the same
+ATTENDANCE_DB_* environment variables as attendance_cli. --backend sqlite runs offline against
+a scratch database file (load_data then reports its batched fallback). Each run imports into
+a fresh scratch table which is dropped afterwards.
+"""
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import Main_database as dbmod
+
+def write_roster(path: str, rows: int) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(["Student_name", "Roll_no"])
+        for roll in range(1, rows + 1):
+            writer.writerow([f"Student {roll:07d}", roll])
+
+def run_once(db: dbmod.AttendanceDB, path: str, method: str, chunk_size: int) -> dbmod.ImportReport:
+    table = f"bench_import_{method}"
+    with db.session() as cur:
+        cur.execute(f"DROP TABLE IF EXISTS `{table}`;")
+    db.schema_cache.invalidate()
+    try:
+        return db.import_csv(path, table, chunk_size=chunk_size, method=method)
+    finally:
+        with db.session() as cur:
+            cur.execute(f"DROP TABLE IF EXISTS `{table}`;")
+        db.schema_cache.invalidate()
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--backend", choices=dbmod.AttendanceDB.BACKENDS, default="mysql")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.backend == "sqlite":
+            db = dbmod.AttendanceDB.sqlite(os.path.join(tmp, "bench.sqlite3"))
+        else:
+            db = dbmod.AttendanceDB(
+                host=os.environ.get("ATTENDANCE_DB_HOST", "localhost"),
+                user=os.environ.get("ATTENDANCE_DB_USER", "root"),
+                password=os.environ.get("ATTENDANCE_DB_PASSWORD", ""),
+                database=os.environ.get("ATTENDANCE_DB_NAME", "attendance"),
+                allow_local_infile=True,
+            )
+        print(f"{'rows':>10}  {'method':<46} {'seconds':>9} {'rows/s':>12}")
+        for size in args.sizes:
+            path = os.path.join(tmp, f"roster_{size}.csv")
+            write_roster(path, size)
+            for method in dbmod.AttendanceDB.IMPORT_METHODS:
+                started = time.perf_counter()
+                report = run_once(db, path, method, args.chunk_size)
+                seconds = time.perf_counter() - started
+                print(f"{size:>10,}  {report.method:<46} {seconds:>9.2f} {size / seconds:>12,.0f}")
+        db.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
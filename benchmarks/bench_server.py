@@ -0,0 +1,207 @@
+"""
+Load test for attendance_server: many simulated terminals, each on its own keep-alive connection,
+issuing a mix of roster, history and mark requests as fast as the server answers. Reports
+requests/s and p50/p99 latency per route plus the server's batching and cache counters.
+
+Password checks are deliberately slow, so each class logs in once up front (timed as "login")
+and its terminals share that session; the timed run is the steady-state traffic after login.
+
+    python benchmarks/bench_server.py [--clients 200] [--seconds 10] [--classes 20] [--students 40]
+                                      [--pool-size 8] [--backend sqlite|mysql] [--url http://host:port]
+
+Without --url a server is started as a subprocess on a free port against a scratch SQLite file
+(or, with --backend mysql, the ATTENDANCE_DB_* environment variables; the bench_server_* tables
+are dropped afterwards). With --url an already running server is used and its classes must be
+bench_server_000... with password "bench".
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+from urllib.parse import urlsplit
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC)
+
+import Main_database as dbmod
+
+PASSWORD = "bench"
+# route -> share of requests after login
+MIX = (("roster", 0.4), ("history", 0.3), ("mark", 0.25), ("mark-day", 0.05))
+
+def populate(db: dbmod.AttendanceDB, tmp: str, classes: int, students: int) -> list:
+    roster = os.path.join(tmp, "roster.csv")
+    with open(roster, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        for roll in range(1, students + 1):
+            writer.writerow([f"Student {roll:05d}", roll])
+    names = [f"bench_server_{i:03d}" for i in range(classes)]
+    for name in names:
+        db.create_table_for_class(name)
+        db.import_csv(roster, name)
+        db.set_class_password(name, PASSWORD)
+    return names
+
+class Client:
+    """One keep-alive HTTP/1.1 connection issuing JSON requests."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.token = None
+
+    async def open(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, method: str, path: str, body=None):
+        data = json.dumps(body).encode() if body is not None else b""
+        head = f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Length: {len(data)}\r\n"
+        if self.token:
+            head += f"Authorization: Bearer {self.token}\r\n"
+        self.writer.write(head.encode() + b"\r\n" + data)
+        await self.writer.drain()
+        status_line = await self.reader.readline()
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        payload = await self.reader.readexactly(length)
+        status = int(status_line.split()[1])
+        if status != 200:
+            raise RuntimeError(f"{method} {path}: {status} {payload[:200]!r}")
+        return json.loads(payload)
+
+    def close(self):
+        self.writer.close()
+
+async def login(host: str, port: int, class_name: str, latencies: dict) -> str:
+    client = Client(host, port)
+    await client.open()
+    try:
+        started = time.perf_counter()
+        token = (await client.request("POST", "/login", {"class": class_name, "password": PASSWORD}))["token"]
+        latencies["login"].append(time.perf_counter() - started)
+        return token
+    finally:
+        client.close()
+
+async def simulate(host: str, port: int, class_name: str, token: str, students: int, deadline: float,
+                   seed: int, latencies: dict) -> None:
+    rng = random.Random(seed)
+    client = Client(host, port)
+    client.token = token
+    await client.open()
+    try:
+        today = date.today().isoformat()
+        routes, weights = zip(*MIX)
+        while time.perf_counter() < deadline:
+            route = rng.choices(routes, weights)[0]
+            started = time.perf_counter()
+            if route == "roster":
+                await client.request("GET", f"/roster?class={class_name}")
+            elif route == "history":
+                await client.request("GET", f"/history?class={class_name}&date={today}")
+            elif route == "mark":
+                roll = rng.randint(1, students)
+                await client.request("POST", "/mark", {"class": class_name, "date": today,
+                                                       "statuses": {str(roll): rng.choice(("Present", "Absent"))}})
+            else:
+                absent = rng.sample(range(1, students + 1), max(1, students // 10))
+                await client.request("POST", "/mark", {"class": class_name, "date": today, "absent": absent})
+            latencies[route].append(time.perf_counter() - started)
+    finally:
+        client.close()
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))] if ordered else 0.0
+
+async def run_load(host: str, port: int, names: list, args) -> None:
+    latencies = {route: [] for route in ("login",) + tuple(r for r, _ in MIX)}
+    tokens = await asyncio.gather(*(login(host, port, name, latencies) for name in names))
+    deadline = time.perf_counter() + args.seconds
+    started = time.perf_counter()
+    await asyncio.gather(*(simulate(host, port, names[i % len(names)], tokens[i % len(names)], args.students,
+                                    deadline, i, latencies)
+                           for i in range(args.clients)))
+    elapsed = time.perf_counter() - started
+    everything = [v for route, values in latencies.items() if route != "login" for v in values]
+    print(f"{args.clients} clients, {len(names)} classes x {args.students} students, {elapsed:.1f}s")
+    print(f"{'route':<10} {'requests':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for route, values in latencies.items():
+        print(f"{route:<10} {len(values):>9} {percentile(values, 50) * 1000:>9.1f} {percentile(values, 99) * 1000:>9.1f}")
+    print(f"{'all':<10} {len(everything):>9} {percentile(everything, 50) * 1000:>9.1f} "
+          f"{percentile(everything, 99) * 1000:>9.1f}")
+    print(f"throughput: {len(everything) / elapsed:,.0f} requests/s")
+    client = Client(host, port)
+    await client.open()
+    stats = await client.request("GET", "/stats")
+    client.close()
+    print(f"marks: {stats['marks']['requests']} request(s) in {stats['marks']['batches']} transaction(s); "
+          f"roster cache hit ratio {stats['roster_cache']['hit_ratio']:.1%}; "
+          f"pool peak {stats['pool']['peak_in_use']}, avg wait {stats['pool']['avg_wait'] * 1000:.1f} ms")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--classes", type=int, default=20)
+    parser.add_argument("--students", type=int, default=40)
+    parser.add_argument("--pool-size", type=int, default=8)
+    parser.add_argument("--backend", choices=dbmod.AttendanceDB.BACKENDS, default="sqlite")
+    parser.add_argument("--url", default=None, help="use a running server instead of starting one")
+    args = parser.parse_args(argv)
+
+    if args.url:
+        url = urlsplit(args.url)
+        names = [f"bench_server_{i:03d}" for i in range(args.classes)]
+        asyncio.run(run_load(url.hostname, url.port, names, args))
+        return 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.backend == "sqlite":
+            database = os.path.join(tmp, "bench.sqlite3")
+            db = dbmod.AttendanceDB.sqlite(database)
+        else:
+            database = os.environ.get("ATTENDANCE_DB_NAME", "attendance")
+            db = dbmod.AttendanceDB(
+                host=os.environ.get("ATTENDANCE_DB_HOST", "localhost"),
+                user=os.environ.get("ATTENDANCE_DB_USER", "root"),
+                password=os.environ.get("ATTENDANCE_DB_PASSWORD", ""),
+                database=database,
+            )
+        names = populate(db, tmp, args.classes, args.students)
+        server = subprocess.Popen(
+            [sys.executable, os.path.join(SRC, "attendance_server.py"), "--backend", args.backend,
+             "--database", database, "--pool-size", str(args.pool_size), "--port", "0"],
+            stdout=subprocess.PIPE, text=True,
+        )
+        try:
+            line = server.stdout.readline()
+            if not line.startswith("listening on"):
+                raise RuntimeError(f"server did not start: {line!r}")
+            url = urlsplit(line.split()[-1])
+            asyncio.run(run_load(url.hostname, url.port, names, args))
+        finally:
+            server.terminate()
+            server.wait()
+            if args.backend != "sqlite":
+                with db.session() as cur:
+                    for name in names:
+                        cur.execute(f"DROP TABLE IF EXISTS `{name}`;")
+            db.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
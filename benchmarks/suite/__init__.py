@@ -0,0 +1,15 @@
+"""
+Reproducible benchmark suite for AttendanceDB and the headless paths behind DisplayWidget.
+
+    python -m benchmarks.suite [--classes 20] [--students 50] [--days 120] [--repeat 5]
+                               [--storage wide|long] [--json results.json]
+                               [--baseline benchmarks/suite/baseline.json] [--tolerance 0.25]
+                               [--write-baseline] [--only CASE ...]
+
+A School (see school.py) generated from --seed is loaded into a scratch SQLite database, then every
+case in cases.py is timed --repeat times. Results (median and best time per case) are printed,
+written as JSON with --json, and compared with the baseline: a case whose median is more than
+--tolerance slower than the baseline's (and at least MIN_DELTA slower) is a regression and the exit
+status is 1. --write-baseline stores this run as the new baseline instead. Runs are only compared
+with a baseline taken with the same school size, storage layout and repeat count.
+"""
@@ -0,0 +1,139 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "src"))
+
+from . import __doc__ as SUITE_DOC
+from .cases import CASES, Bench
+from .school import School
+
+import Main_database as dbmod
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+# a case is only a regression if it is also this much slower in absolute terms (timer noise)
+MIN_DELTA = 0.0005
+# run settings that must match for two runs to be comparable
+COMPARABLE = ("backend", "storage", "classes", "students", "days", "seed", "repeat")
+
+def run_suite(args) -> dict:
+    only = set(args.only or ())
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        db = dbmod.AttendanceDB.sqlite(os.path.join(tmp, "bench.sqlite3"), storage=args.storage)
+        school = School(args.classes, args.students, args.days, seed=args.seed)
+        bench = Bench(db, school, tmp)
+        started = time.perf_counter()
+        school.populate(db, bench.roster_path)
+        print(f"school: {args.classes} classes x {args.students} students x {args.days} days "
+              f"({args.storage}) loaded in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+        try:
+            for name, make in CASES:
+                if only and name not in only:
+                    continue
+                times = []
+                for _ in range(args.repeat):
+                    run, ops = make(bench)
+                    started = time.perf_counter()
+                    run()
+                    times.append(time.perf_counter() - started)
+                    bench.drop_fresh()
+                results[name] = {
+                    "median": statistics.median(times),
+                    "best": min(times),
+                    "ops": ops,
+                    "per_op_ms": statistics.median(times) / ops * 1000.0,
+                }
+        finally:
+            db.close()
+    return {
+        "meta": {
+            "backend": "sqlite",
+            "storage": args.storage,
+            "classes": args.classes,
+            "students": args.students,
+            "days": args.days,
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "created": datetime.now().isoformat(timespec="seconds"),
+        },
+        "results": results,
+    }
+
+def compare(run: dict, baseline: dict, tolerance: float, out=sys.stdout) -> list:
+    """Print run against baseline; return the names of the cases that regressed."""
+    mismatched = [k for k in COMPARABLE if run["meta"].get(k) != baseline["meta"].get(k)]
+    if mismatched:
+        print(f"baseline not comparable (different {', '.join(mismatched)}); not checking for regressions", file=out)
+        return []
+    regressions = []
+    print(f"{'case':<24}{'baseline ms':>13}{'now ms':>10}{'change':>9}", file=out)
+    for name, now in run["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"{name:<24}{'-':>13}{now['median'] * 1000:>10.1f}{'new':>9}", file=out)
+            continue
+        change = now["median"] / before["median"] - 1 if before["median"] else 0.0
+        slower = change > tolerance and now["median"] - before["median"] > MIN_DELTA
+        if slower:
+            regressions.append(name)
+        print(f"{name:<24}{before['median'] * 1000:>13.1f}{now['median'] * 1000:>10.1f}{change:>+9.0%}"
+              + ("  REGRESSION" if slower else ""), file=out)
+    return regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite", description=SUITE_DOC.strip().splitlines()[0])
+    parser.add_argument("--classes", type=int, default=20)
+    parser.add_argument("--students", type=int, default=50)
+    parser.add_argument("--days", type=int, default=120)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--storage", choices=["wide", "long"], default="wide")
+    parser.add_argument("--only", nargs="+", choices=[name for name, _ in CASES], help="run just these cases")
+    parser.add_argument("--json", default=None, help="write the results to this file ('-' for stdout)")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before a case fails")
+    parser.add_argument("--write-baseline", action="store_true", help="store this run as the baseline")
+    args = parser.parse_args(argv)
+
+    run = run_suite(args)
+    # with --json - stdout carries only the JSON
+    out = sys.stderr if args.json == "-" else sys.stdout
+    print(f"{'case':<24}{'ops':>5}{'median ms':>11}{'best ms':>9}{'ms/op':>9}", file=out)
+    for name, r in run["results"].items():
+        print(f"{name:<24}{r['ops']:>5}{r['median'] * 1000:>11.1f}{r['best'] * 1000:>9.1f}{r['per_op_ms']:>9.2f}",
+              file=out)
+    if args.json == "-":
+        json.dump(run, sys.stdout, indent=2)
+        print()
+    elif args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(run, fh, indent=2)
+
+    if args.write_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as fh:
+            json.dump(run, fh, indent=2)
+            fh.write("\n")
+        print(f"baseline written to {args.baseline}", file=out)
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}; run with --write-baseline to create one", file=out)
+        return 0
+    with open(args.baseline, encoding="utf-8") as fh:
+        baseline = json.load(fh)
+    regressions = compare(run, baseline, args.tolerance, out)
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {args.tolerance:.0%}: {', '.join(regressions)}", file=out)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
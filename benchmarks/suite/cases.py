@@ -0,0 +1,128 @@
+import os
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+import Main_database as dbmod
+from attendance_grid import AttendanceGrid
+
+from .school import School
+
+class Bench:
+    """What a case gets: the populated database, its School and a scratch directory."""
+
+    def __init__(self, db: dbmod.AttendanceDB, school: School, tmp: str):
+        self.db = db
+        self.school = school
+        self.tmp = tmp
+        self.roster_path = os.path.join(tmp, "roster.csv")
+        self._fresh = 0
+        self._created: List[str] = []
+
+    def fresh_class(self) -> str:
+        """Name for a class table that does not exist yet."""
+        self._fresh += 1
+        name = f"bench_fresh_{self._fresh:04d}"
+        self._created.append(name)
+        return name
+
+    def drop_fresh(self) -> None:
+        """Drop the tables handed out by fresh_class(), so later cases see only the school."""
+        if not self._created:
+            return
+        with self.db.session() as cur:
+            for name in self._created:
+                cur.execute(f"DROP TABLE IF EXISTS `{name}`;")
+        self._created.clear()
+        self.db.schema_cache.invalidate()
+
+    def history_day(self, i: int) -> datetime:
+        day = self.school.days[i % len(self.school.days)]
+        return datetime.combine(day, datetime.min.time())
+
+# A case does its untimed setup and returns (timed callable, operations it performs).
+Case = Callable[[Bench], Tuple[Callable[[], None], int]]
+CASES: List[Tuple[str, Case]] = []
+
+def case(name: str):
+    def register(fn: Case) -> Case:
+        CASES.append((name, fn))
+        return fn
+    return register
+
+@case("add_data_from_csv")
+def import_roster(bench: Bench):
+    """Load the roster into a new, empty class table."""
+    name = bench.fresh_class()
+    bench.db.create_table_for_class(name)
+    return (lambda: bench.db.add_data_from_csv(bench.roster_path, name)), 1
+
+@case("add_columns_for_today")
+def open_day(bench: Bench):
+    """Open a new school day across every class."""
+    day = bench.school.next_day()
+    return (lambda: bench.db.add_columns_for_today(day)), 1
+
+@case("mark_all_present")
+def mark_all(bench: Bench):
+    """Mark every class present on an opened day."""
+    day = bench.school.next_day()
+    bench.db.add_columns_for_today(day)
+
+    def run():
+        for name in bench.school.class_names:
+            bench.db.mark_all_present(name, day)
+    return run, bench.school.classes
+
+@case("custom_marking_absent")
+def mark_absent(bench: Bench):
+    """Record each class's absentees on an opened day."""
+    day = bench.school.next_day()
+    bench.db.add_columns_for_today(day)
+    absent = {name: bench.school.absent_rolls(name, day.date()) for name in bench.school.class_names}
+
+    def run():
+        for name, rolls in absent.items():
+            bench.db.custom_marking_absent(name, rolls, day)
+    return run, bench.school.classes
+
+@case("authenticate_user")
+def authenticate(bench: Bench):
+    """One class login: password check plus roster."""
+    name = bench.school.class_names[0]
+    return (lambda: bench.db.authenticate_user(name, bench.school.password(name))), 1
+
+@case("history_load")
+def history_load(bench: Bench):
+    """HistoryWidget.load_history for every class on a past day."""
+    day = bench.history_day(len(bench.school.days) // 2)
+
+    def run():
+        for name in bench.school.class_names:
+            bench.db.has_attendance_date(name, day)
+            bench.db.fetch_attendance(name, day)
+    return run, bench.school.classes
+
+@case("display_load")
+def display_load(bench: Bench):
+    """DisplayWidget.load_data for every class: fetch the day and fill an AttendanceGrid."""
+    day = bench.history_day(0)
+    grid = AttendanceGrid()
+
+    def run():
+        for name in bench.school.class_names:
+            grid.load(bench.db.fetch_attendance(name, day))
+    return run, bench.school.classes
+
+@case("display_edit_save")
+def display_edit_save(bench: Bench):
+    """DisplayWidget edits and save_changes: toggle a tenth of each grid, save only the dirty rows."""
+    day = bench.history_day(1)
+    grids = {name: AttendanceGrid(bench.db.fetch_attendance(name, day)) for name in bench.school.class_names}
+
+    def run():
+        for name, grid in grids.items():
+            for row in bench.school.edits(name, day.date()):
+                grid.set_present(row, not grid.is_present(row))
+            bench.db.save_attendance_grid(name, grid.dirty_rows(), day, diff=False)
+            grid.mark_clean()
+    return run, bench.school.classes
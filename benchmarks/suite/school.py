@@ -0,0 +1,69 @@
+import csv
+import random
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Tuple
+
+import Main_database as dbmod
+
+class School:
+    """
+    Deterministic synthetic school: classes x students, with about absence_rate of the students
+    absent on each of `days` school days from start. Everything is derived from seed, and each
+    class draws from its own generator, so the same arguments always give the same data.
+    """
+
+    def __init__(self, classes: int, students: int, days: int, seed: int = 42,
+                 start: date = date(2024, 1, 1), absence_rate: float = 0.1, prefix: str = "bench"):
+        self.classes = classes
+        self.students = students
+        self.seed = seed
+        self.absence_rate = absence_rate
+        self.class_names = [f"{prefix}_{i:03d}" for i in range(classes)]
+        # enough calendar days for the history plus school days handed out later by next_day()
+        self._calendar = dbmod.AttendanceDB.school_days(start, start + timedelta(days=days * 7 // 5 + 400))
+        self.days = self._calendar[:days]
+        self._next = days
+
+    def password(self, class_name: str) -> str:
+        return f"pw-{class_name}"
+
+    def roster(self) -> List[Tuple[str, int]]:
+        """(Student_name, Roll_no) rows, the same for every class."""
+        return [(f"Student {roll:05d}", roll) for roll in range(1, self.students + 1)]
+
+    def write_roster(self, path: str) -> str:
+        with open(path, "w", newline="", encoding="utf-8") as fh:
+            csv.writer(fh).writerows(self.roster())
+        return path
+
+    def _rng(self, class_name: str, salt: str = "") -> random.Random:
+        return random.Random(f"{self.seed}:{class_name}:{salt}")
+
+    def absent_rolls(self, class_name: str, day: date) -> List[int]:
+        count = max(1, round(self.students * self.absence_rate))
+        return sorted(self._rng(class_name, day.isoformat()).sample(range(1, self.students + 1), count))
+
+    def absences(self, class_name: str) -> Dict[date, List[int]]:
+        return {day: self.absent_rolls(class_name, day) for day in self.days}
+
+    def next_day(self) -> datetime:
+        """A school day after the history that has not been handed out before."""
+        day = self._calendar[self._next]
+        self._next += 1
+        return datetime.combine(day, datetime.min.time())
+
+    def edits(self, class_name: str, day: date, fraction: float = 0.1) -> Iterator[int]:
+        """Row indexes a teacher toggles in the grid for the day."""
+        count = max(1, round(self.students * fraction))
+        return iter(sorted(self._rng(class_name, f"edit:{day.isoformat()}").sample(range(self.students), count)))
+
+    def populate(self, db: dbmod.AttendanceDB, roster_path: str, passwords: int = 1) -> None:
+        """Create every class with its roster and attendance history; the first `passwords` classes get one."""
+        self.write_roster(roster_path)
+        for i, name in enumerate(self.class_names):
+            db.create_table_for_class(name)
+            db.import_csv(roster_path, name)
+            if i < passwords:
+                db.set_class_password(name, self.password(name))
+            if self.days:
+                db.mark_attendance_range(name, self.days[0], self.days[-1], absent=self.absences(name))
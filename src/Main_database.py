@@ -1,21 +1,304 @@
-import mysql.connector
-from datetime import datetime
+from datetime import datetime, date
+from contextlib import ExitStack, contextmanager
+from concurrent.futures import ThreadPoolExecutor
 import csv
+import os
 import re
-from typing import List, Iterable, Optional
+import threading
+import time
+from typing import Callable, List, Iterable, Iterator, Mapping, Optional, Tuple
 import hashlib
+import hmac
+import secrets
+
+from bitset import DayBitmap
+from query_stats import QueryStats, public_methods
+from backends import MySQLBackend, SQLiteBackend, StorageBackend
+from roster_import import (
+    ByteCountingLines, ImportCheckpoint, ImportReport, RejectSink, looks_like_header, parse_roster_row,
+)
+
+class OperationCancelled(Exception):
+    """Raised by long-running operations when their cancel callback returns True."""
+
+class SessionExpired(ValueError):
+    """Raised for a session token that is unknown, expired, logged out or scoped to another class."""
+
+def _chunks(seq: list, size: int) -> Iterator[list]:
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
+
+class SchemaCache:
+    """
+    In-process cache of table names and their column sets, loaded in one query and kept fresh
+    by the DDL AttendanceDB issues itself. Entries older than ttl seconds are reloaded, which
+    picks up changes made by other clients; ttl=0 disables caching.
+    """
+
+    def __init__(self, ttl: float = 60.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._tables: Optional[dict] = None
+        self._loaded_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self) -> Optional[dict]:
+        """Return {table: set(columns)} if fresh (a hit), else None (a miss)."""
+        with self._lock:
+            if self._tables is not None and time.monotonic() - self._loaded_at < self.ttl:
+                self.hits += 1
+                return self._tables
+            self.misses += 1
+            return None
+
+    def replace(self, tables: dict) -> None:
+        with self._lock:
+            self._tables = tables
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._tables = None
+
+    def add_table(self, table: str, columns: Iterable[str]) -> None:
+        with self._lock:
+            if self._tables is not None:
+                self._tables.setdefault(table, set()).update(columns)
+
+    def add_column(self, table: str, column: str) -> None:
+        self.add_table(table, (column,))
+
+    def drop_columns(self, table: str, columns: Iterable[str]) -> None:
+        with self._lock:
+            if self._tables is not None and table in self._tables:
+                self._tables[table].difference_update(columns)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+                "tables": len(self._tables) if self._tables is not None else 0,
+            }
+
+class RosterCache:
+    """
+    (Roll_no, Student_name) rosters per class, tagged with the class's stored roster version.
+    AttendanceDB bumps that version in the same transaction as every roster write it makes, so an
+    entry is current exactly while its version matches (writes made outside AttendanceDB are not seen).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: dict = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, class_name: str, version: int) -> Optional[List[Tuple[int, str]]]:
+        with self._lock:
+            entry = self._entries.get(class_name)
+            if entry is not None and entry[0] == version:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, class_name: str, version: int, roster: List[Tuple[int, str]]) -> None:
+        with self._lock:
+            self._entries[class_name] = (version, roster)
+
+    def invalidate(self, class_name: Optional[str] = None) -> None:
+        with self._lock:
+            if class_name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(class_name, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+                "classes": len(self._entries),
+            }
+
+class LoginSession:
+    """One verified login: the class it was opened for and whether the admin password was used."""
+
+    def __init__(self, token: str, class_name: str, admin: bool, expires: float):
+        self.token = token
+        self.class_name = class_name
+        self.admin = admin
+        self.expires = expires
+
+class SessionStore:
+    """
+    In-memory login sessions keyed by an unguessable token, so the (deliberately slow) password
+    check runs once per login and later checks are a dict lookup. A session lapses after ttl
+    seconds without a check, or at close().
+    """
+
+    def __init__(self, ttl: float = 8 * 3600.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._sessions: dict = {}
+
+    def open(self, class_name: str, admin: bool) -> LoginSession:
+        now = time.monotonic()
+        session = LoginSession(secrets.token_urlsafe(32), class_name, admin, now + self.ttl)
+        with self._lock:
+            # logins are rare next to checks, so expired sessions are swept here
+            for token in [t for t, s in self._sessions.items() if s.expires <= now]:
+                del self._sessions[token]
+            self._sessions[session.token] = session
+        return session
+
+    def check(self, token: Optional[str], class_name: Optional[str] = None) -> LoginSession:
+        """Return the live session for token, extending it; class_name must match unless it is an admin session."""
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(token) if token else None
+            if session is None or session.expires <= now:
+                self._sessions.pop(token, None)
+                raise SessionExpired("Your session has expired. Please log in again.")
+            session.expires = now + self.ttl
+        if class_name is not None and not session.admin and class_name != session.class_name:
+            raise SessionExpired(f"This session is for class '{session.class_name}'.")
+        return session
+
+    def close(self, token: Optional[str]) -> None:
+        with self._lock:
+            self._sessions.pop(token, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+class DayOpeningReport:
+    """Outcome of AttendanceDB.open_school_day: per-table timings, skipped tables and errors."""
+
+    def __init__(self, day: date, dry_run: bool):
+        self.day = day
+        self.dry_run = dry_run
+        self.weekend = False
+        self.opened: List[Tuple[str, float, Optional[int]]] = []  # (table, seconds, rows or None)
+        self.already_open: List[str] = []
+        self.errors: dict = {}
+        self.elapsed = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def lines(self) -> List[str]:
+        verb = "would open" if self.dry_run else "opened"
+        if self.weekend:
+            return [f"{self.day}: weekend, nothing to do."]
+        out = [f"{self.day}: {verb} {len(self.opened)} table(s), {len(self.already_open)} already open, "
+               f"{len(self.errors)} error(s) in {self.elapsed:.3f}s"]
+        for table, seconds, rows in sorted(self.opened, key=lambda t: -t[1]):
+            out.append(f"  {table:<32} {seconds * 1000:9.1f} ms" + (f"  {rows} row(s)" if rows is not None else ""))
+        for table, err in self.errors.items():
+            out.append(f"  {table:<32} ERROR {err}")
+        return out
 
 class AttendanceDB:
     IDENTIFIER_RE = re.compile(r"^[A-Za-z][A-Za-z0-9_-]*$")
+    DATE_COLUMN_RE = re.compile(r"^\d{4}_\d{2}_\d{2}$")
+    DATE_COLUMN_DDL = "VARCHAR(20) DEFAULT 'Absent'"
+
+    # Storage layouts: "wide" keeps one YYYY_MM_DD column per day in every class table,
+    # "long" keeps one (class_id, roll_no, date, status) row per student per day.
+    STORAGE_WIDE = "wide"
+    STORAGE_LONG = "long"
+    ATTENDANCE_TABLE = "attendance_records"
+    # per (class, roll) and per (class, date) present/absent counts, see rebuild_summary()
+    SUMMARY_STUDENT_TABLE = "attendance_student_summary"
+    SUMMARY_DAY_TABLE = "attendance_day_summary"
+    # one packed DayBitmap per (class, date), see pack_attendance()
+    BITMAP_TABLE = "attendance_bitmaps"
+    # per-class counter bumped by every roster write, see fetch_roster()
+    ROSTER_VERSION_TABLE = "roster_versions"
+    SYSTEM_TABLES = frozenset({"class_passwords", ATTENDANCE_TABLE, SUMMARY_STUDENT_TABLE, SUMMARY_DAY_TABLE,
+                               BITMAP_TABLE, ROSTER_VERSION_TABLE})
+    CLASS_TABLE_COLUMNS = ("Student_id", "Student_name", "Roll_no")
+    IMPORT_METHODS = ("batched", "load_data")
+    # rows per multi-row statement; keeps batched writes well under max_allowed_packet
+    BATCH_ROWS = 500
+
+    BACKENDS = ("mysql", "sqlite")
+    # public methods enable_query_stats() does not time as operations of their own
+    UNTIMED_METHODS = frozenset({"enable_query_stats", "disable_query_stats", "connect", "close"})
+
+    # stored as pbkdf2_sha256$<iterations>$<salt hex>$<hash hex>; older rows hold a bare SHA-256
+    # hex digest and are rehashed on their next successful login
+    PASSWORD_SCHEME = "pbkdf2_sha256"
+    PASSWORD_ITERATIONS = 600_000
 
-    def __init__(self, host: str, user: str, password: str, database: str, admin_password: str = "123"):
+    def __init__(self, host: str = "localhost", user: str = "root", password: str = "", database: str = "attendance",
+                 admin_password: str = "123", storage: str = STORAGE_WIDE, pool_size: Optional[int] = None,
+                 pool_timeout: float = 10.0, health_check: bool = True, schema_ttl: float = 60.0,
+                 allow_local_infile: bool = False, backend="mysql", session_ttl: float = 8 * 3600.0):
+        """
+        backend selects the storage engine: "mysql" (a server at host), "sqlite" (database is the
+        path of an embedded database file; host, user and password are ignored) or a ready-made
+        StorageBackend.
+        pool_size enables pooled mode: every session() checks out its own connection, so
+        several threads can work concurrently. pool_timeout bounds how long a checkout waits
+        for a free connection; health_check pings (and reconnects) a MySQL connection on checkout.
+        Without pool_size a single shared connection is used and sessions are serialised.
+        schema_ttl is how long cached table/column metadata is trusted (see SchemaCache).
+        allow_local_infile lets import_csv(method="load_data") use LOAD DATA LOCAL INFILE.
+        session_ttl is how long a login session (see login()) survives without being checked.
+        """
+        if storage not in (self.STORAGE_WIDE, self.STORAGE_LONG):
+            raise ValueError(f"Unknown storage layout: {storage!r}. Use 'wide' or 'long'.")
+        if isinstance(backend, StorageBackend):
+            self.backend = backend
+        elif backend == "mysql":
+            self.backend = MySQLBackend(host, user, password, database, pool_size=pool_size, pool_timeout=pool_timeout,
+                                        health_check=health_check, allow_local_infile=allow_local_infile)
+        elif backend == "sqlite":
+            self.backend = SQLiteBackend(database, pool_size=pool_size, pool_timeout=pool_timeout)
+        else:
+            raise ValueError(f"Unknown backend: {backend!r}. Use one of {self.BACKENDS}.")
         self.host = host
         self.user = user
-        self.password = password
         self.database = database
         self.admin_password = admin_password
-        self.conn: Optional[mysql.connector.connection.MySQLConnection] = None
-        self.cursor: Optional[mysql.connector.cursor.MySQLCursor] = None
+        self.storage = storage
+        self.pool_size = self.backend.pool_size
+        self.pool_stats = self.backend.pool_stats
+        self.schema_cache = SchemaCache(schema_ttl)
+        self.roster_cache = RosterCache()
+        self.sessions = SessionStore(session_ttl)
+        self.allow_local_infile = allow_local_infile
+        self._local = threading.local()
+        self._attendance_table_ready = False
+        self._roster_versions_ready = False
+        self.query_stats: Optional[QueryStats] = None
+
+    @classmethod
+    def sqlite(cls, path: str, **kwargs) -> "AttendanceDB":
+        """AttendanceDB on an embedded SQLite file (created on first use)."""
+        return cls(database=path, backend="sqlite", **kwargs)
+
+    @property
+    def is_long_format(self) -> bool:
+        return self.storage == self.STORAGE_LONG
+
+    @property
+    def is_pooled(self) -> bool:
+        return self.backend.is_pooled
+
+    @property
+    def _status_upsert(self) -> str:
+        return self.backend.upsert(("class_id", "roll_no", "date"), ("status",))
 
     def _validate_identifier(self, name: str) -> None:
         """Ensure table/column identifier is safe (letters, digits, underscores; starts with letter)."""
@@ -28,89 +311,177 @@ class AttendanceDB:
         dt = dt or datetime.now()
         return dt.strftime("%Y_%m_%d")
 
+    def _date_value(self, dt: Optional[datetime] = None):
+        """Date key used by the long-format attendance table, as the backend binds it."""
+        dt = dt or datetime.now()
+        return self.backend.date_param(dt.date() if isinstance(dt, datetime) else dt)
+
     def connect(self) -> bool:
-        """Open connection and cursor if not already open. Returns True on success."""
-        if self.conn is not None and self.conn.is_connected():
-            return True
-        try:
-            self.conn = mysql.connector.connect(
-                host=self.host,
-                user=self.user,
-                password=self.password,
-                database=self.database,
-            )
-            self.cursor = self.conn.cursor(buffered=True)
-            return True
-        except mysql.connector.Error as e:
-            raise ConnectionError(f"Error connecting to the database: {e}") from e
+        """Open the connection (or the connection pool) if not already open. Returns True on success."""
+        return self.backend.connect()
 
     def close(self) -> None:
-        if self.cursor:
+        self.backend.close()
+
+    # Query instrumentation
+    def enable_query_stats(self, slow_ms: float = 100.0, slow_log: Optional[str] = None) -> QueryStats:
+        """
+        Start recording every statement this instance executes (fingerprint, duration, rows and the
+        public method that issued it) and the duration of each public method call, into
+        self.query_stats. Statements taking slow_ms or longer are counted and, with slow_log,
+        appended to that file. While disabled the only cost is one attribute check per session.
+        """
+        self.disable_query_stats()
+        stats = QueryStats(slow_ms=slow_ms, slow_log=slow_log)
+        for name in public_methods(type(self)):
+            if name not in self.UNTIMED_METHODS:
+                # instance attributes shadow the class methods, so internal self.x() calls are seen too
+                setattr(self, name, stats.time_method(name, getattr(type(self), name).__get__(self)))
+        self.query_stats = stats
+        return stats
+
+    def disable_query_stats(self) -> Optional[QueryStats]:
+        """Stop recording and close the slow-query log; returns what was collected."""
+        stats, self.query_stats = self.query_stats, None
+        if stats is None:
+            return None
+        for name in public_methods(type(self)):
+            self.__dict__.pop(name, None)
+        stats.close()
+        return stats
+
+    # Sessions
+    @contextmanager
+    def session(self) -> Iterator:
+        """
+        Check out a connection for one unit of work and yield a buffered cursor on it
+        (queries use %s placeholders whatever the backend).
+        Commits when the block exits cleanly and rolls back on error. Nested sessions on
+        the same thread reuse the outer cursor, so the outermost block owns the transaction.
+        """
+        outer = getattr(self._local, "cursor", None)
+        if outer is not None:
+            yield outer
+            return
+
+        conn = self.backend.checkout()
+        try:
+            cur = self.backend.cursor(conn)
+        except Exception:
+            self.backend.release(conn)
+            raise
+        if self.query_stats is not None:
+            cur = self.query_stats.cursor(cur)
+        self._local.cursor = cur
+        try:
+            yield cur
+            conn.commit()
+        except Exception:
             try:
-                self.cursor.close()
+                conn.rollback()
             except Exception:
                 pass
-            self.cursor = None
-        if self.conn:
+            raise
+        finally:
+            self._local.cursor = None
+            self._local.rosters_written = None
             try:
-                self.conn.close()
+                cur.close()
             except Exception:
                 pass
-            self.conn = None
+            self.backend.release(conn)
+
+    # Schema metadata
+    def _schema(self, refresh: bool = False) -> dict:
+        """Return {table: set(columns)} for the current database, from the cache when fresh."""
+        tables = None if refresh else self.schema_cache.get()
+        if tables is not None:
+            return tables
+        with self.session() as cur:
+            cur.execute(self.backend.schema_query())
+            tables = {}
+            for table, column in cur.fetchall():
+                tables.setdefault(table, set()).add(column)
+        self.schema_cache.replace(tables)
+        return tables
 
     # Table operations
     def store_table_names(self) -> List[str]:
         """Return list of tables (class names) in the current database."""
-        self.connect()
-        self.cursor.execute("SHOW TABLES;")
-        rows = self.cursor.fetchall()
-        return [r[0] for r in rows]
+        return sorted(self._schema())
+
+    def class_table_names(self) -> List[str]:
+        """Return class tables only, skipping the bookkeeping tables owned by this module."""
+        return [t for t in self.store_table_names() if t not in self.SYSTEM_TABLES]
+
+    def _ensure_attendance_table(self, cur) -> None:
+        """Create the long-format attendance table once per AttendanceDB instance."""
+        if self._attendance_table_ready:
+            return
+        for statement in self.backend.attendance_table_ddl(self.ATTENDANCE_TABLE):
+            cur.execute(statement)
+        self.schema_cache.add_table(self.ATTENDANCE_TABLE, ("class_id", "roll_no", "date", "status"))
+        self._attendance_table_ready = True
 
     def create_table_for_class(self, class_name: str) -> None:
         """Create a new class table with auto-increment student id and unique roll_no."""
         self._validate_identifier(class_name)
-        self.connect()
-        query = f"""
-        CREATE TABLE IF NOT EXISTS `{class_name}` (
-            Student_id INT AUTO_INCREMENT PRIMARY KEY,
-            Student_name VARCHAR(255) NOT NULL,
-            Roll_no INT NOT NULL UNIQUE
-        ) ENGINE=InnoDB;
-        """
-        self.cursor.execute(query)
-        self.conn.commit()
+        new = class_name not in self._schema()
+        with self.session() as cur:
+            for statement in self.backend.class_table_ddl(class_name):
+                cur.execute(statement)
+            if new:
+                # a class dropped and recreated under the same name must not match its old cached roster
+                self._bump_roster_version(cur, class_name)
+        self.schema_cache.add_table(class_name, self.CLASS_TABLE_COLUMNS)
 
     # Authentication
     def _hash_password(self, password: str) -> str:
-        """Hash password with SHA256 for storage."""
-        return hashlib.sha256(password.encode("utf-8")).hexdigest()
+        """Hash password with salted PBKDF2-HMAC-SHA256 for storage."""
+        salt = secrets.token_bytes(16)
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, self.PASSWORD_ITERATIONS)
+        return f"{self.PASSWORD_SCHEME}${self.PASSWORD_ITERATIONS}${salt.hex()}${digest.hex()}"
+
+    def _verify_password(self, password: str, stored_hash: str) -> bool:
+        """Check password against a stored hash, PBKDF2 or legacy unsalted SHA-256, in constant time."""
+        scheme, _, rest = stored_hash.partition("$")
+        if scheme != self.PASSWORD_SCHEME:
+            return hmac.compare_digest(hashlib.sha256(password.encode("utf-8")).hexdigest(), stored_hash)
+        try:
+            iterations, salt, digest = rest.split("$")
+            computed = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), bytes.fromhex(salt), int(iterations))
+        except ValueError:
+            return False
+        return hmac.compare_digest(computed.hex(), digest)
+
+    def _needs_rehash(self, stored_hash: str) -> bool:
+        return not stored_hash.startswith(f"{self.PASSWORD_SCHEME}${self.PASSWORD_ITERATIONS}$")
 
     def set_class_password(self, class_name: str, password: str) -> None:
         """Set or update the password for a specific class."""
         self._validate_identifier(class_name)
-        self.connect()
         pw_hash = self._hash_password(password)
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS class_passwords (
-                class_name VARCHAR(255) PRIMARY KEY,
-                password_hash VARCHAR(255) NOT NULL
-            );
-        """)
-        self.cursor.execute("""
-            INSERT INTO class_passwords (class_name, password_hash)
-            VALUES (%s, %s)
-            ON DUPLICATE KEY UPDATE password_hash = VALUES(password_hash);
-        """, (class_name, pw_hash))
-        self.conn.commit()
+        with self.session() as cur:
+            for statement in self.backend.passwords_table_ddl():
+                cur.execute(statement)
+            cur.execute(f"""
+                INSERT INTO class_passwords (class_name, password_hash)
+                VALUES (%s, %s)
+                {self.backend.upsert(("class_name",), ("password_hash",))};
+            """, (class_name, pw_hash))
+        self.schema_cache.add_table("class_passwords", ("class_name", "password_hash"))
 
     def get_class_password_hash(self, class_name: str) -> Optional[str]:
-        """Fetch the stored password hash for a class."""
+        """Fetch the stored password hash for a class (None when it has none)."""
         self._validate_identifier(class_name)
-        self.connect()
-        self.cursor.execute("""
-            SELECT password_hash FROM class_passwords WHERE class_name=%s;
-        """, (class_name,))
-        row = self.cursor.fetchone()
+        if "class_passwords" not in self._schema():
+            # created by the first set_class_password()
+            return None
+        with self.session() as cur:
+            cur.execute("""
+                SELECT password_hash FROM class_passwords WHERE class_name=%s;
+            """, (class_name,))
+            row = cur.fetchone()
         return row[0] if row else None
 
     def authenticate_user(self, class_name: str, password: str) -> list[tuple]:
@@ -120,57 +491,599 @@ class AttendanceDB:
         - the global admin_password (master override).
         Returns list of (Roll_no, Student_name) tuples on success.
         Raises ValueError on failure.
+        The class password check is deliberately slow; use login() once and check_session() after.
         """
         self._validate_identifier(class_name)
-        self.connect()
 
-        if class_name not in self.store_table_names():
+        with self.session():
+            if class_name not in self.store_table_names():
+                raise ValueError(f"Authentication failed: class/table '{class_name}' not found.")
+
+            if not hmac.compare_digest(password.encode("utf-8"), self.admin_password.encode("utf-8")):
+                stored_hash = self.get_class_password_hash(class_name)
+                if stored_hash is None:
+                    raise ValueError(f"No password set for class '{class_name}'. Please set one.")
+                if not self._verify_password(password, stored_hash):
+                    raise ValueError("Authentication failed: incorrect password.")
+                if self._needs_rehash(stored_hash):
+                    self.set_class_password(class_name, password)
+
+            return self.fetch_roster(class_name)
+
+    # Sessions
+    def login(self, class_name: str, password: str) -> Tuple[LoginSession, List[Tuple[int, str]]]:
+        """
+        Verify the credential once (as authenticate_user) and open a session for class_name.
+        The admin password opens an admin session, valid for every class, but only through a class
+        that exists. Returns (session, roster); raises ValueError on failure.
+        """
+        self._validate_identifier(class_name)
+        if class_name not in self.class_table_names():
             raise ValueError(f"Authentication failed: class/table '{class_name}' not found.")
+        admin = hmac.compare_digest(password.encode("utf-8"), self.admin_password.encode("utf-8"))
+        roster = self.authenticate_user(class_name, password)
+        return self.sessions.open(class_name, admin), roster
+
+    def login_offline(self, class_name: str, password: str, stored_hash: Optional[str]) -> LoginSession:
+        """
+        Open a session without reaching the database: password is checked against the admin
+        password or stored_hash, the class's hash as cached by a front end while online.
+        Raises ValueError on failure.
+        """
+        self._validate_identifier(class_name)
+        admin = hmac.compare_digest(password.encode("utf-8"), self.admin_password.encode("utf-8"))
+        if not admin and (stored_hash is None or not self._verify_password(password, stored_hash)):
+            raise ValueError("Authentication failed: incorrect password (or class never logged in online).")
+        return self.sessions.open(class_name, admin)
 
-        if password == self.admin_password:
-            query = f"SELECT Roll_no, Student_name FROM `{class_name}` ORDER BY Roll_no;"
-            self.cursor.execute(query)
-            return self.cursor.fetchall()
+    def check_session(self, token: Optional[str], class_name: Optional[str] = None) -> LoginSession:
+        """O(1) check that token is a live session (for class_name, unless admin); raises SessionExpired."""
+        return self.sessions.check(token, class_name)
 
-        stored_hash = self.get_class_password_hash(class_name)
-        if stored_hash is None:
-            raise ValueError(f"No password set for class '{class_name}'. Please set one.")
-        if stored_hash != self._hash_password(password):
-            raise ValueError("Authentication failed: incorrect password.")
+    def logout(self, token: Optional[str]) -> None:
+        self.sessions.close(token)
 
-        query = f"SELECT Roll_no, Student_name FROM `{class_name}` ORDER BY Roll_no;"
-        self.cursor.execute(query)
-        return self.cursor.fetchall()
+    def session_roster(self, token: Optional[str], class_name: str) -> List[Tuple[int, str]]:
+        """The roster of class_name for a live session, without re-running the password check."""
+        self.check_session(token, class_name)
+        return self.fetch_roster(class_name)
 
     # Column (date) management
     def _column_exists(self, table: str, column: str) -> bool:
-        """Return True if column exists in table."""
-        self.connect()
-        self.cursor.execute(f"SHOW COLUMNS FROM `{table}` LIKE %s;", (column,))
-        return self.cursor.fetchone() is not None
+        """Return True if column exists in table (answered from the schema cache)."""
+        columns = self._schema().get(table)
+        if columns is None or column not in columns:
+            # unknown to the cache: another client may have just created it
+            columns = self._schema(refresh=True).get(table, ())
+        return column in columns
+
+    def _add_date_column(self, cur, table: str, col: str) -> None:
+        try:
+            cur.execute(f"ALTER TABLE `{table}` ADD COLUMN `{col}` {self.DATE_COLUMN_DDL};")
+        except self.backend.Error as e:
+            # another client added it since our metadata was cached
+            if not self.backend.is_duplicate_column(e):
+                raise
+            self.schema_cache.add_column(table, col)
+            return
+        self.schema_cache.add_column(table, col)
+        self._summary_open_day(cur, table, datetime.strptime(col, "%Y_%m_%d"))
+
+    def _add_date_columns(self, cur, table: str, cols: List[str]) -> None:
+        """Add several date columns, with a single ALTER TABLE where the backend allows it."""
+        statements = self.backend.add_columns(table, cols, self.DATE_COLUMN_DDL)
+        if len(statements) != 1 or len(cols) < 2:
+            # one statement per column anyway (SQLite): keep the per-column duplicate handling
+            for col in cols:
+                self._add_date_column(cur, table, col)
+            return
+        try:
+            cur.execute(statements[0])
+        except self.backend.Error as e:
+            # the ALTER is all-or-nothing: another client added one of them, so go column by column
+            if not self.backend.is_duplicate_column(e):
+                raise
+            existing = self._schema(refresh=True).get(table, set())
+            for col in cols:
+                if col not in existing:
+                    self._add_date_column(cur, table, col)
+            return
+        for col in cols:
+            self.schema_cache.add_column(table, col)
+            self._summary_open_day(cur, table, datetime.strptime(col, "%Y_%m_%d"))
+
+    def _students_without_row(self, cur, class_name: str, dt: Optional[datetime]) -> List[int]:
+        """Rolls of class_name with no long-format row for the date yet."""
+        cur.execute(f"""
+            SELECT c.Roll_no FROM `{class_name}` c
+            LEFT JOIN `{self.ATTENDANCE_TABLE}` a ON a.class_id = %s AND a.roll_no = c.Roll_no AND a.date = %s
+            WHERE a.roll_no IS NULL;
+        """, (class_name, self._date_value(dt)))
+        return [r[0] for r in cur.fetchall()]
+
+    def _open_long_day(self, cur, class_name: str, dt: Optional[datetime] = None) -> None:
+        """Insert an 'Absent' row for every student that has none yet for the date."""
+        cur.execute(f"""
+            {self.backend.insert_ignore} `{self.ATTENDANCE_TABLE}` (class_id, roll_no, date, status)
+            SELECT %s, Roll_no, %s, 'Absent' FROM `{class_name}`;
+        """, (class_name, self._date_value(dt)))
+
+    def ensure_attendance_date(self, class_name: str, dt: Optional[datetime] = None) -> None:
+        """Make sure attendance for the date exists in class_name, defaulting every student to 'Absent'."""
+        self._validate_identifier(class_name)
+        with self.session() as cur:
+            if self.is_long_format:
+                self._ensure_attendance_table(cur)
+                with self._summary_tracking(cur, class_name, dt):
+                    self._open_long_day(cur, class_name, dt)
+                return
+            col = self._date_column_name(dt)
+            if not self._column_exists(class_name, col):
+                self._add_date_column(cur, class_name, col)
+
+    def has_attendance_date(self, class_name: str, dt: Optional[datetime] = None) -> bool:
+        """Return True if any attendance has been recorded for class_name on the date."""
+        self._validate_identifier(class_name)
+        if not self.is_long_format:
+            return self._column_exists(class_name, self._date_column_name(dt))
+        with self.session() as cur:
+            self._ensure_attendance_table(cur)
+            cur.execute(
+                f"SELECT 1 FROM `{self.ATTENDANCE_TABLE}` WHERE class_id=%s AND date=%s LIMIT 1;",
+                (class_name, self._date_value(dt)),
+            )
+            return cur.fetchone() is not None
+
+    def fetch_students(self, class_name: str) -> List[Tuple[int, str]]:
+        """Return (Roll_no, Student_name) for every student of class_name, ordered by roll."""
+        self._validate_identifier(class_name)
+        with self.session() as cur:
+            cur.execute(f"SELECT Roll_no, Student_name FROM `{class_name}` ORDER BY Roll_no;")
+            return [(r[0], r[1]) for r in cur.fetchall()]
+
+    # Roster versions
+    def _ensure_roster_versions(self, cur) -> None:
+        """Create the roster version table once per AttendanceDB instance."""
+        if self._roster_versions_ready:
+            return
+        for statement in self.backend.roster_versions_table_ddl(self.ROSTER_VERSION_TABLE):
+            cur.execute(statement)
+        self.schema_cache.add_table(self.ROSTER_VERSION_TABLE, ("class_id", "version"))
+        self._roster_versions_ready = True
+
+    def _bump_roster_version(self, cur, class_name: str) -> None:
+        """Record a roster change of class_name; commits (or rolls back) with the write itself."""
+        self._ensure_roster_versions(cur)
+        cur.execute(f"""
+            INSERT INTO `{self.ROSTER_VERSION_TABLE}` (class_id, version) VALUES (%s, 1)
+            {self.backend.upsert(("class_id",), ("version",), add=True)};
+        """, (class_name,))
+        self.roster_cache.invalidate(class_name)
+        written = getattr(self._local, "rosters_written", None)
+        if written is None:
+            written = self._local.rosters_written = set()
+        written.add(class_name)
+
+    def roster_version(self, class_name: str) -> int:
+        """Stored roster version of class_name; 0 until its first roster write."""
+        self._validate_identifier(class_name)
+        with self.session() as cur:
+            self._ensure_roster_versions(cur)
+            cur.execute(f"SELECT version FROM `{self.ROSTER_VERSION_TABLE}` WHERE class_id = %s;", (class_name,))
+            row = cur.fetchone()
+        return int(row[0]) if row else 0
+
+    def fetch_roster(self, class_name: str) -> List[Tuple[int, str]]:
+        """
+        Like fetch_students, but served from the roster cache while the stored roster version is
+        unchanged, so a refresh after an attendance write costs one single-row version lookup.
+        """
+        self._validate_identifier(class_name)
+        with self.session():
+            version = self.roster_version(class_name)
+            roster = self.roster_cache.get(class_name, version)
+            if roster is None:
+                roster = self.fetch_students(class_name)
+                # a roster this transaction changed is not cached: a rollback would reuse its version
+                if class_name not in (getattr(self._local, "rosters_written", None) or ()):
+                    self.roster_cache.put(class_name, version, roster)
+        return list(roster)
+
+    def fetch_attendance(self, class_name: str, dt: Optional[datetime] = None) -> List[Tuple[int, str, str]]:
+        """
+        Return (Roll_no, Student_name, status) for every student on the date, ordered by roll.
+        Students without a recorded status are reported as 'Absent'.
+        """
+        self._validate_identifier(class_name)
+        with self.session() as cur:
+            if self.is_long_format:
+                self._ensure_attendance_table(cur)
+                cur.execute(f"""
+                    SELECT c.Roll_no, c.Student_name, COALESCE(a.status, 'Absent')
+                    FROM `{class_name}` c
+                    LEFT JOIN `{self.ATTENDANCE_TABLE}` a
+                        ON a.class_id = %s AND a.roll_no = c.Roll_no AND a.date = %s
+                    ORDER BY c.Roll_no;
+                """, (class_name, self._date_value(dt)))
+                return [(r[0], r[1], r[2]) for r in cur.fetchall()]
+
+            col = self._date_column_name(dt)
+            if not self._column_exists(class_name, col):
+                cur.execute(f"SELECT Roll_no, Student_name FROM `{class_name}` ORDER BY Roll_no;")
+                return [(r[0], r[1], "Absent") for r in cur.fetchall()]
+            cur.execute(f"SELECT Roll_no, Student_name, `{col}` FROM `{class_name}` ORDER BY Roll_no;")
+            return [(r[0], r[1], r[2] if r[2] is not None else "Absent") for r in cur.fetchall()]
+
+    def fetch_presence_matrix(self, class_name: str, start: date, end: date
+                              ) -> Tuple[List[date], List[Tuple[int, str]], List[bytes]]:
+        """
+        Return (days, students, rows) for the recorded dates of class_name between start and end
+        (inclusive): days in order, (Roll_no, Student_name) ordered by roll, and per student a
+        bytes row with one byte per day, 1 where the status was 'Present' and 0 otherwise.
+        Wide format compares the date columns server-side, so rows come back as ready 0/1 tuples;
+        long format fetches only the 'Present' cells.
+        """
+        self._validate_identifier(class_name)
+        start = start.date() if isinstance(start, datetime) else start
+        end = end.date() if isinstance(end, datetime) else end
+        with self.session() as cur:
+            if not self.is_long_format:
+                cols = sorted(c for c in self._schema().get(class_name, ())
+                              if self.DATE_COLUMN_RE.match(c) and start.strftime("%Y_%m_%d") <= c <= end.strftime("%Y_%m_%d"))
+                flags = "".join(f", COALESCE(`{c}` = 'Present', 0)" for c in cols)
+                cur.execute(f"SELECT Roll_no, Student_name{flags} FROM `{class_name}` ORDER BY Roll_no;")
+                days = [datetime.strptime(c, "%Y_%m_%d").date() for c in cols]
+                students, rows = [], []
+                for r in cur.fetchall():
+                    students.append((r[0], r[1]))
+                    rows.append(bytes(r[2:]))
+                return days, students, rows
+
+            self._ensure_attendance_table(cur)
+            span = (class_name, self.backend.date_param(start), self.backend.date_param(end))
+            cur.execute(f"""
+                SELECT DISTINCT date FROM `{self.ATTENDANCE_TABLE}`
+                WHERE class_id = %s AND date BETWEEN %s AND %s ORDER BY date;
+            """, span)
+            stored = [r[0] for r in cur.fetchall()]
+            cur.execute(f"SELECT Roll_no, Student_name FROM `{class_name}` ORDER BY Roll_no;")
+            students = [(r[0], r[1]) for r in cur.fetchall()]
+            cur.execute(f"""
+                SELECT roll_no, date FROM `{self.ATTENDANCE_TABLE}`
+                WHERE class_id = %s AND date BETWEEN %s AND %s AND status = 'Present';
+            """, span)
+            day_index = {d: i for i, d in enumerate(stored)}
+            matrix = {roll: bytearray(len(stored)) for roll, _ in students}
+            for roll, day in cur.fetchall():
+                row = matrix.get(roll)
+                if row is not None:
+                    row[day_index[day]] = 1
+        days = [d if isinstance(d, date) else date.fromisoformat(str(d)) for d in stored]
+        return days, students, [bytes(matrix[roll]) for roll, _ in students]
+
+    def attendance_dates(self, class_name: str, start: Optional[date] = None,
+                         end: Optional[date] = None) -> List[date]:
+        """Recorded dates of class_name between start and end (inclusive, both optional), oldest first."""
+        self._validate_identifier(class_name)
+        start = start.date() if isinstance(start, datetime) else start
+        end = end.date() if isinstance(end, datetime) else end
+        if not self.is_long_format:
+            low = start.strftime("%Y_%m_%d") if start is not None else ""
+            high = end.strftime("%Y_%m_%d") if end is not None else "9999_99_99"
+            return [datetime.strptime(c, "%Y_%m_%d").date() for c in sorted(
+                c for c in self._schema().get(class_name, ()) if self.DATE_COLUMN_RE.match(c) and low <= c <= high)]
+        query = f"SELECT DISTINCT date FROM `{self.ATTENDANCE_TABLE}` WHERE class_id = %s"
+        params: list = [class_name]
+        if start is not None:
+            query += " AND date >= %s"
+            params.append(self._date_value(start))
+        if end is not None:
+            query += " AND date <= %s"
+            params.append(self._date_value(end))
+        with self.session() as cur:
+            self._ensure_attendance_table(cur)
+            cur.execute(query + " ORDER BY date;", tuple(params))
+            return [d if isinstance(d, date) else date.fromisoformat(str(d)) for (d,) in cur.fetchall()]
+
+    @contextmanager
+    def stream_attendance_matrix(self, class_name: str, start: Optional[date] = None, end: Optional[date] = None,
+                                 batch_size: int = 1000):
+        """
+        Yield (days, rows) for class_name: days are the recorded dates between start and end and rows
+        iterates (Roll_no, Student_name, [status per day]) in roll order, 'Absent' where nothing was
+        recorded. Rows come batch_size at a time from an unbuffered (server-side on MySQL) cursor, so
+        memory stays bounded whatever the class size; consume them inside the block. Outside a session
+        the read gets a connection of its own; inside one it shares the session's cursor.
+        """
+        days = self.attendance_dates(class_name, start, end)
+        if self.is_long_format:
+            on, params = "", [class_name]
+            if start is not None:
+                on += " AND a.date >= %s"
+                params.append(self._date_value(start))
+            if end is not None:
+                on += " AND a.date <= %s"
+                params.append(self._date_value(end))
+            query = f"""
+                SELECT c.Roll_no, c.Student_name, a.date, a.status FROM `{class_name}` c
+                LEFT JOIN `{self.ATTENDANCE_TABLE}` a ON a.class_id = %s AND a.roll_no = c.Roll_no{on}
+                ORDER BY c.Roll_no, a.date;
+            """
+        else:
+            cols = "".join(f", `{d.strftime('%Y_%m_%d')}`" for d in days)
+            query, params = f"SELECT Roll_no, Student_name{cols} FROM `{class_name}` ORDER BY Roll_no;", []
+
+        outer = getattr(self._local, "cursor", None)
+        if outer is not None:
+            outer.execute(query, tuple(params))
+            yield days, self._matrix_rows(outer, days, batch_size)
+            return
+        conn = self.backend.checkout()
+        try:
+            stream = self.backend.stream_cursor(conn)
+            cur = None
+            try:
+                cur = stream if self.query_stats is None else self.query_stats.cursor(stream)
+                cur.execute(query, tuple(params))
+                yield days, self._matrix_rows(cur, days, batch_size)
+            finally:
+                if cur is not None and cur is not stream:
+                    cur.flush()
+                self.backend.end_stream(conn, stream)
+        finally:
+            try:
+                # end the read's snapshot before the connection goes back
+                conn.rollback()
+            except Exception:
+                pass
+            self.backend.release(conn)
+
+    def _matrix_rows(self, cur, days: List[date], batch_size: int) -> Iterator[Tuple[int, str, List[str]]]:
+        """Rows of stream_attendance_matrix from an executed query, fetched batch_size at a time."""
+        def fetched():
+            while True:
+                batch = cur.fetchmany(batch_size)
+                if not batch:
+                    return
+                yield from batch
+
+        if not self.is_long_format:
+            for row in fetched():
+                yield row[0], row[1], [s if s is not None else "Absent" for s in row[2:]]
+            return
+        # long format: one (student, date) row at a time, folded into one row per student
+        day_index = {self._date_value(d): i for i, d in enumerate(days)}
+        current = None
+        for roll, name, day, status in fetched():
+            if current is None or current[0] != roll:
+                if current is not None:
+                    yield current
+                current = (roll, name, ["Absent"] * len(days))
+            if day is not None:
+                current[2][day_index[day]] = status
+        if current is not None:
+            yield current
+
+    def set_attendance(self, class_name: str, roll_no: int, status: str, dt: Optional[datetime] = None) -> None:
+        """Set one student's status for the date. Wrap several calls in session() to commit once."""
+        self._validate_identifier(class_name)
+        with self.session() as cur, self._summary_tracking(cur, class_name, dt, rolls=[int(roll_no)]):
+            if self.is_long_format:
+                self._ensure_attendance_table(cur)
+                cur.execute(f"""
+                    INSERT INTO `{self.ATTENDANCE_TABLE}` (class_id, roll_no, date, status)
+                    SELECT %s, Roll_no, %s, %s FROM `{class_name}` WHERE Roll_no = %s
+                    {self._status_upsert};
+                """, (class_name, self._date_value(dt), status, int(roll_no)))
+            else:
+                col = self._date_column_name(dt)
+                cur.execute(f"UPDATE `{class_name}` SET `{col}`=%s WHERE Roll_no=%s;", (status, int(roll_no)))
+
+    def save_attendance_grid(self, class_name: str, rows: Iterable[Tuple[int, str, str]],
+                             dt: Optional[datetime] = None, diff: bool = True) -> int:
+        """
+        Save an edited grid of (Roll_no, Student_name, status) rows for the date in one transaction.
+        The grid is diffed against the stored values and only changed rows are written, using a
+        CASE-based UPDATE (and, in long format, a multi-row upsert) per BATCH_ROWS rows.
+        A blank name keeps the stored name and a blank status the stored status; rolls no longer in
+        the class are ignored.
+        Pass diff=False when rows already holds only edited rows (e.g. AttendanceGrid.dirty_rows())
+        to read back just those rolls instead of the whole class; an empty rows then costs no
+        queries at all.
+        Returns the number of rows that changed.
+        """
+        self._validate_identifier(class_name)
+        if not diff:
+            rows = [(int(r), n, st) for r, n, st in rows]
+            if not rows:
+                return 0
+
+        with self.session() as cur, self._summary_tracking(cur, class_name, dt):
+            self.ensure_attendance_date(class_name, dt)
+            if diff:
+                current = {r[0]: (r[1], r[2]) for r in self.fetch_attendance(class_name, dt)}
+            else:
+                current = self._stored_rows(cur, class_name, dt, [r for r, _, _ in rows])
+            dirty = []
+            for roll, name, status in rows:
+                roll = int(roll)
+                if roll not in current:
+                    continue
+                old_name, old_status = current[roll]
+                name = (name or "").strip() or old_name
+                status = status or old_status
+                if name != old_name or status != old_status:
+                    dirty.append((roll, name, status))
+            if dirty:
+                self._write_grid(cur, class_name, dt, dirty, renamed={r for r, n, _ in dirty if n != current[r][0]})
+        return len(dirty)
+
+    def _stored_rows(self, cur, class_name: str, dt: Optional[datetime], rolls: List[int]) -> dict:
+        """{Roll_no: (Student_name, status)} on an opened date, as fetch_attendance, for just these rolls."""
+        current = {}
+        for chunk in _chunks(sorted(set(rolls)), self.BATCH_ROWS):
+            placeholders = ",".join(["%s"] * len(chunk))
+            if self.is_long_format:
+                cur.execute(f"""
+                    SELECT c.Roll_no, c.Student_name, COALESCE(a.status, 'Absent')
+                    FROM `{class_name}` c
+                    LEFT JOIN `{self.ATTENDANCE_TABLE}` a
+                        ON a.class_id = %s AND a.roll_no = c.Roll_no AND a.date = %s
+                    WHERE c.Roll_no IN ({placeholders});
+                """, (class_name, self._date_value(dt), *chunk))
+            else:
+                col = self._date_column_name(dt)
+                cur.execute(f"SELECT Roll_no, Student_name, `{col}` FROM `{class_name}` WHERE Roll_no IN ({placeholders});",
+                            tuple(chunk))
+            current.update((r[0], (r[1], r[2] if r[2] is not None else "Absent")) for r in cur.fetchall())
+        return current
+
+    def _write_grid(self, cur, class_name: str, dt: Optional[datetime], dirty: List[Tuple[int, str, str]],
+                    renamed: set) -> None:
+        """
+        Write pre-diffed (roll, name, status) rows for a date opened by ensure_attendance_date;
+        renamed holds the rolls whose name changed and rows with a blank status keep theirs.
+        """
+        col = self._date_column_name(dt)
+        day = self._date_value(dt)
+        if renamed:
+            self._bump_roster_version(cur, class_name)
+        for chunk in _chunks(dirty, self.BATCH_ROWS):
+            sets = []
+            params: list = []
+            name_rows = [(r, n) for r, n, _ in chunk if r in renamed]
+            status_rows = [(r, st) for r, _, st in chunk if st]
+            if name_rows:
+                sets.append("Student_name = CASE Roll_no " + "WHEN %s THEN %s " * len(name_rows) + "ELSE Student_name END")
+                params.extend(v for pair in name_rows for v in pair)
+            if status_rows and not self.is_long_format:
+                sets.append(f"`{col}` = CASE Roll_no " + "WHEN %s THEN %s " * len(status_rows) + f"ELSE `{col}` END")
+                params.extend(v for pair in status_rows for v in pair)
+            if sets:
+                edited = name_rows if self.is_long_format else name_rows + status_rows
+                targets = sorted({r for r, _ in edited})
+                placeholders = ",".join(["%s"] * len(targets))
+                cur.execute(
+                    f"UPDATE `{class_name}` SET {', '.join(sets)} WHERE Roll_no IN ({placeholders});",
+                    tuple(params + targets),
+                )
+            if status_rows and self.is_long_format:
+                # the day is open, so every current student has a row; other rolls match nothing
+                cur.execute(f"""
+                    UPDATE `{self.ATTENDANCE_TABLE}`
+                    SET status = CASE roll_no {"WHEN %s THEN %s " * len(status_rows)}ELSE status END
+                    WHERE class_id = %s AND date = %s AND roll_no IN ({",".join(["%s"] * len(status_rows))});
+                """, (*(v for pair in status_rows for v in pair), class_name, day, *(r for r, _ in status_rows)))
 
     def add_columns_for_today(self, dt: Optional[datetime] = None) -> None:
         """
         Add a date column (YYYY_MM_DD) to every class table for attendance,
         skipping weekends (Saturday=5, Sunday=6).
+        In long format this inserts the day's default 'Absent' rows instead of running DDL.
+        """
+        report = self.open_school_day(dt)
+        if report.errors:
+            table, err = next(iter(report.errors.items()))
+            raise RuntimeError(f"Failed to add column {self._date_column_name(dt)} to {table}: {err}")
+
+    def open_school_day(self, dt: Optional[datetime] = None, dry_run: bool = False,
+                        workers: Optional[int] = None) -> DayOpeningReport:
+        """
+        Open the date for every class table in one pass and return a DayOpeningReport.
+        Wide format: tables missing the date column are found with a single schema metadata
+        query and altered concurrently, one pooled connection per worker (workers defaults to
+        pool_size; sequential without a pool). Long format: pending rows are counted in one
+        query and inserted with one INSERT IGNORE ... SELECT ... UNION ALL statement.
+        dry_run reports what would be done without writing. Weekends are skipped.
         """
         dt = dt or datetime.now()
-        weekday = dt.weekday()
-        if weekday in (5, 6):
-            return
+        report = DayOpeningReport(dt.date() if isinstance(dt, datetime) else dt, dry_run)
+        if dt.weekday() in (5, 6):
+            report.weekend = True
+            return report
+
+        started = time.perf_counter()
+        if self.is_long_format:
+            self._open_day_long(dt, report)
+        else:
+            self._open_day_wide(dt, report, workers or self.pool_size or 1)
+        report.elapsed = time.perf_counter() - started
+        return report
 
+    def _open_day_wide(self, dt: datetime, report: DayOpeningReport, workers: int) -> None:
         col = self._date_column_name(dt)
-        tables = [t for t in self.store_table_names() if t != "class_passwords"]
+        schema = self._schema(refresh=True)
+        missing = []
+        for table in sorted(schema):
+            if table in self.SYSTEM_TABLES:
+                continue
+            if col in schema[table]:
+                report.already_open.append(table)
+            else:
+                self._validate_identifier(table)
+                missing.append(table)
+        if report.dry_run:
+            report.opened = [(t, 0.0, None) for t in missing]
+            return
+
+        def alter(table: str):
+            start = time.perf_counter()
+            try:
+                with self.session() as cur:
+                    self._add_date_column(cur, table, col)
+            except self.backend.Error as e:
+                return table, time.perf_counter() - start, e
+            return table, time.perf_counter() - start, None
+
+        if workers > 1 and len(missing) > 1:
+            with ThreadPoolExecutor(max_workers=min(workers, len(missing))) as ex:
+                results = list(ex.map(alter, missing))
+        else:
+            results = [alter(t) for t in missing]
+        for table, seconds, err in results:
+            if err is None:
+                report.opened.append((table, seconds, None))
+            else:
+                report.errors[table] = str(err)
+
+    def _open_day_long(self, dt: datetime, report: DayOpeningReport) -> None:
+        tables = self.class_table_names()
         for table in tables:
             self._validate_identifier(table)
+        if not tables:
+            return
+        day = self._date_value(dt)
+        with self.session() as cur:
+            self._ensure_attendance_table(cur)
+            start = time.perf_counter()
+            counts = " UNION ALL ".join(f"""
+                SELECT %s, COUNT(*) FROM `{t}` c
+                LEFT JOIN `{self.ATTENDANCE_TABLE}` a ON a.class_id = %s AND a.roll_no = c.Roll_no AND a.date = %s
+                WHERE a.roll_no IS NULL""" for t in tables)
+            cur.execute(counts, tuple(v for t in tables for v in (t, t, day)))
+            pending = {row[0]: int(row[1]) for row in cur.fetchall()}
+            count_time = time.perf_counter() - start
+            todo = [t for t in tables if pending.get(t)]
+            report.already_open = [t for t in tables if not pending.get(t)]
+            if report.dry_run or not todo:
+                report.opened = [(t, 0.0, pending[t]) for t in todo]
+                return
+            start = time.perf_counter()
+            selects = " UNION ALL ".join(f"SELECT %s, Roll_no, %s, 'Absent' FROM `{t}`" for t in todo)
             try:
-                if not self._column_exists(table, col):
-                    alter = f"ALTER TABLE `{table}` ADD COLUMN `{col}` VARCHAR(20) DEFAULT 'Absent';"
-                    self.cursor.execute(alter)
-                    self.conn.commit()
-            except mysql.connector.Error as e:
-
-                raise RuntimeError(f"Failed to add column {col} to {table}: {e}") from e
+                opening = {t: self._students_without_row(cur, t, dt) for t in todo} if self.has_summary() else {}
+                cur.execute(
+                    f"{self.backend.insert_ignore} `{self.ATTENDANCE_TABLE}` (class_id, roll_no, date, status) {selects};",
+                    tuple(v for t in todo for v in (t, day)),
+                )
+                for t, rolls in opening.items():
+                    self._summary_deltas(cur, t, dt, [(r, 0, 1) for r in rolls])
+            except self.backend.Error as e:
+                report.errors = {t: str(e) for t in todo}
+                return
+            # one statement for every class: each table is reported with the shared batch time
+            seconds = count_time + time.perf_counter() - start
+            report.opened = [(t, seconds, pending[t]) for t in todo]
 
 
     # Marking attendance
@@ -178,16 +1091,22 @@ class AttendanceDB:
         """Mark every student in class_name as 'Present' for the provided date (default: today)."""
         self._validate_identifier(class_name)
         col = self._date_column_name(dt)
-        self.connect()
 
-        if not self._column_exists(class_name, col):
+        with self.session() as cur, self._summary_tracking(cur, class_name, dt):
+            if self.is_long_format:
+                self._ensure_attendance_table(cur)
+                cur.execute(f"""
+                    INSERT INTO `{self.ATTENDANCE_TABLE}` (class_id, roll_no, date, status)
+                    SELECT %s, Roll_no, %s, 'Present' FROM `{class_name}` WHERE 1 = 1
+                    {self._status_upsert};
+                """, (class_name, self._date_value(dt)))
+                return
 
-            self.cursor.execute(f"ALTER TABLE `{class_name}` ADD COLUMN `{col}` VARCHAR(20) DEFAULT 'Absent';")
-            self.conn.commit()
+            if not self._column_exists(class_name, col):
+                self._add_date_column(cur, class_name, col)
 
-        update = f"UPDATE `{class_name}` SET `{col}` = %s;"
-        self.cursor.execute(update, ("Present",))
-        self.conn.commit()
+            update = f"UPDATE `{class_name}` SET `{col}` = %s;"
+            cur.execute(update, ("Present",))
 
     def custom_marking_absent(self, class_name: str, absent_rolls: Iterable[int], dt: Optional[datetime] = None) -> None:
         """
@@ -200,61 +1119,671 @@ class AttendanceDB:
             return
 
         col = self._date_column_name(dt)
-        self.connect()
+        with self.session() as cur, self._summary_tracking(cur, class_name, dt):
+            if self.is_long_format:
+                self._ensure_attendance_table(cur)
+                day = self._date_value(dt)
+                # every student has a row once the day is open; rolls not in the class are ignored
+                self._open_long_day(cur, class_name, dt)
+                for chunk in _chunks([int(r) for r in rolls], self.BATCH_ROWS):
+                    cur.execute(f"""
+                        UPDATE `{self.ATTENDANCE_TABLE}` SET status = 'Absent'
+                        WHERE class_id = %s AND date = %s AND roll_no IN ({','.join(['%s'] * len(chunk))});
+                    """, (class_name, day, *chunk))
+                return
+
+            if not self._column_exists(class_name, col):
+                self._add_date_column(cur, class_name, col)
+
+            placeholders = ",".join(["%s"] * len(rolls))
+            query = f"UPDATE `{class_name}` SET `{col}` = %s WHERE Roll_no IN ({placeholders});"
+            params = ["Absent"] + rolls
+            cur.execute(query, tuple(params))
+
+    @staticmethod
+    def school_days(start: date, end: date, skip_weekends: bool = True) -> List[date]:
+        """Dates from start to end (inclusive), leaving out Saturdays and Sundays unless skip_weekends is False."""
+        start = start.date() if isinstance(start, datetime) else start
+        end = end.date() if isinstance(end, datetime) else end
+        days = [date.fromordinal(n) for n in range(start.toordinal(), end.toordinal() + 1)]
+        return [d for d in days if d.weekday() not in (5, 6)] if skip_weekends else days
+
+    def mark_attendance_range(self, class_name: str, start: date, end: date,
+                              absent: Optional[Mapping[date, Iterable[int]]] = None,
+                              skip_weekends: bool = True) -> List[date]:
+        """
+        Record attendance for every date from start to end (inclusive) in one session: on each
+        date the rolls in absent[date] are 'Absent' and every other student 'Present' (dates
+        without an entry are all 'Present'). Weekends are skipped like add_columns_for_today
+        unless skip_weekends is False; absences for a date that is not marked are a ValueError.
+        Wide format adds the missing date columns with one ALTER TABLE and writes every date
+        with one UPDATE; on MySQL that DDL commits implicitly, so only the status writes are
+        rolled back on error. Long format upserts each date with one INSERT ... SELECT.
+        Returns the dates marked.
+        """
+        self._validate_identifier(class_name)
+        start = start.date() if isinstance(start, datetime) else start
+        end = end.date() if isinstance(end, datetime) else end
+        if start > end:
+            raise ValueError("Start date must not be after end date.")
+        days = self.school_days(start, end, skip_weekends)
+        absent_by_day = {}
+        for key, rolls in (absent or {}).items():
+            day = key.date() if isinstance(key, datetime) else key
+            absent_by_day[day] = sorted({int(r) for r in rolls})
+        stray = sorted(set(absent_by_day) - set(days))
+        if stray:
+            raise ValueError("Absences given for dates that are not being marked: "
+                             + ", ".join(d.isoformat() for d in stray))
+        if not days:
+            return []
+        stamps = [datetime.combine(d, datetime.min.time()) for d in days]
+
+        def status_expr(rolls: List[int]) -> str:
+            if not rolls:
+                return "'Present'"
+            return f"CASE WHEN Roll_no IN ({','.join(['%s'] * len(rolls))}) THEN 'Absent' ELSE 'Present' END"
+
+        with self.session() as cur, ExitStack() as tracking:
+            for dt in stamps:
+                tracking.enter_context(self._summary_tracking(cur, class_name, dt))
+            if self.is_long_format:
+                self._ensure_attendance_table(cur)
+                for dt, day in zip(stamps, days):
+                    rolls = absent_by_day.get(day, [])
+                    cur.execute(f"""
+                        INSERT INTO `{self.ATTENDANCE_TABLE}` (class_id, roll_no, date, status)
+                        SELECT %s, Roll_no, %s, {status_expr(rolls)} FROM `{class_name}` WHERE 1 = 1
+                        {self._status_upsert};
+                    """, (class_name, self._date_value(dt), *rolls))
+                return days
+
+            cols = [self._date_column_name(dt) for dt in stamps]
+            existing = self._schema(refresh=True).get(class_name, set())
+            self._add_date_columns(cur, class_name, [c for c in cols if c not in existing])
+            # as few UPDATEs as the bind-parameter budget allows, usually one for the whole range
+            assignments, params = [], []
+            for col, day in zip(cols, days):
+                rolls = absent_by_day.get(day, [])
+                if assignments and len(params) + len(rolls) > self.BATCH_ROWS:
+                    cur.execute(f"UPDATE `{class_name}` SET {', '.join(assignments)};", tuple(params))
+                    assignments, params = [], []
+                assignments.append(f"`{col}` = {status_expr(rolls)}")
+                params.extend(rolls)
+            cur.execute(f"UPDATE `{class_name}` SET {', '.join(assignments)};", tuple(params))
+        return days
+
+    # Attendance summary
+    def has_summary(self) -> bool:
+        """True once rebuild_summary() has created the summary tables; writes keep them current from then on."""
+        return self.SUMMARY_STUDENT_TABLE in self._schema()
+
+    def _summary_deltas(self, cur, class_name: str, dt: Optional[datetime], deltas: List[Tuple[int, int, int]]) -> None:
+        """Add (roll, present, absent) deltas to the student rows and their sum to the class's day row."""
+        if not deltas:
+            return
+        upsert = self.backend.upsert(("class_id", "roll_no"), ("present", "absent"), add=True)
+        for chunk in _chunks(deltas, self.BATCH_ROWS):
+            values = ", ".join(["(%s, %s, %s, %s)"] * len(chunk))
+            cur.execute(f"""
+                INSERT INTO `{self.SUMMARY_STUDENT_TABLE}` (class_id, roll_no, present, absent)
+                VALUES {values}
+                {upsert};
+            """, tuple(v for r, p, a in chunk for v in (class_name, r, p, a)))
+        cur.execute(f"""
+            INSERT INTO `{self.SUMMARY_DAY_TABLE}` (class_id, date, present, absent)
+            VALUES (%s, %s, %s, %s)
+            {self.backend.upsert(("class_id", "date"), ("present", "absent"), add=True)};
+        """, (class_name, self._date_value(dt), sum(d[1] for d in deltas), sum(d[2] for d in deltas)))
+
+    def _roll_filter(self, column: str, rolls: Optional[List[int]]) -> Tuple[str, tuple]:
+        """SQL suffix and params restricting column to rolls (no restriction when rolls is None)."""
+        if rolls is None:
+            return "", ()
+        return f" AND {column} IN ({','.join(['%s'] * len(rolls))})", tuple(rolls)
+
+    def _summary_tracked(self) -> set:
+        tracked = getattr(self._local, "summary_tracked", None)
+        if tracked is None:
+            tracked = self._local.summary_tracked = set()
+        return tracked
+
+    def _day_statuses(self, cur, class_name: str, dt: Optional[datetime], rolls: Optional[List[int]] = None) -> dict:
+        """{roll: status} of the recorded cells for the date, optionally limited to rolls."""
+        if self.is_long_format:
+            where, params = self._roll_filter("roll_no", rolls)
+            cur.execute(f"""
+                SELECT roll_no, status FROM `{self.ATTENDANCE_TABLE}`
+                WHERE class_id = %s AND date = %s{where};
+            """, (class_name, self._date_value(dt), *params))
+            return dict(cur.fetchall())
+        col = self._date_column_name(dt)
         if not self._column_exists(class_name, col):
-            self.cursor.execute(f"ALTER TABLE `{class_name}` ADD COLUMN `{col}` VARCHAR(20) DEFAULT 'Absent';")
-            self.conn.commit()
+            return {}
+        where, params = self._roll_filter("Roll_no", rolls)
+        cur.execute(f"SELECT Roll_no, `{col}` FROM `{class_name}` WHERE 1 = 1{where};", params)
+        return {roll: status if status is not None else "Absent" for roll, status in cur.fetchall()}
 
-        placeholders = ",".join(["%s"] * len(rolls))
-        query = f"UPDATE `{class_name}` SET `{col}` = %s WHERE Roll_no IN ({placeholders});"
-        params = ["Absent"] + rolls
-        self.cursor.execute(query, tuple(params))
-        self.conn.commit()
+    @contextmanager
+    def _summary_tracking(self, cur, class_name: str, dt: Optional[datetime], rolls: Optional[List[int]] = None):
+        """
+        Keep the summary in step with the status changes made to class_name on the date inside the
+        block: the date's cells are read before and after and only the difference is applied, in the
+        caller's transaction. Nested tracking of the same class and date is folded into the outer one.
+        """
+        key = (class_name, self._date_column_name(dt))
+        tracked = self._summary_tracked()
+        if key in tracked or not self.has_summary():
+            yield
+            return
+        tracked.add(key)
+        try:
+            before = self._day_statuses(cur, class_name, dt, rolls)
+            yield
+            after = self._day_statuses(cur, class_name, dt, rolls)
+        finally:
+            tracked.discard(key)
+        deltas = []
+        for roll, status in after.items():
+            present = status == "Present"
+            old = before.get(roll)
+            if old is None:
+                deltas.append((roll, int(present), int(not present)))
+            elif (old == "Present") != present:
+                deltas.append((roll, 1 if present else -1, -1 if present else 1))
+        for roll in before.keys() - after.keys():
+            was_present = before[roll] == "Present"
+            deltas.append((roll, -int(was_present), -int(not was_present)))
+        self._summary_deltas(cur, class_name, dt, deltas)
+
+    def _summary_open_day(self, cur, table: str, dt: Optional[datetime]) -> None:
+        """A new date column starts 'Absent' for every student of the (wide) table."""
+        if (table, self._date_column_name(dt)) in self._summary_tracked() or not self.has_summary():
+            return
+        cur.execute(f"SELECT Roll_no FROM `{table}`;")
+        self._summary_deltas(cur, table, dt, [(r[0], 0, 1) for r in cur.fetchall()])
+
+    def _summary_new_students(self, cur, class_name: str, rolls: Iterable[int]) -> List[int]:
+        """Return which of rolls are not yet in class_name (call before inserting them)."""
+        rolls = list(set(rolls))
+        if not rolls or not self.has_summary():
+            return []
+        existing = set()
+        for chunk in _chunks(rolls, self.BATCH_ROWS):
+            cur.execute(f"SELECT Roll_no FROM `{class_name}` WHERE Roll_no IN ({','.join(['%s'] * len(chunk))});",
+                        tuple(chunk))
+            existing.update(r[0] for r in cur.fetchall())
+        return [r for r in rolls if r not in existing]
+
+    def _summary_add_students(self, cur, class_name: str, rolls: List[int]) -> None:
+        """New students of a wide table are 'Absent' (the column default) on every recorded date."""
+        if not rolls or self.is_long_format:
+            return
+        days = sum(1 for c in self._schema().get(class_name, ()) if self.DATE_COLUMN_RE.match(c))
+        if not days:
+            return
+        for chunk in _chunks(rolls, self.BATCH_ROWS):
+            values = ", ".join(["(%s, %s, %s, %s)"] * len(chunk))
+            cur.execute(f"""
+                INSERT INTO `{self.SUMMARY_STUDENT_TABLE}` (class_id, roll_no, present, absent)
+                VALUES {values}
+                {self.backend.upsert(("class_id", "roll_no"), ("present", "absent"))};
+            """, tuple(v for r in chunk for v in (class_name, r, 0, days)))
+        cur.execute(f"UPDATE `{self.SUMMARY_DAY_TABLE}` SET absent = absent + %s WHERE class_id = %s;",
+                    (len(rolls), class_name))
+
+    def _summary_remove_students(self, cur, class_name: str, rolls: Optional[List[int]] = None) -> None:
+        """Take students (all of them when rolls is None) out of the summary; call before deleting them."""
+        if not self.has_summary():
+            return
+        if self.is_long_format:
+            where, params = self._roll_filter("roll_no", rolls)
+            cur.execute(f"""
+                SELECT date, SUM(CASE WHEN status = 'Present' THEN 1 ELSE 0 END), COUNT(*)
+                FROM `{self.ATTENDANCE_TABLE}` WHERE class_id = %s{where} GROUP BY date;
+            """, (class_name, *params))
+            per_day = [(d, int(p), int(n) - int(p)) for d, p, n in cur.fetchall()]
+        else:
+            cols = sorted(c for c in self._schema().get(class_name, ()) if self.DATE_COLUMN_RE.match(c))
+            per_day = []
+            if cols:
+                where, params = self._roll_filter("Roll_no", rolls)
+                sums = ", ".join(f"SUM(COALESCE(`{c}` = 'Present', 0))" for c in cols)
+                cur.execute(f"SELECT COUNT(*), {sums} FROM `{class_name}` WHERE 1 = 1{where};", params)
+                row = cur.fetchone()
+                count = int(row[0])
+                per_day = [(self._date_value(datetime.strptime(c, "%Y_%m_%d")), int(p or 0), count - int(p or 0))
+                           for c, p in zip(cols, row[1:])]
+        cur.executemany(f"""
+            UPDATE `{self.SUMMARY_DAY_TABLE}` SET present = present - %s, absent = absent - %s
+            WHERE class_id = %s AND date = %s;
+        """, [(p, a, class_name, d) for d, p, a in per_day if p or a])
+        where, params = self._roll_filter("roll_no", rolls)
+        cur.execute(f"DELETE FROM `{self.SUMMARY_STUDENT_TABLE}` WHERE class_id = %s{where};", (class_name, *params))
+
+    def rebuild_summary(self, class_names: Optional[Iterable[str]] = None) -> int:
+        """
+        Create the summary tables if needed and recompute them from the raw attendance of every
+        class (or of class_names), one transaction per class. Counts cover every recorded date:
+        'Present' cells count as present, any other status as absent. Safe to run at any time to
+        reconcile the summary after out-of-band edits. Returns the number of classes rebuilt.
+        """
+        with self.session() as cur:
+            for statement in self.backend.summary_tables_ddl(self.SUMMARY_STUDENT_TABLE, self.SUMMARY_DAY_TABLE):
+                cur.execute(statement)
+        self.schema_cache.add_table(self.SUMMARY_STUDENT_TABLE, ("class_id", "roll_no", "present", "absent"))
+        self.schema_cache.add_table(self.SUMMARY_DAY_TABLE, ("class_id", "date", "present", "absent"))
+        names = list(class_names) if class_names is not None else self.class_table_names()
+        self._schema(refresh=True)
+        for class_name in names:
+            self._validate_identifier(class_name)
+            with self.session() as cur:
+                self._rebuild_class_summary(cur, class_name)
+        return len(names)
+
+    def _rebuild_class_summary(self, cur, class_name: str) -> None:
+        cur.execute(f"DELETE FROM `{self.SUMMARY_STUDENT_TABLE}` WHERE class_id = %s;", (class_name,))
+        cur.execute(f"DELETE FROM `{self.SUMMARY_DAY_TABLE}` WHERE class_id = %s;", (class_name,))
+        if self.is_long_format:
+            self._ensure_attendance_table(cur)
+            present = "SUM(CASE WHEN a.status = 'Present' THEN 1 ELSE 0 END)"
+            absent = "SUM(CASE WHEN a.status = 'Present' THEN 0 ELSE 1 END)"
+            for key, table in (("roll_no", self.SUMMARY_STUDENT_TABLE), ("date", self.SUMMARY_DAY_TABLE)):
+                cur.execute(f"""
+                    INSERT INTO `{table}` (class_id, {key}, present, absent)
+                    SELECT %s, a.{key}, {present}, {absent}
+                    FROM `{self.ATTENDANCE_TABLE}` a JOIN `{class_name}` c ON c.Roll_no = a.roll_no
+                    WHERE a.class_id = %s GROUP BY a.{key};
+                """, (class_name, class_name))
+            return
+        cols = sorted(c for c in self._schema().get(class_name, ()) if self.DATE_COLUMN_RE.match(c))
+        flags = [f"COALESCE(`{c}` = 'Present', 0)" for c in cols]
+        present = " + ".join(flags) or "0"
+        cur.execute(f"""
+            INSERT INTO `{self.SUMMARY_STUDENT_TABLE}` (class_id, roll_no, present, absent)
+            SELECT %s, Roll_no, {present}, {len(cols)} - ({present}) FROM `{class_name}`;
+        """, (class_name,))
+        if cols:
+            cur.execute(f"SELECT COUNT(*), {', '.join(f'SUM({f})' for f in flags)} FROM `{class_name}`;")
+            row = cur.fetchone()
+            count = int(row[0])
+            cur.executemany(f"""
+                INSERT INTO `{self.SUMMARY_DAY_TABLE}` (class_id, date, present, absent)
+                VALUES (%s, %s, %s, %s);
+            """, [(class_name, self._date_value(datetime.strptime(c, "%Y_%m_%d")), int(p or 0),
+                   count - int(p or 0)) for c, p in zip(cols, row[1:])])
+
+    def _require_summary(self) -> None:
+        if not self.has_summary():
+            raise RuntimeError("The attendance summary has not been built yet; run rebuild_summary() once.")
+
+    def fetch_attendance_summary(self, class_name: str) -> List[Tuple[int, str, int, int]]:
+        """(Roll_no, Student_name, present, absent) for every student from the summary table, ordered by roll."""
+        self._validate_identifier(class_name)
+        self._require_summary()
+        with self.session() as cur:
+            cur.execute(f"""
+                SELECT c.Roll_no, c.Student_name, COALESCE(s.present, 0), COALESCE(s.absent, 0)
+                FROM `{class_name}` c
+                LEFT JOIN `{self.SUMMARY_STUDENT_TABLE}` s ON s.class_id = %s AND s.roll_no = c.Roll_no
+                ORDER BY c.Roll_no;
+            """, (class_name,))
+            return [(r[0], r[1], int(r[2]), int(r[3])) for r in cur.fetchall()]
+
+    def fetch_day_summary(self, class_name: str, start: Optional[date] = None,
+                          end: Optional[date] = None) -> List[Tuple[date, int, int]]:
+        """(date, present, absent) per recorded date of class_name from the summary table, oldest first."""
+        self._validate_identifier(class_name)
+        self._require_summary()
+        query = f"SELECT date, present, absent FROM `{self.SUMMARY_DAY_TABLE}` WHERE class_id = %s"
+        params: list = [class_name]
+        if start is not None:
+            query += " AND date >= %s"
+            params.append(self._date_value(start))
+        if end is not None:
+            query += " AND date <= %s"
+            params.append(self._date_value(end))
+        with self.session() as cur:
+            cur.execute(query + " ORDER BY date;", tuple(params))
+            return [(d if isinstance(d, date) else date.fromisoformat(str(d)), int(p), int(a))
+                    for d, p, a in cur.fetchall()]
+
+    # Attendance bitmaps
+    def has_bitmaps(self) -> bool:
+        """True once pack_attendance() has created the bitmap table."""
+        return self.BITMAP_TABLE in self._schema()
+
+    def _class_day_statuses(self, cur, class_name: str, start: Optional[date] = None,
+                            end: Optional[date] = None) -> List[Tuple[date, List[Tuple[int, str]]]]:
+        """(date, [(roll, status)]) for each recorded date of class_name, oldest first; only class members."""
+        if self.is_long_format:
+            self._ensure_attendance_table(cur)
+            query = f"""
+                SELECT a.date, a.roll_no, a.status
+                FROM `{self.ATTENDANCE_TABLE}` a JOIN `{class_name}` c ON c.Roll_no = a.roll_no
+                WHERE a.class_id = %s"""
+            params: list = [class_name]
+            if start is not None:
+                query += " AND a.date >= %s"
+                params.append(self._date_value(start))
+            if end is not None:
+                query += " AND a.date <= %s"
+                params.append(self._date_value(end))
+            cur.execute(query + " ORDER BY a.date;", tuple(params))
+            out: List[Tuple[date, List[Tuple[int, str]]]] = []
+            for day, roll, status in cur.fetchall():
+                if not out or out[-1][0] != day:
+                    out.append((day, []))
+                out[-1][1].append((roll, status))
+            return [(d if isinstance(d, date) else date.fromisoformat(str(d)), rows) for d, rows in out]
+
+        low = start.strftime("%Y_%m_%d") if start is not None else ""
+        high = end.strftime("%Y_%m_%d") if end is not None else "9999_99_99"
+        cols = sorted(c for c in self._schema().get(class_name, ())
+                      if self.DATE_COLUMN_RE.match(c) and low <= c <= high)
+        if not cols:
+            return []
+        cur.execute(f"SELECT Roll_no, {', '.join(f'`{c}`' for c in cols)} FROM `{class_name}`;")
+        rows = cur.fetchall()
+        return [(datetime.strptime(c, "%Y_%m_%d").date(), [(r[0], r[i + 1] or "Absent") for r in rows])
+                for i, c in enumerate(cols)]
+
+    def pack_attendance(self, class_names: Optional[Iterable[str]] = None, start: Optional[date] = None,
+                        end: Optional[date] = None) -> int:
+        """
+        Store every recorded date of every class (or of class_names) between start and end as a
+        packed DayBitmap, replacing earlier packs of the same days; one transaction per class.
+        Bitmaps are a snapshot for fast range reads and are not touched by later writes, so
+        re-pack days whose attendance changed. Returns the number of class-days packed.
+        """
+        with self.session() as cur:
+            for statement in self.backend.bitmap_table_ddl(self.BITMAP_TABLE):
+                cur.execute(statement)
+        self.schema_cache.add_table(self.BITMAP_TABLE, ("class_id", "date", "bitmap"))
+        names = list(class_names) if class_names is not None else self.class_table_names()
+        upsert = self.backend.upsert(("class_id", "date"), ("bitmap",))
+        packed = 0
+        for class_name in names:
+            self._validate_identifier(class_name)
+            with self.session() as cur:
+                rows = [(class_name, self._date_value(day), DayBitmap.from_statuses(statuses).encode())
+                        for day, statuses in self._class_day_statuses(cur, class_name, start, end)]
+                if rows:
+                    cur.executemany(f"""
+                        INSERT INTO `{self.BITMAP_TABLE}` (class_id, date, bitmap)
+                        VALUES (%s, %s, %s)
+                        {upsert};
+                    """, rows)
+            packed += len(rows)
+        return packed
+
+    def fetch_day_bitmaps(self, class_name: str, start: Optional[date] = None,
+                          end: Optional[date] = None) -> List[Tuple[date, DayBitmap]]:
+        """(date, DayBitmap) for each packed date of class_name between start and end, oldest first."""
+        self._validate_identifier(class_name)
+        if not self.has_bitmaps():
+            raise RuntimeError("No attendance has been packed yet; run pack_attendance() first.")
+        query = f"SELECT date, bitmap FROM `{self.BITMAP_TABLE}` WHERE class_id = %s"
+        params: list = [class_name]
+        if start is not None:
+            query += " AND date >= %s"
+            params.append(self._date_value(start))
+        if end is not None:
+            query += " AND date <= %s"
+            params.append(self._date_value(end))
+        with self.session() as cur:
+            cur.execute(query + " ORDER BY date;", tuple(params))
+            return [(d if isinstance(d, date) else date.fromisoformat(str(d)), DayBitmap.decode(blob))
+                    for d, blob in cur.fetchall()]
+
+    # Migration
+    def migrate_to_long_format(self, drop_columns: bool = False) -> int:
+        """
+        Pivot every YYYY_MM_DD column of every class table into the long-format attendance table.
+        Safe to re-run: existing (class, roll, date) rows are overwritten with the column value.
+        With drop_columns=True the migrated date columns are removed in one ALTER per table.
+        Returns the number of rows written. Construct AttendanceDB(storage="long") afterwards, and
+        run rebuild_summary() on it if the summary tables are in use.
+        """
+        migrated = 0
+        schema = self._schema(refresh=True)
+        for table in self.class_table_names():
+            self._validate_identifier(table)
+            try:
+                with self.session() as cur:
+                    self._ensure_attendance_table(cur)
+                    date_cols = sorted(c for c in schema.get(table, ()) if self.DATE_COLUMN_RE.match(c))
+                    for col in date_cols:
+                        day = datetime.strptime(col, "%Y_%m_%d").date()
+                        cur.execute(f"""
+                            INSERT INTO `{self.ATTENDANCE_TABLE}` (class_id, roll_no, date, status)
+                            SELECT %s, Roll_no, %s, COALESCE(`{col}`, 'Absent') FROM `{table}` WHERE 1 = 1
+                            {self._status_upsert};
+                        """, (table, self.backend.date_param(day)))
+                        migrated += max(cur.rowcount, 0)
+                if drop_columns and date_cols:
+                    with self.session() as cur:
+                        for statement in self.backend.drop_columns(table, date_cols):
+                            cur.execute(statement)
+                    self.schema_cache.drop_columns(table, date_cols)
+            except self.backend.Error as e:
+                raise RuntimeError(f"Failed to migrate attendance columns of {table}: {e}") from e
+        return migrated
 
     # Inserts / deletes
-    def add_data_from_csv(self, path: str, class_name: str, has_header: bool = False) -> None:
-        """Insert rows from CSV file (Student_name, Roll_no). Uses ON DUPLICATE KEY UPDATE to update name if roll exists."""
+    def add_data_from_csv(self, path: str, class_name: str, has_header: bool = False, *,
+                          progress: Optional[Callable[[int, int], None]] = None,
+                          cancel: Optional[Callable[[], bool]] = None) -> None:
+        """
+        Insert rows from CSV file (Student_name, Roll_no). Upserts, so the name is updated if roll exists.
+        All-or-nothing: a malformed row raises ValueError and nothing is committed. The file is still
+        streamed in chunks; see import_csv for chunked commits, reject files and resumable imports.
+        """
+        with self.session():
+            self.import_csv(path, class_name, has_header=has_header, strict=True, progress=progress, cancel=cancel)
+
+    def import_csv(self, path: str, class_name: str, chunk_size: int = 1000, has_header: Optional[bool] = None,
+                   checkpoint_path: Optional[str] = None, reject_path: Optional[str] = None, strict: bool = False,
+                   progress: Optional[Callable[[int, int], None]] = None,
+                   cancel: Optional[Callable[[], bool]] = None, method: str = "batched") -> ImportReport:
+        """
+        Stream a (Student_name, Roll_no) CSV into class_name, committing every chunk_size rows.
+        has_header=None detects a header row. Invalid rows go to reject_path (or a sample on the
+        report) instead of aborting the import; strict=True raises ValueError instead.
+        With checkpoint_path, progress is recorded after each committed chunk and re-running the
+        same unchanged file resumes after it; the checkpoint is removed once the import completes.
+        progress(rows_done, estimated_total_rows) is called per chunk and cancel() is polled per
+        chunk, raising OperationCancelled (committed chunks stay and can be resumed).
+        method="load_data" (MySQL only) stages the file with LOAD DATA LOCAL INFILE and merges it in
+        one transaction (no chunks or checkpoint); if the backend, client or server cannot do local
+        infile the batched path is used instead and report.method says so.
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1.")
+        if method not in self.IMPORT_METHODS:
+            raise ValueError(f"Unknown import method: {method!r}. Use one of {self.IMPORT_METHODS}.")
         self._validate_identifier(class_name)
-        self.connect()
         self.create_table_for_class(class_name)
 
-        with open(path, newline="", encoding="utf-8") as fh:
-            reader = csv.reader(fh)
-            if has_header:
-                next(reader, None)
-            rows_to_insert = []
+        fallback = None
+        if method == "load_data" and not self.backend.supports_load_data:
+            fallback = f"batched (load_data not supported by {self.backend.name})"
+        elif method == "load_data":
+            if cancel is not None and cancel():
+                raise OperationCancelled("CSV import cancelled.")
+            try:
+                return self._import_load_data(path, class_name, has_header, reject_path, strict, progress)
+            except self.backend.Error as e:
+                if not self.backend.is_local_infile_refused(e):
+                    raise
+            fallback = "batched (local infile unavailable)"
+        report = ImportReport(path, class_name)
+        if fallback:
+            report.method = fallback
+        checkpoint = ImportCheckpoint(checkpoint_path, path, class_name) if checkpoint_path else None
+        skip = checkpoint.load() if checkpoint else 0
+        report.resumed_from = skip
+        rejects = RejectSink(report, reject_path, append=skip > 0)
+        source = ByteCountingLines(path)
+        started = time.perf_counter()
+        query = f"""
+        INSERT INTO `{class_name}` (Student_name, Roll_no)
+        VALUES (%s, %s)
+        {self.backend.upsert(("Roll_no",), ("Student_name",))};
+        """
+
+        def flush(chunk: list, consumed: int) -> None:
+            if chunk:
+                with self.session() as cur:
+                    new_rolls = self._summary_new_students(cur, class_name, (r for _, r in chunk))
+                    cur.executemany(query, chunk)
+                    self._summary_add_students(cur, class_name, new_rolls)
+                    self._bump_roster_version(cur, class_name)
+                report.rows_written += len(chunk)
+                report.chunks += 1
+            if checkpoint:
+                checkpoint.save(consumed)
+            if progress is not None and source.bytes_read:
+                progress(consumed, max(consumed, int(consumed * source.total_bytes / source.bytes_read)))
+
+        try:
+            reader = csv.reader(source)
+            consumed = 0
+            chunk = []
+            first = True
             for row in reader:
-                if not row:
+                if not row or not any(c.strip() for c in row):
+                    continue
+                if first:
+                    first = False
+                    if looks_like_header(row) if has_header is None else has_header:
+                        report.header_detected = True
+                        continue
+                consumed += 1
+                if consumed <= skip:
                     continue
-                if len(row) < 2:
-                    raise ValueError(f"CSV row must have at least 2 columns: {row}")
-                name = row[0].strip()
-                roll = int(row[1])
-                rows_to_insert.append((name, roll))
+                report.rows_read += 1
+                try:
+                    chunk.append(parse_roster_row(row))
+                except ValueError as e:
+                    if strict:
+                        raise ValueError(f"CSV line {reader.line_num}: {e}: {row}") from None
+                    rejects.add(reader.line_num, row, str(e))
+                if report.rows_read % chunk_size == 0:
+                    flush(chunk, consumed)
+                    chunk = []
+                    if cancel is not None and cancel():
+                        raise OperationCancelled("CSV import cancelled.")
+            if cancel is not None and cancel():
+                raise OperationCancelled("CSV import cancelled.")
+            flush(chunk, consumed)
+            if checkpoint:
+                checkpoint.clear()
+        finally:
+            source.close()
+            rejects.close()
+            report.elapsed = time.perf_counter() - started
+        return report
 
-            if not rows_to_insert:
-                return
+    def _import_load_data(self, path: str, class_name: str, has_header: Optional[bool],
+                          reject_path: Optional[str], strict: bool,
+                          progress: Optional[Callable[[int, int], None]]) -> ImportReport:
+        """LOAD DATA LOCAL INFILE into a temporary staging table, then one INSERT ... SELECT merge."""
+        report = ImportReport(path, class_name)
+        report.method = "load_data"
+        started = time.perf_counter()
+        if has_header is None:
+            with open(path, newline="", encoding="utf-8-sig") as fh:
+                first = next((r for r in csv.reader(fh) if r and any(c.strip() for c in r)), None)
+            has_header = first is not None and looks_like_header(first)
+        report.header_detected = bool(has_header)
 
-            query = f"""
-            INSERT INTO `{class_name}` (Student_name, Roll_no)
-            VALUES (%s, %s)
-            ON DUPLICATE KEY UPDATE Student_name = VALUES(Student_name);
-            """
-            self.cursor.executemany(query, rows_to_insert)
-            self.conn.commit()
+        staging = "roster_import_staging"  # temporary tables are private to the session's connection
+        valid = ("Student_name <> '' AND CHAR_LENGTH(Student_name) <= 255 AND Roll_raw REGEXP '^[0-9]+$' "
+                 "AND CAST(Roll_raw AS UNSIGNED) BETWEEN 1 AND 2147483647")
+        blank = "(Student_name = '' AND COALESCE(Roll_raw, '') = '')"
+        rejects = RejectSink(report, reject_path)
+        try:
+            with self.session() as cur:
+                cur.execute(f"DROP TEMPORARY TABLE IF EXISTS `{staging}`;")
+                cur.execute(f"""
+                    CREATE TEMPORARY TABLE `{staging}` (
+                        line_no INT AUTO_INCREMENT PRIMARY KEY,
+                        Student_name VARCHAR(1024),
+                        Roll_raw VARCHAR(64)
+                    ) ENGINE=InnoDB;
+                """)
+                try:
+                    cur.execute(f"""
+                        LOAD DATA LOCAL INFILE %s INTO TABLE `{staging}`
+                        CHARACTER SET utf8mb4
+                        FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"'
+                        LINES TERMINATED BY '\n'
+                        IGNORE {1 if has_header else 0} LINES
+                        (@name, @roll)
+                        SET Student_name = TRIM(@name),
+                            Roll_raw = TRIM(TRIM(TRAILING '\r' FROM COALESCE(@roll, '')));
+                    """, (os.path.abspath(path),))
+                    cur.execute(f"SELECT COUNT(*) FROM `{staging}` WHERE NOT {blank};")
+                    report.rows_read = int(cur.fetchone()[0])
+
+                    cur.execute(f"""
+                        SELECT line_no, Student_name, Roll_raw FROM `{staging}`
+                        WHERE NOT ({valid}) AND NOT {blank} ORDER BY line_no;
+                    """)
+                    for line_no, name, roll in cur.fetchall():
+                        row = [name or "", roll or ""]
+                        try:
+                            parse_roster_row(row)
+                            reason = "rejected by server-side validation"
+                        except ValueError as e:
+                            reason = str(e)
+                        if strict:
+                            raise ValueError(f"CSV row {line_no}: {reason}: {row}")
+                        rejects.add(line_no, row, reason)
+
+                    # later rows win for duplicate rolls, matching the batched path
+                    cur.execute(f"""
+                        INSERT INTO `{class_name}` (Student_name, Roll_no)
+                        SELECT Student_name, CAST(Roll_raw AS UNSIGNED) FROM `{staging}`
+                        WHERE {valid} ORDER BY line_no
+                        {self.backend.upsert(("Roll_no",), ("Student_name",))};
+                    """)
+                    report.rows_written = report.rows_read - report.rejected
+                    report.chunks = 1
+                    self._bump_roster_version(cur, class_name)
+                    if self.has_summary():
+                        self._rebuild_class_summary(cur, class_name)
+                finally:
+                    cur.execute(f"DROP TEMPORARY TABLE IF EXISTS `{staging}`;")
+        finally:
+            rejects.close()
+            report.elapsed = time.perf_counter() - started
+        if progress is not None:
+            progress(report.rows_read, report.rows_read)
+        return report
 
     def add_individual(self, class_name: str, student_name: str, roll_no: int) -> None:
         """Insert one student row; if roll exists update name."""
         self._validate_identifier(class_name)
-        self.connect()
         self.create_table_for_class(class_name)
         query = f"""
         INSERT INTO `{class_name}` (Student_name, Roll_no)
         VALUES (%s, %s)
-        ON DUPLICATE KEY UPDATE Student_name = VALUES(Student_name);
+        {self.backend.upsert(("Roll_no",), ("Student_name",))};
         """
-        self.cursor.execute(query, (student_name, int(roll_no)))
-        self.conn.commit()
+        with self.session() as cur:
+            new_rolls = self._summary_new_students(cur, class_name, [int(roll_no)])
+            cur.execute(query, (student_name, int(roll_no)))
+            self._summary_add_students(cur, class_name, new_rolls)
+            self._bump_roster_version(cur, class_name)
+
+    def rename_student(self, class_name: str, roll_no: int, student_name: str) -> None:
+        """Update the name of an existing student."""
+        self._validate_identifier(class_name)
+        with self.session() as cur:
+            cur.execute(f"UPDATE `{class_name}` SET Student_name=%s WHERE Roll_no=%s;", (student_name, int(roll_no)))
+            self._bump_roster_version(cur, class_name)
 
     def delete_data(self, class_name: str, roll_nos: Iterable[int]) -> None:
         """Delete specific roll numbers from class table."""
@@ -262,19 +1791,30 @@ class AttendanceDB:
         rolls = list(roll_nos)
         if not rolls:
             return
-        self.connect()
         placeholders = ",".join(["%s"] * len(rolls))
         query = f"DELETE FROM `{class_name}` WHERE Roll_no IN ({placeholders});"
-        self.cursor.execute(query, tuple(rolls))
-        self.conn.commit()
+        with self.session() as cur:
+            self._summary_remove_students(cur, class_name, rolls)
+            cur.execute(query, tuple(rolls))
+            self._bump_roster_version(cur, class_name)
+            if self.is_long_format:
+                self._ensure_attendance_table(cur)
+                cur.execute(
+                    f"DELETE FROM `{self.ATTENDANCE_TABLE}` WHERE class_id=%s AND roll_no IN ({placeholders});",
+                    (class_name, *rolls),
+                )
 
     def delete_all(self, class_name: str) -> None:
         """Delete every student row in the class (keeps table schema)."""
         self._validate_identifier(class_name)
-        self.connect()
         query = f"DELETE FROM `{class_name}`;"
-        self.cursor.execute(query)
-        self.conn.commit()
+        with self.session() as cur:
+            self._summary_remove_students(cur, class_name)
+            cur.execute(query)
+            self._bump_roster_version(cur, class_name)
+            if self.is_long_format:
+                self._ensure_attendance_table(cur)
+                cur.execute(f"DELETE FROM `{self.ATTENDANCE_TABLE}` WHERE class_id=%s;", (class_name,))
 
 if __name__ == "__main__":
     db = AttendanceDB("localhost", "root", "tsukasa911", "attendance", admin_password="parkar")
@@ -282,4 +1822,4 @@ if __name__ == "__main__":
     try:
         db.connect()
     except Exception as e:
-        raise SystemExit(f"Cannot connect to DB: {e}")
\ No newline at end of file
+        raise SystemExit(f"Cannot connect to DB: {e}")
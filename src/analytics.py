@@ -0,0 +1,141 @@
+"""
+Attendance analytics over date ranges: per-student percentage, absent count and streaks, and
+per-class and per-day totals.
+
+A class's presence matrix (students x recorded days, see AttendanceDB.fetch_presence_matrix)
+is fetched once and aggregated with NumPy when it is installed. Without NumPy the same figures
+come from bytes.count/split/rstrip on each student's row, which also run in C rather than
+visiting every cell from Python.
+"""
+import time
+from datetime import date, datetime
+from typing import List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+DEFAULT_THRESHOLD = 75.0
+
+class StudentStats:
+    """Attendance figures for one student over a report's days."""
+
+    __slots__ = ("roll", "name", "days", "present", "longest_streak", "present_streak", "absent_streak")
+
+    def __init__(self, roll: int, name: str, days: int, present: int, longest_streak: int,
+                 present_streak: int, absent_streak: int):
+        self.roll = roll
+        self.name = name
+        self.days = days
+        self.present = present
+        self.longest_streak = longest_streak    # longest run of consecutive 'Present' days
+        self.present_streak = present_streak    # 'Present' days up to the end of the range
+        self.absent_streak = absent_streak      # non-present days up to the end of the range
+
+    @property
+    def absent(self) -> int:
+        return self.days - self.present
+
+    @property
+    def percentage(self) -> float:
+        return 100.0 * self.present / self.days if self.days else 0.0
+
+class ClassReport:
+    """Per-student statistics and per-day totals for one class over a date range."""
+
+    def __init__(self, class_name: str, start: date, end: date, days: List[date],
+                 students: List[StudentStats], daily_present: List[int], elapsed: float):
+        self.class_name = class_name
+        self.start = start
+        self.end = end
+        self.days = days
+        self.students = students
+        self.daily_present = daily_present
+        self.elapsed = elapsed
+
+    @property
+    def present(self) -> int:
+        return sum(self.daily_present)
+
+    @property
+    def percentage(self) -> float:
+        cells = len(self.days) * len(self.students)
+        return 100.0 * self.present / cells if cells else 0.0
+
+    def below(self, threshold: float = DEFAULT_THRESHOLD) -> List[StudentStats]:
+        """Students under threshold percent, lowest first (nobody is below it before any day is recorded)."""
+        return sorted((s for s in self.students if s.days and s.percentage < threshold),
+                      key=lambda s: (s.percentage, s.roll))
+
+    def lines(self, threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+        out = [f"{self.class_name} {self.start}..{self.end}: {self.percentage:.1f}% over {len(self.days)} day(s), "
+               f"{len(self.students)} student(s), {len(self.below(threshold))} below {threshold:g}%"]
+        for s in self.below(threshold):
+            out.append(f"  {s.roll:>6} {s.name:<30} {s.percentage:5.1f}%  absent {s.absent}")
+        return out
+
+def _as_date(value) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+def _aggregate_numpy(rows: Sequence[bytes], width: int):
+    m = np.frombuffer(b"".join(rows), dtype=np.uint8).reshape(len(rows), width)
+    present = m.sum(axis=1)
+    daily = m.sum(axis=0)
+    # trailing runs: distance from the end to the last cell of the other kind
+    rev = m[:, ::-1]
+    gaps = rev == 0
+    present_streak = np.where(gaps.any(axis=1), gaps.argmax(axis=1), width)
+    hits = rev == 1
+    absent_streak = np.where(hits.any(axis=1), hits.argmax(axis=1), width)
+    # longest run: pair up the run starts (+1) and ends (-1) of the zero-padded rows
+    padded = np.zeros((len(rows), width + 2), dtype=np.int8)
+    padded[:, 1:-1] = m
+    edges = np.diff(padded, axis=1)
+    starts = np.argwhere(edges == 1)
+    ends = np.argwhere(edges == -1)
+    longest = np.zeros(len(rows), dtype=np.int64)
+    np.maximum.at(longest, starts[:, 0], ends[:, 1] - starts[:, 1])
+    return present.tolist(), longest.tolist(), present_streak.tolist(), absent_streak.tolist(), daily.tolist()
+
+def _aggregate_bytes(rows: Sequence[bytes], width: int):
+    present = [row.count(1) for row in rows]
+    longest = [max(map(len, row.split(b"\x00"))) for row in rows]
+    present_streak = [width - len(row.rstrip(b"\x01")) for row in rows]
+    absent_streak = [width - len(row.rstrip(b"\x00")) for row in rows]
+    daily = [sum(col) for col in zip(*rows)] if rows else [0] * width
+    return present, longest, present_streak, absent_streak, daily
+
+def summarize(class_name: str, start: date, end: date, days: List[date], students, rows: Sequence[bytes],
+              use_numpy: Optional[bool] = None) -> ClassReport:
+    """Build a ClassReport from a presence matrix. use_numpy=None uses NumPy when available."""
+    started = time.perf_counter()
+    width = len(days)
+    if not students or not width:
+        stats = [StudentStats(r, n, width, 0, 0, 0, width) for r, n in students]
+        return ClassReport(class_name, start, end, days, stats, [0] * width, time.perf_counter() - started)
+    if use_numpy is None:
+        use_numpy = np is not None
+    aggregate = _aggregate_numpy if use_numpy else _aggregate_bytes
+    present, longest, present_streak, absent_streak, daily = aggregate(rows, width)
+    stats = [StudentStats(roll, name, width, present[i], longest[i], present_streak[i], absent_streak[i])
+             for i, (roll, name) in enumerate(students)]
+    return ClassReport(class_name, start, end, days, stats, daily, time.perf_counter() - started)
+
+def class_report(db, class_name: str, start, end, use_numpy: Optional[bool] = None) -> ClassReport:
+    """Attendance statistics for one class between start and end (inclusive)."""
+    start, end = _as_date(start), _as_date(end)
+    if start > end:
+        raise ValueError("Start date must not be after end date.")
+    started = time.perf_counter()
+    days, students, rows = db.fetch_presence_matrix(class_name, start, end)
+    report = summarize(class_name, start, end, days, students, rows, use_numpy)
+    report.elapsed = time.perf_counter() - started
+    return report
+
+def school_report(db, start, end, classes: Optional[Sequence[str]] = None,
+                  use_numpy: Optional[bool] = None) -> List[ClassReport]:
+    """class_report for every class (or the given ones), in class order."""
+    names = list(classes) if classes is not None else db.class_table_names()
+    with db.session():
+        return [class_report(db, name, start, end, use_numpy) for name in names]
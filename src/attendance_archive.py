@@ -0,0 +1,262 @@
+"""
+Columnar archive of attendance history for bulk reloads, partitioned by class and month:
+
+    <root>/class=<class name>/month=<YYYY-MM>/part.parquet   (pyarrow installed)
+    <root>/class=<class name>/month=<YYYY-MM>/part.npz       (otherwise, needs NumPy)
+
+Parquet partitions hold one record per student per recorded date with the columns class, roll,
+name, date and status; class, name and status are dictionary encoded and the file is zstd
+compressed. The directory names follow the Hive convention, so warehouse loaders can prune
+partitions by path.
+
+npz partitions (np.savez_compressed, readable with allow_pickle=False) store the same data as
+a matrix instead of repeated records:
+
+    format          0-d str, "attendance-archive/1"
+    class_name      0-d str
+    days            datetime64[D] [d]    recorded dates of the month, ascending
+    rolls           int64 [s]            roster in roll order
+    names           str [s]
+    status_labels   str [k]
+    status          uint8 [s, d]         index into status_labels, student-major
+
+load_archive() reads either kind back into NumPy columns.
+"""
+import calendar
+import os
+import time
+from datetime import date, datetime
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency
+    pa = pq = None
+
+NPZ_FORMAT = "attendance-archive/1"
+FORMATS = ("parquet", "npz")
+COLUMNS = ("class", "roll", "name", "date", "status")
+
+class ArchiveReport:
+    """Counters and timings for one archive run."""
+
+    def __init__(self, root: str, fmt: str):
+        self.root = root
+        self.format = fmt
+        self.partitions: List[Tuple[str, int]] = []  # (path, records)
+        self.classes = 0
+        self.records = 0
+        self.bytes_written = 0
+        self.elapsed = 0.0
+
+    @property
+    def records_per_second(self) -> float:
+        return self.records / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> str:
+        return (f"{self.records:,} record(s) from {self.classes} class(es) archived as {self.format} into "
+                f"{len(self.partitions)} partition(s) under {self.root} in {self.elapsed:.2f}s "
+                f"({self.records_per_second:,.0f} records/s, {self.bytes_written / 1e6:,.1f} MB)")
+
+def default_format() -> str:
+    if pa is not None:
+        return "parquet"
+    if np is not None:
+        return "npz"
+    raise RuntimeError("Archiving needs pyarrow (Parquet) or NumPy (npz); neither is installed.")
+
+def _months(days: Sequence[date]) -> List[Tuple[date, date]]:
+    """(first, last) recorded date of each month present in days, in order."""
+    out: List[Tuple[date, date]] = []
+    for d in days:
+        if out and (out[-1][0].year, out[-1][0].month) == (d.year, d.month):
+            out[-1] = (out[-1][0], d)
+        else:
+            out.append((d, d))
+    return out
+
+def _whole_months(start: Optional[date], end: Optional[date]) -> Tuple[Optional[date], Optional[date]]:
+    """start rounded down to the first and end up to the last day of its month."""
+    start = start.date() if isinstance(start, datetime) else start
+    end = end.date() if isinstance(end, datetime) else end
+    if start is not None:
+        start = start.replace(day=1)
+    if end is not None:
+        end = end.replace(day=calendar.monthrange(end.year, end.month)[1])
+    return start, end
+
+def _partition_dir(root: str, class_name: str, month: date) -> str:
+    return os.path.join(root, f"class={class_name}", f"month={month:%Y-%m}")
+
+def _write_parquet(path: str, class_name: str, days: List[date], students: List[Tuple[int, str]],
+                   labels: List[str], codes: List[int]) -> None:
+    n = len(students) * len(days)
+    table = pa.table({
+        "class": pa.DictionaryArray.from_arrays(pa.array([0] * n, pa.int32()), pa.array([class_name])),
+        "roll": pa.array([roll for roll, _ in students for _ in days], pa.int64()),
+        "name": pa.DictionaryArray.from_arrays(
+            pa.array([i for i in range(len(students)) for _ in days], pa.int32()),
+            pa.array([name for _, name in students])),
+        "date": pa.array(days * len(students), pa.date32()),
+        "status": pa.DictionaryArray.from_arrays(pa.array(codes, pa.int32()), pa.array(labels)),
+    })
+    pq.write_table(table, path, compression="zstd")
+
+def _write_npz(path: str, class_name: str, days: List[date], students: List[Tuple[int, str]],
+               labels: List[str], codes: List[int]) -> None:
+    with open(path, "wb") as fh:
+        np.savez_compressed(
+            fh,
+            format=np.array(NPZ_FORMAT),
+            class_name=np.array(class_name),
+            days=np.array(days, dtype="datetime64[D]"),
+            rolls=np.array([roll for roll, _ in students], dtype=np.int64),
+            names=np.array([name for _, name in students], dtype=str),
+            status_labels=np.array(labels, dtype=str),
+            status=np.array(codes, dtype=np.uint8).reshape(len(students), len(days)),
+        )
+
+def archive_attendance(db, root: str, class_names: Optional[Sequence[str]] = None, start: Optional[date] = None,
+                       end: Optional[date] = None, fmt: Optional[str] = None, batch_size: int = 1000) -> ArchiveReport:
+    """
+    Archive the attendance of every class (or class_names) between start and end (inclusive)
+    under root, one partition per class and month; re-archiving a month replaces its partition,
+    in either format. start and end are widened to whole months, so a partition always holds
+    its entire month.
+    fmt is "parquet" or "npz" (default: parquet when pyarrow is installed). Each partition is
+    streamed from the database and held in memory only while it is written.
+    """
+    fmt = fmt or default_format()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown archive format: {fmt!r}. Use one of {FORMATS}.")
+    if fmt == "parquet" and pa is None:
+        raise RuntimeError("Parquet archives need pyarrow, which is not installed.")
+    if fmt == "npz" and np is None:
+        raise RuntimeError("npz archives need NumPy, which is not installed.")
+    write = _write_parquet if fmt == "parquet" else _write_npz
+    started = time.perf_counter()
+    report = ArchiveReport(root, fmt)
+    names = list(class_names) if class_names is not None else db.class_table_names()
+    start, end = _whole_months(start, end)
+    for class_name in names:
+        for first, last in _months(db.attendance_dates(class_name, start, end)):
+            with db.stream_attendance_matrix(class_name, first, last, batch_size) as (days, matrix):
+                students: List[Tuple[int, str]] = []
+                labels: List[str] = []
+                label_codes: Dict[str, int] = {}
+                codes: List[int] = []
+                for roll, name, statuses in matrix:
+                    students.append((roll, name))
+                    for status in statuses:
+                        code = label_codes.get(status)
+                        if code is None:
+                            if len(labels) == 256:
+                                raise ValueError(f"Too many distinct attendance statuses in {class_name}.")
+                            code = label_codes[status] = len(labels)
+                            labels.append(status)
+                        codes.append(code)
+            if not days:
+                continue
+            directory = _partition_dir(root, class_name, first)
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"part.{fmt}")
+            # write next to the partition and swap it in, so readers never see half a file
+            tmp = path + ".tmp"
+            write(tmp, class_name, days, students, labels, codes)
+            os.replace(tmp, path)
+            for other in FORMATS:
+                if other != fmt and os.path.exists(os.path.join(directory, f"part.{other}")):
+                    os.remove(os.path.join(directory, f"part.{other}"))
+            records = len(students) * len(days)
+            report.partitions.append((path, records))
+            report.records += records
+            report.bytes_written += os.path.getsize(path)
+        report.classes += 1
+    report.elapsed = time.perf_counter() - started
+    return report
+
+def archive_partitions(root: str, class_names: Optional[Sequence[str]] = None, start: Optional[date] = None,
+                       end: Optional[date] = None) -> Iterator[str]:
+    """Partition files under root for class_names and the months overlapping start..end, pruned by path."""
+    wanted = set(class_names) if class_names is not None else None
+    low = f"{start:%Y-%m}" if start is not None else ""
+    high = f"{end:%Y-%m}" if end is not None else "9999-99"
+    if not os.path.isdir(root):
+        return
+    for class_dir in sorted(os.listdir(root)):
+        if not class_dir.startswith("class=") or (wanted is not None and class_dir[6:] not in wanted):
+            continue
+        for month_dir in sorted(os.listdir(os.path.join(root, class_dir))):
+            if not month_dir.startswith("month=") or not low <= month_dir[6:] <= high:
+                continue
+            directory = os.path.join(root, class_dir, month_dir)
+            for fmt in FORMATS:
+                path = os.path.join(directory, f"part.{fmt}")
+                if os.path.exists(path):
+                    yield path
+
+def _read_parquet(path: str) -> Dict[str, "np.ndarray"]:
+    table = pq.read_table(path)
+    out = {}
+    for column in COLUMNS:
+        values = table.column(column)
+        if pa.types.is_dictionary(values.type):
+            values = values.cast(values.type.value_type)
+        out[column] = values.to_numpy()
+    return out
+
+def _read_npz(path: str) -> Dict[str, "np.ndarray"]:
+    with np.load(path, allow_pickle=False) as npz:
+        if str(npz["format"]) != NPZ_FORMAT:
+            raise ValueError(f"{path}: unsupported archive format {str(npz['format'])!r}")
+        days, rolls, names = npz["days"], npz["rolls"], npz["names"]
+        status = npz["status"]
+        labels = npz["status_labels"]
+        n = status.size
+        return {
+            "class": np.full(n, str(npz["class_name"]), dtype=object),
+            "roll": np.repeat(rolls, len(days)),
+            "name": np.repeat(names, len(days)),
+            "date": np.tile(days, len(rolls)),
+            "status": labels[status.ravel()] if n else np.array([], dtype=str),
+        }
+
+def load_archive(root: str, class_names: Optional[Sequence[str]] = None, start: Optional[date] = None,
+                 end: Optional[date] = None) -> Dict[str, "np.ndarray"]:
+    """
+    Read archived records back as NumPy columns {class, roll, name, date (datetime64[D]), status},
+    partitions in class then month order. Only partitions overlapping the filters are opened.
+    """
+    if np is None:
+        raise RuntimeError("Loading an archive needs NumPy, which is not installed.")
+    start = start.date() if isinstance(start, datetime) else start
+    end = end.date() if isinstance(end, datetime) else end
+    parts = []
+    for path in archive_partitions(root, class_names, start, end):
+        if path.endswith(".parquet"):
+            if pq is None:
+                raise RuntimeError(f"{path} is a Parquet partition and pyarrow is not installed.")
+            part = _read_parquet(path)
+        else:
+            part = _read_npz(path)
+        if start is not None or end is not None:
+            dates = part["date"].astype("datetime64[D]")
+            keep = np.ones(len(dates), dtype=bool)
+            if start is not None:
+                keep &= dates >= np.datetime64(start, "D")
+            if end is not None:
+                keep &= dates <= np.datetime64(end, "D")
+            if not keep.all():
+                part = {k: v[keep] for k, v in part.items()}
+        parts.append(part)
+    if not parts:
+        return {"class": np.array([], dtype=object), "roll": np.array([], dtype=np.int64),
+                "name": np.array([], dtype=object), "date": np.array([], dtype="datetime64[D]"),
+                "status": np.array([], dtype=object)}
+    return {column: np.concatenate([p[column] for p in parts]) for column in COLUMNS}
@@ -0,0 +1,317 @@
+"""
+Command-line entry point for AttendanceDB: scheduled jobs, scripting and pipelines, without Qt.
+
+    python -m attendance_cli create-class [NAME ...] [--input FILE]
+    python -m attendance_cli import CLASS [FILE] [--chunk-size N] [--method batched|load_data] [--rejects PATH]
+    python -m attendance_cli mark-present [CLASS ...] [--all] [--date YYYY-MM-DD]
+    python -m attendance_cli mark-absent [ROLL ...] [--class NAME] [--date YYYY-MM-DD] [--input FILE]
+    python -m attendance_cli stats [--class NAME ...] [--start ...] [--end ...] [--threshold PCT] [--csv]
+    python -m attendance_cli open-day [--date YYYY-MM-DD] [--dry-run] [--workers N]
+    python -m attendance_cli rebuild-summary [--class NAME ...]
+    python -m attendance_cli pack [--class NAME ...] [--start YYYY-MM-DD] [--end YYYY-MM-DD]
+    python -m attendance_cli export OUTPUT [--class NAME ...] [--start ...] [--end ...] [--split] [--gzip]
+    python -m attendance_cli replay-journal JOURNAL
+
+Batch input (FILE, --input) is a comma-separated file or - for stdin; blank lines and lines
+starting with # are skipped. create-class reads "name[,password]" rows, mark-absent reads
+"roll", "class,roll" or "class,roll,YYYY-MM-DD" rows (missing fields come from --class and
+--date) and applies them in one transaction, and import reads a (Student_name, Roll_no) roster.
+
+Connection settings come from --backend/--host/--user/--database or the ATTENDANCE_DB_BACKEND,
+ATTENDANCE_DB_HOST, ATTENDANCE_DB_USER, ATTENDANCE_DB_NAME and ATTENDANCE_DB_PASSWORD environment
+variables. With --backend sqlite, --database is the path of the database file. Exit status is 0
+on success, 1 when a job reports failures and 2 on errors.
+"""
+import argparse
+import csv
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Iterator, List, Tuple
+
+import Main_database as dbmod
+from attendance_export import export_attendance
+from offline_journal import OfflineWriter, WriteJournal
+
+def _parse_date(text: str) -> datetime:
+    try:
+        return datetime.strptime(text, "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date {text!r}, expected YYYY-MM-DD")
+
+def db_from_args(args: argparse.Namespace) -> dbmod.AttendanceDB:
+    db = dbmod.AttendanceDB(
+        host=args.host,
+        user=args.user,
+        password=os.environ.get("ATTENDANCE_DB_PASSWORD", ""),
+        database=args.database,
+        admin_password=os.environ.get("ATTENDANCE_ADMIN_PASSWORD", "123"),
+        storage=args.storage,
+        # concurrent workers need a connection each
+        pool_size=args.pool_size or getattr(args, "workers", None),
+        backend=args.backend,
+        allow_local_infile=getattr(args, "method", None) == "load_data",
+    )
+    if args.query_stats or args.slow_query_log:
+        db.enable_query_stats(slow_ms=args.slow_query_ms, slow_log=args.slow_query_log)
+    return db
+
+def _batch_rows(path: str) -> Iterator[Tuple[int, List[str]]]:
+    """(line number, stripped fields) of a comma-separated batch file, '-' meaning stdin."""
+    fh = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+    try:
+        for line, row in enumerate(csv.reader(fh), 1):
+            fields = [f.strip() for f in row]
+            if not fields or not fields[0] or fields[0].startswith("#"):
+                continue
+            yield line, fields
+    finally:
+        if fh is not sys.stdin:
+            fh.close()
+
+def cmd_create_class(db: dbmod.AttendanceDB, args: argparse.Namespace) -> int:
+    classes = [(name, None) for name in args.names]
+    if args.input:
+        classes += [(f[0], f[1] if len(f) > 1 and f[1] else None) for _, f in _batch_rows(args.input)]
+    if not classes:
+        raise ValueError("No class names given.")
+    for name, password in classes:
+        db.create_table_for_class(name)
+        if password:
+            db.set_class_password(name, password)
+        print(f"created {name}" + (" (password set)" if password else ""))
+    return 0
+
+def cmd_import(db: dbmod.AttendanceDB, args: argparse.Namespace) -> int:
+    if args.file != "-":
+        report = db.import_csv(args.file, args.class_name, chunk_size=args.chunk_size, has_header=args.header,
+                               checkpoint_path=args.checkpoint, reject_path=args.rejects, method=args.method)
+    else:
+        # import_csv reads a file (it sizes, resumes and may LOAD DATA it), so spool stdin to disk first
+        with tempfile.NamedTemporaryFile("wb", suffix=".csv", delete=False) as tmp:
+            shutil.copyfileobj(sys.stdin.buffer, tmp)
+        try:
+            report = db.import_csv(tmp.name, args.class_name, chunk_size=args.chunk_size, has_header=args.header,
+                                   reject_path=args.rejects, method=args.method)
+        finally:
+            os.remove(tmp.name)
+    print(report.summary())
+    for line, row, reason in report.rejects[:10]:
+        print(f"  line {line}: {reason}: {','.join(row)}", file=sys.stderr)
+    return 0 if not report.rejected else 1
+
+def cmd_mark_present(db: dbmod.AttendanceDB, args: argparse.Namespace) -> int:
+    names = db.class_table_names() if args.all else list(args.classes)
+    if args.input:
+        names += [f[0] for _, f in _batch_rows(args.input)]
+    if not names:
+        raise ValueError("No classes given; name them, use --input or --all.")
+    dt = args.date or datetime.now()
+    for name in names:
+        db.mark_all_present(name, dt)
+    print(f"marked {len(names)} class(es) present for {dt:%Y-%m-%d}")
+    return 0
+
+def cmd_mark_absent(db: dbmod.AttendanceDB, args: argparse.Namespace) -> int:
+    default_day = args.date or datetime.now()
+    groups = {}
+
+    def add(class_name, roll_text, day, where):
+        if not class_name:
+            raise ValueError(f"{where}: no class (give --class or a class,roll row)")
+        try:
+            roll = int(roll_text)
+        except ValueError:
+            raise ValueError(f"{where}: roll {roll_text!r} is not an integer") from None
+        groups.setdefault((class_name, day), []).append(roll)
+
+    for roll in args.rolls:
+        add(args.class_name, roll, default_day, "argument")
+    if args.input:
+        for line, fields in _batch_rows(args.input):
+            where = f"{args.input}:{line}"
+            if len(fields) == 1:
+                add(args.class_name, fields[0], default_day, where)
+            elif len(fields) in (2, 3):
+                day = default_day
+                if len(fields) == 3 and fields[2]:
+                    try:
+                        day = _parse_date(fields[2])
+                    except argparse.ArgumentTypeError as e:
+                        raise ValueError(f"{where}: {e}") from None
+                add(fields[0], fields[1], day, where)
+            else:
+                raise ValueError(f"{where}: expected roll, class,roll or class,roll,date")
+    if not groups:
+        raise ValueError("No roll numbers given.")
+    # every (class, date) group in one transaction: a bad row leaves nothing half-applied
+    with db.session():
+        for (class_name, day), rolls in groups.items():
+            db.custom_marking_absent(class_name, rolls, day)
+    for (class_name, day), rolls in groups.items():
+        print(f"{class_name} {day:%Y-%m-%d}: {len(rolls)} marked absent")
+    return 0
+
+def cmd_stats(db: dbmod.AttendanceDB, args: argparse.Namespace) -> int:
+    # analytics pulls in NumPy when it is installed; only this command pays for it
+    import analytics
+    end = args.end or datetime.now()
+    start = args.start or end - timedelta(days=90)
+    reports = analytics.school_report(db, start, end, args.classes)
+    if args.csv:
+        writer = csv.writer(sys.stdout)
+        writer.writerow(["Class", "Roll_no", "Student_name", "Days", "Present", "Absent", "Percentage",
+                         "Longest_streak", "Present_streak", "Absent_streak"])
+        for report in reports:
+            for s in report.students:
+                writer.writerow([report.class_name, s.roll, s.name, s.days, s.present, s.absent,
+                                 f"{s.percentage:.1f}", s.longest_streak, s.present_streak, s.absent_streak])
+    else:
+        for report in reports:
+            for line in report.lines(args.threshold):
+                print(line)
+    return 1 if any(report.below(args.threshold) for report in reports) and args.fail_below else 0
+
+def cmd_open_day(db: dbmod.AttendanceDB, args: argparse.Namespace) -> int:
+    report = db.open_school_day(args.date, dry_run=args.dry_run, workers=args.workers)
+    for line in report.lines():
+        print(line)
+    return 0 if report.ok else 1
+
+def cmd_rebuild_summary(db: dbmod.AttendanceDB, args: argparse.Namespace) -> int:
+    started = time.perf_counter()
+    count = db.rebuild_summary(args.classes)
+    print(f"rebuilt the attendance summary of {count} class(es) in {time.perf_counter() - started:.2f}s")
+    return 0
+
+def cmd_pack(db: dbmod.AttendanceDB, args: argparse.Namespace) -> int:
+    started = time.perf_counter()
+    count = db.pack_attendance(args.classes, args.start, args.end)
+    print(f"packed {count} class-day(s) into {db.BITMAP_TABLE} in {time.perf_counter() - started:.2f}s")
+    return 0
+
+def cmd_export(db: dbmod.AttendanceDB, args: argparse.Namespace) -> int:
+    report = export_attendance(db, args.output, args.classes, args.start, args.end, split=args.split,
+                               compress=True if args.gzip else None, batch_size=args.batch_size)
+    print(report.summary())
+    return 0
+
+def cmd_replay_journal(db: dbmod.AttendanceDB, args: argparse.Namespace) -> int:
+    journal = WriteJournal(args.journal)
+    try:
+        report = OfflineWriter(db, journal).replay()
+    finally:
+        journal.close()
+    for line in report.lines():
+        print(line)
+    return 1 if report.offline or report.conflicts else 0
+
+def add_connection_arguments(parser: argparse.ArgumentParser) -> None:
+    """The connection options read by db_from_args (shared with attendance_server)."""
+    parser.add_argument("--backend", choices=dbmod.AttendanceDB.BACKENDS,
+                        default=os.environ.get("ATTENDANCE_DB_BACKEND", "mysql"))
+    parser.add_argument("--host", default=os.environ.get("ATTENDANCE_DB_HOST", "localhost"))
+    parser.add_argument("--user", default=os.environ.get("ATTENDANCE_DB_USER", "root"))
+    parser.add_argument("--database", default=os.environ.get("ATTENDANCE_DB_NAME", "attendance"))
+    parser.add_argument("--storage", choices=["wide", "long"], default=os.environ.get("ATTENDANCE_DB_STORAGE", "wide"))
+    parser.add_argument("--pool-size", type=int, default=None, help="connections to use for concurrent work")
+    parser.add_argument("--query-stats", action="store_true",
+                        help="time every statement and database call and report them at the end")
+    parser.add_argument("--slow-query-log", default=os.environ.get("ATTENDANCE_SLOW_QUERY_LOG"),
+                        help="append statements slower than --slow-query-ms to this file")
+    parser.add_argument("--slow-query-ms", type=float, default=100.0)
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="attendance_cli", description="Attendance database jobs.")
+    add_connection_arguments(parser)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("create-class", help="create class tables (optionally setting their passwords)")
+    p.add_argument("names", nargs="*", metavar="NAME")
+    p.add_argument("--input", help="file of name[,password] rows, - for stdin")
+    p.set_defaults(func=cmd_create_class)
+
+    p = sub.add_parser("import", help="stream a (Student_name, Roll_no) roster CSV into a class")
+    p.add_argument("class_name", metavar="CLASS")
+    p.add_argument("file", nargs="?", default="-", help="roster CSV (default: stdin)")
+    p.add_argument("--chunk-size", type=int, default=1000)
+    p.add_argument("--method", choices=dbmod.AttendanceDB.IMPORT_METHODS, default="batched")
+    p.add_argument("--header", dest="header", action="store_true", default=None, help="first row is a header")
+    p.add_argument("--no-header", dest="header", action="store_false", help="first row is data")
+    p.add_argument("--rejects", default=None, help="write rejected rows to this CSV")
+    p.add_argument("--checkpoint", default=None, help="resume file for interrupted imports (not with stdin)")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("mark-present", help="mark every student of the classes present")
+    p.add_argument("classes", nargs="*", metavar="CLASS")
+    p.add_argument("--all", action="store_true", help="every class")
+    p.add_argument("--input", help="file of class names, - for stdin")
+    p.add_argument("--date", type=_parse_date, default=None, help="YYYY-MM-DD (default: today)")
+    p.set_defaults(func=cmd_mark_present)
+
+    p = sub.add_parser("mark-absent", help="mark roll numbers absent")
+    p.add_argument("rolls", nargs="*", metavar="ROLL")
+    p.add_argument("--class", dest="class_name", default=None, help="class for rows that do not name one")
+    p.add_argument("--date", type=_parse_date, default=None, help="YYYY-MM-DD for rows without one (default: today)")
+    p.add_argument("--input", help="file of roll / class,roll / class,roll,date rows, - for stdin")
+    p.set_defaults(func=cmd_mark_absent)
+
+    p = sub.add_parser("stats", help="attendance percentage and streaks per student over a date range")
+    p.add_argument("--class", dest="classes", action="append", default=None, help="class to report (repeatable; default: all)")
+    p.add_argument("--start", type=_parse_date, default=None, help="YYYY-MM-DD (default: 90 days before --end)")
+    p.add_argument("--end", type=_parse_date, default=None, help="YYYY-MM-DD (default: today)")
+    p.add_argument("--threshold", type=float, default=75.0, help="flag students below this percentage")
+    p.add_argument("--csv", action="store_true", help="per-student CSV on stdout instead of the text report")
+    p.add_argument("--fail-below", action="store_true", help="exit 1 when any student is below the threshold")
+    p.set_defaults(func=cmd_stats)
+
+    p = sub.add_parser("open-day", help="open the date for every class (weekends are skipped)")
+    p.add_argument("--date", type=_parse_date, default=None, help="YYYY-MM-DD (default: today)")
+    p.add_argument("--dry-run", action="store_true", help="report what would be opened without writing")
+    p.add_argument("--workers", type=int, default=None, help="concurrent DDL workers (default: pool size)")
+    p.set_defaults(func=cmd_open_day)
+
+    p = sub.add_parser("rebuild-summary", help="recompute the attendance summary tables from raw attendance")
+    p.add_argument("--class", dest="classes", action="append", default=None, help="class to rebuild (repeatable; default: all)")
+    p.set_defaults(func=cmd_rebuild_summary)
+
+    p = sub.add_parser("pack", help="store recorded days as compact attendance bitmaps")
+    p.add_argument("--class", dest="classes", action="append", default=None, help="class to pack (repeatable; default: all)")
+    p.add_argument("--start", type=_parse_date, default=None, help="first date to pack, YYYY-MM-DD")
+    p.add_argument("--end", type=_parse_date, default=None, help="last date to pack, YYYY-MM-DD")
+    p.set_defaults(func=cmd_pack)
+
+    p = sub.add_parser("export", help="stream the students x dates attendance matrix to CSV")
+    p.add_argument("output", help="CSV file (.gz to compress), or a directory with --split")
+    p.add_argument("--class", dest="classes", action="append", default=None, help="class to export (repeatable; default: all)")
+    p.add_argument("--start", type=_parse_date, default=None, help="first date, YYYY-MM-DD")
+    p.add_argument("--end", type=_parse_date, default=None, help="last date, YYYY-MM-DD")
+    p.add_argument("--split", action="store_true", help="write one file per class into the output directory")
+    p.add_argument("--gzip", action="store_true", help="gzip the output (implied by a .gz file name)")
+    p.add_argument("--batch-size", type=int, default=1000, help="rows fetched per round trip")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("replay-journal", help="send writes queued in a terminal's offline journal")
+    p.add_argument("journal", help="the terminal's journal file (OFFLINE_JOURNAL in main.py)")
+    p.set_defaults(func=cmd_replay_journal)
+    return parser
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    db = db_from_args(args)
+    try:
+        return args.func(db, args)
+    except (ConnectionError, ValueError, RuntimeError, OSError, db.backend.Error) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    finally:
+        if args.query_stats:
+            print("\n".join(db.query_stats.report()), file=sys.stderr)
+        db.disable_query_stats()
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""
+Headless export of students x dates attendance matrices to CSV or gzip-compressed CSV.
+
+Rows are streamed from AttendanceDB.stream_attendance_matrix straight into the csv writer, so
+memory stays bounded by one fetch batch whatever the class or term size. All classes can go
+into one file (a Class column is added and the date columns are the union of every class's
+recorded dates) or, with split=True, into one file per class inside a directory.
+"""
+import csv
+import gzip
+import os
+import time
+from datetime import date
+from typing import Callable, List, Optional, Sequence, Tuple
+
+class ExportReport:
+    """Counters and timings for one export run."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.files: List[Tuple[str, int]] = []  # (path, rows) in the order written
+        self.classes = 0
+        self.rows = 0
+        self.days = 0            # distinct dates exported
+        self.bytes_written = 0   # on disk, after compression
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> str:
+        where = self.files[0][0] if len(self.files) == 1 else f"{len(self.files)} file(s) in {self.path}"
+        return (f"{self.rows:,} student row(s) x {self.days} date(s) from {self.classes} class(es) exported to "
+                f"{where} in {self.elapsed:.2f}s ({self.rows_per_second:,.0f} rows/s, "
+                f"{self.bytes_written / 1e6:,.1f} MB)")
+
+def _open(path: str, compress: bool):
+    if compress:
+        return gzip.open(path, "wt", newline="", encoding="utf-8", compresslevel=6)
+    return open(path, "w", newline="", encoding="utf-8")
+
+def export_attendance(db, path: str, class_names: Optional[Sequence[str]] = None, start: Optional[date] = None,
+                      end: Optional[date] = None, split: bool = False, compress: Optional[bool] = None,
+                      batch_size: int = 1000, progress: Optional[Callable[[str, int], None]] = None) -> ExportReport:
+    """
+    Export the attendance of every class (or class_names) between start and end (inclusive).
+    Without split, path is one CSV file with columns Class, Roll_no, Student_name and one column
+    per date; cells for dates a class has not recorded are left empty. With split, path is a
+    directory (created if needed) receiving <class>.csv per class without the Class column.
+    compress=None gzips a single file whose path ends in .gz; split files are gzipped only with
+    compress=True.
+    progress(class_name, rows_so_far) is called after each class. Returns an ExportReport.
+    """
+    started = time.perf_counter()
+    if compress is None:
+        compress = not split and path.endswith(".gz")
+    names = list(class_names) if class_names is not None else db.class_table_names()
+    report = ExportReport(path)
+
+    def finish(file_path: str, rows: int) -> None:
+        report.files.append((file_path, rows))
+        report.bytes_written += os.path.getsize(file_path)
+
+    if split:
+        os.makedirs(path, exist_ok=True)
+        seen = set()
+        for name in names:
+            file_path = os.path.join(path, name + (".csv.gz" if compress else ".csv"))
+            rows = 0
+            with _open(file_path, compress) as fh, db.stream_attendance_matrix(name, start, end, batch_size) as (days, matrix):
+                writer = csv.writer(fh)
+                writer.writerow(["Roll_no", "Student_name"] + [d.isoformat() for d in days])
+                for roll, student, statuses in matrix:
+                    writer.writerow([roll, student] + statuses)
+                    rows += 1
+            seen.update(days)
+            finish(file_path, rows)
+            report.classes += 1
+            report.rows += rows
+            if progress:
+                progress(name, report.rows)
+        report.days = len(seen)
+        report.elapsed = time.perf_counter() - started
+        return report
+
+    # one file: the header needs every class's dates before the first row is written
+    all_days = sorted({d for name in names for d in db.attendance_dates(name, start, end)})
+    column = {d: i for i, d in enumerate(all_days)}
+    with _open(path, compress) as fh:
+        writer = csv.writer(fh)
+        writer.writerow(["Class", "Roll_no", "Student_name"] + [d.isoformat() for d in all_days])
+        for name in names:
+            with db.stream_attendance_matrix(name, start, end, batch_size) as (days, matrix):
+                # a date recorded since the header was written has no column and is left out
+                positions = [column.get(d) for d in days]
+                aligned = days == all_days
+                for roll, student, statuses in matrix:
+                    if not aligned:
+                        cells = [""] * len(all_days)
+                        for i, status in zip(positions, statuses):
+                            if i is not None:
+                                cells[i] = status
+                        statuses = cells
+                    writer.writerow([name, roll, student] + statuses)
+                    report.rows += 1
+            report.classes += 1
+            if progress:
+                progress(name, report.rows)
+    finish(path, report.rows)
+    report.days = len(all_days)
+    report.elapsed = time.perf_counter() - started
+    return report
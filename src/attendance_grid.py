@@ -0,0 +1,140 @@
+from array import array
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from bitset import DayBitmap
+
+class AttendanceGrid:
+    """
+    Array-backed (Roll_no, Student_name, status) rows for one class and date, with per-row dirty flags.
+    Statuses are stored as one-byte codes into status_labels, so a row costs a few bytes plus its name.
+    A row is dirty while its name or status differs from the loaded value; editing it back clears the flag.
+    The two columns are tracked separately (STATUS_DIRTY / NAME_DIRTY bits), so a save writes only
+    what was edited.
+    """
+
+    PRESENT = "Present"
+    ABSENT = "Absent"
+    STATUS_DIRTY = 1
+    NAME_DIRTY = 2
+
+    def __init__(self, rows: Iterable[Tuple[int, str, str]] = ()):
+        self.load(rows)
+
+    def load(self, rows: Iterable[Tuple[int, str, str]]) -> None:
+        self.status_labels: List[str] = [self.ABSENT, self.PRESENT]
+        self._codes_by_label = {label: i for i, label in enumerate(self.status_labels)}
+        self.rolls = array("i")
+        self.names: List[str] = []
+        self.codes = bytearray()
+        self._orig_names: List[str] = []
+        self._orig_codes = bytearray()
+        self.dirty = bytearray()
+        for roll, name, status in rows:
+            name = name if name is not None else ""
+            self.rolls.append(int(roll))
+            self.names.append(name)
+            self.codes.append(self._code(status or self.ABSENT))
+        self._orig_names = list(self.names)
+        self._orig_codes = bytearray(self.codes)
+        self.dirty = bytearray(len(self.rolls))
+        self._dirty_count = 0
+
+    def _code(self, status: str) -> int:
+        code = self._codes_by_label.get(status)
+        if code is None:
+            # keep the first spelling seen for known statuses ("present" -> "Present")
+            for label, known in self._codes_by_label.items():
+                if label.lower() == status.lower():
+                    return known
+            if len(self.status_labels) >= 256:
+                raise ValueError("Too many distinct attendance statuses.")
+            code = len(self.status_labels)
+            self.status_labels.append(status)
+            self._codes_by_label[status] = code
+        return code
+
+    def __len__(self) -> int:
+        return len(self.rolls)
+
+    def roll(self, row: int) -> int:
+        return self.rolls[row]
+
+    def name(self, row: int) -> str:
+        return self.names[row]
+
+    def status(self, row: int) -> str:
+        return self.status_labels[self.codes[row]]
+
+    def is_present(self, row: int) -> bool:
+        return self.codes[row] == 1
+
+    def is_dirty(self, row: int) -> bool:
+        return bool(self.dirty[row])
+
+    def _refresh_dirty(self, row: int) -> None:
+        now = ((self.STATUS_DIRTY if self.codes[row] != self._orig_codes[row] else 0)
+               | (self.NAME_DIRTY if self.names[row] != self._orig_names[row] else 0))
+        self._dirty_count += bool(now) - bool(self.dirty[row])
+        self.dirty[row] = now
+
+    def set_name(self, row: int, name: str) -> bool:
+        """Set a student's name; blank names are rejected. Returns True if the value changed."""
+        name = (name or "").strip()
+        if not name or name == self.names[row]:
+            return False
+        self.names[row] = name
+        self._refresh_dirty(row)
+        return True
+
+    def set_status(self, row: int, status: str) -> bool:
+        code = self._code(status)
+        if code == self.codes[row]:
+            return False
+        self.codes[row] = code
+        self._refresh_dirty(row)
+        return True
+
+    def set_present(self, row: int, present: bool) -> bool:
+        return self.set_status(row, self.PRESENT if present else self.ABSENT)
+
+    def dirty_count(self) -> int:
+        return self._dirty_count
+
+    def dirty_rows(self) -> List[Tuple[int, str, str]]:
+        """
+        Return (Roll_no, Student_name, status) for every dirty row, ready for save_attendance_grid;
+        a column the row did not change is "" (keep the stored value).
+        """
+        if not self._dirty_count:
+            return []
+        labels = self.status_labels
+        return [(self.rolls[i],
+                 self.names[i] if flags & self.NAME_DIRTY else "",
+                 labels[self.codes[i]] if flags & self.STATUS_DIRTY else "")
+                for i, flags in enumerate(self.dirty) if flags]
+
+    def loaded_statuses(self) -> Dict[int, str]:
+        """{Roll_no: status as loaded} for every row whose status changed: what saving it expects to overwrite."""
+        labels = self.status_labels
+        return {self.rolls[i]: labels[self._orig_codes[i]]
+                for i, flags in enumerate(self.dirty) if flags & self.STATUS_DIRTY}
+
+    def mark_clean(self) -> None:
+        """Accept the current values as saved."""
+        self._orig_names = list(self.names)
+        self._orig_codes = bytearray(self.codes)
+        self.dirty = bytearray(len(self.rolls))
+        self._dirty_count = 0
+
+    def rows(self) -> Iterator[Tuple[int, str, str]]:
+        labels = self.status_labels
+        for roll, name, code in zip(self.rolls, self.names, self.codes):
+            yield roll, name, labels[code]
+
+    def students(self) -> List[Tuple[int, str]]:
+        return list(zip(self.rolls, self.names))
+
+    def to_bitmap(self) -> DayBitmap:
+        """The grid's current statuses as a packed DayBitmap (e.g. to diff against a saved day)."""
+        labels = self.status_labels
+        return DayBitmap.from_statuses((roll, labels[code]) for roll, code in zip(self.rolls, self.codes))
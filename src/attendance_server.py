@@ -0,0 +1,490 @@
+"""
+HTTP/JSON service over AttendanceDB, so terminals share one connection pool and one set of caches
+instead of each holding database credentials and a connection of its own.
+
+    python -m attendance_server [--listen 127.0.0.1] [--port 8080] [--pool-size 8] [--batch-window 0.005]
+                                [connection options as for attendance_cli]
+
+    POST /login     {"class", "password"}                    -> {"token", "class", "admin", "roster"}
+    POST /logout
+    GET  /roster    ?class=NAME                              -> {"class", "roster": [[roll, name], ...]}
+    POST /mark      {"class", "date"?, "absent": [roll, ...]}           whole day: all present but these
+                    {"class", "date"?, "statuses": {"roll": "Present"|"Absent", ...}}
+                                                             -> {"ok", "batched"}
+    GET  /history   ?class=NAME&date=YYYY-MM-DD              -> {"rows": [[roll, name, status], ...]}
+                    ?class=NAME&start=...&end=...            -> {"days", "rows": [[roll, name, [status, ...]], ...]}
+    GET  /export    ?class=NAME&start=...&end=...            -> students x dates CSV
+    GET  /stats                                              -> request, batch, cache, pool (and query) counters
+
+Every route but /login and /stats takes "Authorization: Bearer <token>"; a token is bound to its
+class, except that the admin password yields a token for every class. Dates default to today.
+
+Requests are served by one asyncio loop; database calls run on a thread pool sized to the
+connection pool. Rosters are cached per class for roster_ttl seconds and concurrent misses for a
+class share one query; table metadata comes from the AttendanceDB schema cache. /mark requests
+for the same class and date arriving within batch_window seconds are applied as one transaction.
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import Main_database as dbmod
+
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+STATUSES = ("Present", "Absent")
+REASONS = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden", 404: "Not Found",
+           405: "Method Not Allowed", 413: "Payload Too Large", 431: "Request Header Fields Too Large",
+           500: "Internal Server Error", 503: "Service Unavailable"}
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+class Request:
+    def __init__(self, method: str, target: str, headers: Dict[str, str], body: bytes):
+        self.method = method
+        url = urlsplit(target)
+        self.path = url.path
+        self.query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        self.headers = headers
+        self.body = body
+
+    @property
+    def keep_alive(self) -> bool:
+        return self.headers.get("connection", "").lower() != "close"
+
+    def json(self) -> dict:
+        try:
+            data = json.loads(self.body or b"{}")
+        except ValueError as e:
+            raise HTTPError(400, f"Invalid JSON body: {e}")
+        if not isinstance(data, dict):
+            raise HTTPError(400, "JSON body must be an object.")
+        return data
+
+class Reply:
+    """A non-JSON response body."""
+
+    def __init__(self, body: bytes, content_type: str):
+        self.body = body
+        self.content_type = content_type
+
+def _parse_day(text: Optional[str]) -> Optional[datetime]:
+    if not text:
+        return None
+    try:
+        return datetime.strptime(text, "%Y-%m-%d")
+    except (TypeError, ValueError):
+        raise HTTPError(400, f"Invalid date {text!r}, expected YYYY-MM-DD.")
+
+class RosterCache:
+    """
+    (Roll_no, Student_name) rosters per class, trusted for ttl seconds. Lives on the event loop
+    thread, so it needs no locks; concurrent misses for one class await the same load.
+    """
+
+    def __init__(self, ttl: float = 30.0):
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[float, List[Tuple[int, str]]]] = {}
+        self._loading: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, class_name: str) -> bool:
+        entry = self._entries.get(class_name)
+        return entry is not None and time.monotonic() - entry[0] < self.ttl
+
+    def put(self, class_name: str, roster: List[Tuple[int, str]]) -> None:
+        self._entries[class_name] = (time.monotonic(), roster)
+
+    def invalidate(self, class_name: str) -> None:
+        self._entries.pop(class_name, None)
+
+    async def get(self, class_name: str, load: Callable[[], Awaitable[List[Tuple[int, str]]]]):
+        entry = self._entries.get(class_name)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        pending = self._loading.get(class_name)
+        if pending is None:
+            pending = self._loading[class_name] = asyncio.ensure_future(load())
+            pending.add_done_callback(lambda f: self._loaded(class_name, f))
+        return await asyncio.shield(pending)
+
+    def _loaded(self, class_name: str, future: asyncio.Future) -> None:
+        self._loading.pop(class_name, None)
+        if not future.cancelled() and future.exception() is None:
+            self.put(class_name, future.result())
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_ratio": self.hits / total if total else 0.0,
+                "classes": len(self._entries)}
+
+class _PendingMarks:
+    def __init__(self):
+        self.absent: Optional[List[int]] = None   # a whole-day mark, if one is queued
+        self.statuses: Dict[int, str] = {}
+        self.waiters: List[asyncio.Future] = []
+
+class MarkBatcher:
+    """
+    Coalesces /mark requests for one class and date that arrive within window seconds into one
+    transaction. A whole-day mark replaces whatever was queued before it for that day; single
+    statuses are merged, the latest winning. Batches for the same day are applied in order.
+    """
+
+    def __init__(self, server: "AttendanceServer", window: float = 0.005):
+        self.server = server
+        self.window = window
+        self._pending: Dict[Tuple[str, date], _PendingMarks] = {}
+        self._locks: Dict[Tuple[str, date], asyncio.Lock] = {}
+        self._flushing: Dict[Tuple[str, date], int] = {}
+        self._flushes = set()
+        self.requests = 0
+        self.batches = 0
+
+    async def submit(self, class_name: str, day: date, absent: Optional[List[int]] = None,
+                     statuses: Optional[Dict[int, str]] = None) -> int:
+        """Queue a mark and wait until its batch is committed; returns the number of requests in the batch."""
+        loop = asyncio.get_running_loop()
+        key = (class_name, day)
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = self._pending[key] = _PendingMarks()
+            loop.call_later(self.window, self._start_flush, key)
+        if absent is not None:
+            batch.absent = absent
+            batch.statuses = {}
+        if statuses:
+            batch.statuses.update(statuses)
+        waiter = loop.create_future()
+        batch.waiters.append(waiter)
+        self.requests += 1
+        return await waiter
+
+    def _start_flush(self, key: Tuple[str, date]) -> None:
+        task = asyncio.ensure_future(self._flush(key))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, key: Tuple[str, date]) -> None:
+        batch = self._pending.pop(key)
+        # asyncio.Lock wakes waiters in order, so batches for a day commit in the order they closed
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._flushing[key] = self._flushing.get(key, 0) + 1
+        try:
+            async with lock:
+                try:
+                    await self.server.run_db(self._apply, key[0], key[1], batch.absent, batch.statuses)
+                except Exception as e:
+                    for waiter in batch.waiters:
+                        if not waiter.done():
+                            waiter.set_exception(e)
+                else:
+                    for waiter in batch.waiters:
+                        if not waiter.done():
+                            waiter.set_result(len(batch.waiters))
+                self.batches += 1
+        finally:
+            self._flushing[key] -= 1
+            if not self._flushing[key]:
+                del self._flushing[key]
+                del self._locks[key]
+
+    def _apply(self, class_name: str, day: date, absent: Optional[List[int]], statuses: Dict[int, str]) -> None:
+        db = self.server.db
+        dt = datetime(day.year, day.month, day.day)
+        with db.session():
+            if absent is not None:
+                db.mark_all_present(class_name, dt)
+                db.custom_marking_absent(class_name, absent, dt)
+            if statuses:
+                db.save_attendance_grid(class_name, [(roll, "", status) for roll, status in statuses.items()],
+                                        dt, diff=False)
+
+class AttendanceServer:
+    """Serves the routes listed in the module docstring for one AttendanceDB."""
+
+    def __init__(self, db: dbmod.AttendanceDB, workers: Optional[int] = None, roster_ttl: float = 30.0,
+                 batch_window: float = 0.005):
+        self.db = db
+        self.executor = ThreadPoolExecutor(max_workers=workers or db.pool_size or 1,
+                                           thread_name_prefix="attendance-db")
+        self.rosters = RosterCache(roster_ttl)
+        self.marks = MarkBatcher(self, batch_window)
+        self._routes: Dict[Tuple[str, str], Callable[[Request], Awaitable[object]]] = {
+            ("POST", "/login"): self.login,
+            ("POST", "/logout"): self.logout,
+            ("GET", "/roster"): self.roster,
+            ("POST", "/mark"): self.mark,
+            ("GET", "/history"): self.history,
+            ("GET", "/export"): self.export,
+            ("GET", "/stats"): self.stats,
+        }
+        self.requests = 0
+        self.errors = 0
+        self.connections = 0
+
+    async def run_db(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    # ----- sessions -----
+    @staticmethod
+    def _token(request: Request) -> Optional[str]:
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        return token if scheme.lower() == "bearer" else None
+
+    def _session(self, request: Request, class_name: Optional[str] = None) -> dbmod.LoginSession:
+        try:
+            session = self.db.check_session(self._token(request))
+        except dbmod.SessionExpired:
+            raise HTTPError(401, "Log in first.")
+        if class_name is not None and not session.admin and class_name != session.class_name:
+            raise HTTPError(403, f"This session is for class '{session.class_name}'.")
+        return session
+
+    def _class_param(self, value) -> str:
+        if not isinstance(value, str) or not self.db.IDENTIFIER_RE.match(value):
+            raise HTTPError(400, "A valid class name is required.")
+        return value
+
+    async def _known_class(self, class_name: str) -> str:
+        # a freshly cached roster already proves the table exists
+        if class_name not in self.rosters and class_name not in await self.run_db(self.db.class_table_names):
+            raise HTTPError(404, f"Class '{class_name}' not found.")
+        return class_name
+
+    async def _roster(self, class_name: str) -> List[Tuple[int, str]]:
+        return await self.rosters.get(class_name, lambda: self.run_db(self.db.fetch_roster, class_name))
+
+    # ----- routes -----
+    async def login(self, request: Request) -> dict:
+        data = request.json()
+        class_name = self._class_param(data.get("class"))
+        password = data.get("password")
+        if not isinstance(password, str) or not password:
+            raise HTTPError(400, "A password is required.")
+        try:
+            session, roster = await self.run_db(self.db.login, class_name, password)
+        except ValueError as e:
+            raise HTTPError(401, str(e))
+        if roster:
+            self.rosters.put(class_name, roster)
+        return {"token": session.token, "class": class_name, "admin": session.admin, "roster": roster}
+
+    async def logout(self, request: Request) -> dict:
+        self._session(request)
+        self.db.logout(self._token(request))
+        return {"ok": True}
+
+    async def roster(self, request: Request) -> dict:
+        class_name = self._class_param(request.query.get("class"))
+        self._session(request, class_name)
+        await self._known_class(class_name)
+        return {"class": class_name, "roster": await self._roster(class_name)}
+
+    async def mark(self, request: Request) -> dict:
+        data = request.json()
+        class_name = self._class_param(data.get("class"))
+        self._session(request, class_name)
+        day = (_parse_day(data.get("date")) or datetime.now()).date()
+        absent, statuses = data.get("absent"), data.get("statuses")
+        if (absent is None) == (statuses is None):
+            raise HTTPError(400, "Give either 'absent' (a whole day) or 'statuses'.")
+        try:
+            if absent is not None:
+                absent = [int(r) for r in absent]
+            else:
+                statuses = {int(r): s for r, s in dict(statuses).items()}
+        except (TypeError, ValueError):
+            raise HTTPError(400, "Roll numbers must be integers.")
+        if statuses and any(s not in STATUSES for s in statuses.values()):
+            raise HTTPError(400, f"Statuses must be one of {STATUSES}.")
+        await self._known_class(class_name)
+        batched = await self.marks.submit(class_name, day, absent, statuses)
+        return {"ok": True, "batched": batched}
+
+    async def history(self, request: Request) -> dict:
+        class_name = self._class_param(request.query.get("class"))
+        self._session(request, class_name)
+        await self._known_class(class_name)
+        if "start" not in request.query and "end" not in request.query:
+            day = _parse_day(request.query.get("date"))
+            rows = await self.run_db(self.db.fetch_attendance, class_name, day)
+            return {"class": class_name, "date": (day or datetime.now()).date().isoformat(),
+                    "rows": [list(r) for r in rows]}
+        start, end = _parse_day(request.query.get("start")), _parse_day(request.query.get("end"))
+
+        def matrix():
+            with self.db.stream_attendance_matrix(class_name, start, end) as (days, rows):
+                return [d.isoformat() for d in days], [[roll, name, statuses] for roll, name, statuses in rows]
+
+        days, rows = await self.run_db(matrix)
+        return {"class": class_name, "days": days, "rows": rows}
+
+    async def export(self, request: Request) -> Reply:
+        class_name = self._class_param(request.query.get("class"))
+        self._session(request, class_name)
+        await self._known_class(class_name)
+        start, end = _parse_day(request.query.get("start")), _parse_day(request.query.get("end"))
+
+        def render() -> bytes:
+            out = io.StringIO()
+            writer = csv.writer(out)
+            with self.db.stream_attendance_matrix(class_name, start, end) as (days, rows):
+                writer.writerow(["Roll_no", "Student_name"] + [d.isoformat() for d in days])
+                for roll, name, statuses in rows:
+                    writer.writerow([roll, name] + statuses)
+            return out.getvalue().encode("utf-8")
+
+        return Reply(await self.run_db(render), "text/csv; charset=utf-8")
+
+    async def stats(self, request: Request) -> dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "connections": self.connections,
+            "sessions": len(self.db.sessions),
+            "marks": {"requests": self.marks.requests, "batches": self.marks.batches},
+            "roster_cache": self.rosters.stats(),
+            "schema_cache": self.db.schema_cache.stats(),
+            "pool": self.db.pool_stats.snapshot(),
+            "queries": self.db.query_stats.stats() if self.db.query_stats is not None else None,
+        }
+
+    # ----- HTTP -----
+    async def dispatch(self, request: Request) -> Tuple[int, object]:
+        handler = self._routes.get((request.method, request.path))
+        if handler is None:
+            if any(path == request.path for _, path in self._routes):
+                raise HTTPError(405, f"{request.method} is not allowed on {request.path}.")
+            raise HTTPError(404, f"No route for {request.path}.")
+        try:
+            return 200, await handler(request)
+        except HTTPError:
+            raise
+        except ConnectionError as e:
+            raise HTTPError(503, str(e))
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Request]:
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError:
+            return None  # the client closed the connection between requests
+        except asyncio.LimitOverrunError:
+            raise HTTPError(431, "Request headers too large.")
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "Malformed request line.")
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise HTTPError(400, "Invalid Content-Length.")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, "Request body too large.")
+        body = await reader.readexactly(length) if length else b""
+        return Request(method.upper(), target, headers, body)
+
+    @staticmethod
+    def _encode(status: int, payload: object, keep_alive: bool) -> bytes:
+        if isinstance(payload, Reply):
+            body, content_type = payload.body, payload.content_type
+        else:
+            body, content_type = json.dumps(payload, default=str).encode("utf-8"), "application/json"
+        head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        return head.encode("latin-1") + body
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    request = await self._read_request(reader)
+                    if request is None:
+                        break
+                    keep_alive = request.keep_alive
+                    self.requests += 1
+                    status, payload = await self.dispatch(request)
+                except HTTPError as e:
+                    self.errors += 1
+                    status, payload = e.status, {"error": str(e)}
+                except Exception as e:
+                    self.errors += 1
+                    status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+                writer.write(self._encode(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass  # the client went away, or the server is shutting down
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8080, ready: Optional[Callable[[int], None]] = None):
+        """Serve until cancelled; ready(port) is called once listening (port 0 picks a free one)."""
+        server = await asyncio.start_server(self.handle_connection, host, port, limit=MAX_HEADER_BYTES, backlog=1024)
+        if ready:
+            ready(server.sockets[0].getsockname()[1])
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.executor.shutdown(wait=True)
+
+def main(argv=None) -> int:
+    from attendance_cli import add_connection_arguments, db_from_args
+
+    parser = argparse.ArgumentParser(prog="attendance_server", description="HTTP/JSON service over AttendanceDB.")
+    add_connection_arguments(parser)
+    parser.add_argument("--listen", default="127.0.0.1", help="address to bind (default: localhost only)")
+    parser.add_argument("--port", type=int, default=8080, help="0 picks a free port")
+    parser.add_argument("--roster-ttl", type=float, default=30.0, help="seconds a cached roster is trusted")
+    parser.add_argument("--batch-window", type=float, default=0.005, help="seconds /mark requests are coalesced")
+    args = parser.parse_args(argv)
+    if args.pool_size is None:
+        args.pool_size = 8
+    db = db_from_args(args)
+    server = AttendanceServer(db, roster_ttl=args.roster_ttl, batch_window=args.batch_window)
+
+    def ready(port: int) -> None:
+        print(f"listening on http://{args.listen}:{port}", flush=True)
+
+    try:
+        db.connect()
+        asyncio.run(server.serve(args.listen, args.port, ready))
+    except KeyboardInterrupt:
+        pass
+    except (ConnectionError, OSError, db.backend.Error) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    finally:
+        db.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
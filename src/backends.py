@@ -0,0 +1,565 @@
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import List, Optional, Sequence
+
+class PoolStats:
+    """Thread-safe checkout counters used to size the connection pool (times in seconds)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.checkouts = 0
+            self.in_use = 0
+            self.peak_in_use = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+            self.timeouts = 0
+            self.health_check_failures = 0
+
+    def record_checkout(self, waited: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+    def record_release(self) -> None:
+        with self._lock:
+            self.in_use -= 1
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def record_health_failure(self) -> None:
+        with self._lock:
+            self.health_check_failures += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "in_use": self.in_use,
+                "peak_in_use": self.peak_in_use,
+                "avg_wait": self.total_wait / self.checkouts if self.checkouts else 0.0,
+                "max_wait": self.max_wait,
+                "timeouts": self.timeouts,
+                "health_check_failures": self.health_check_failures,
+            }
+
+class StorageBackend(ABC):
+    """
+    Connections and SQL dialect for one database engine. AttendanceDB writes its queries with
+    %s placeholders and backtick-quoted identifiers and asks the backend for everything that
+    differs between engines: DDL, upserts, schema introspection and error classification.
+
+    Without pool_size one shared connection is used and checkouts are serialised; with it up to
+    pool_size checkouts run concurrently and a checkout waits at most pool_timeout seconds.
+    """
+
+    name = "base"
+    Error: type = Exception          # driver exception base class
+    supports_load_data = False       # LOAD DATA LOCAL INFILE
+    insert_ignore = "INSERT IGNORE INTO"
+    blob_type = "BLOB"
+
+    def __init__(self, pool_size: Optional[int] = None, pool_timeout: float = 10.0):
+        self.pool_size = pool_size
+        self.pool_timeout = pool_timeout
+        self.pool_stats = PoolStats()
+        self._pool_slots = threading.BoundedSemaphore(pool_size) if pool_size else None
+        self._conn_lock = threading.RLock()
+
+    @property
+    def is_pooled(self) -> bool:
+        return self.pool_size is not None
+
+    # Connections
+    @abstractmethod
+    def connect(self) -> bool:
+        ...
+
+    @abstractmethod
+    def close(self) -> None:
+        ...
+
+    @abstractmethod
+    def _shared_connection(self):
+        ...
+
+    @abstractmethod
+    def _pooled_connection(self):
+        ...
+
+    @abstractmethod
+    def _return_pooled(self, conn) -> None:
+        ...
+
+    def cursor(self, conn):
+        """Return a cursor whose results can be fetched after further statements on conn."""
+        return conn.cursor()
+
+    def stream_cursor(self, conn):
+        """Return a cursor that fetches rows as they are consumed instead of buffering the result."""
+        return self.cursor(conn)
+
+    def end_stream(self, conn, cursor) -> None:
+        """Close a stream_cursor, discarding rows that were not read."""
+        cursor.close()
+
+    def checkout(self):
+        """Return a live connection for one unit of work, recording wait time."""
+        start = time.perf_counter()
+        if not self.is_pooled:
+            self._conn_lock.acquire()
+            try:
+                conn = self._shared_connection()
+            except Exception:
+                self._conn_lock.release()
+                raise
+            self.pool_stats.record_checkout(time.perf_counter() - start)
+            return conn
+
+        if not self._pool_slots.acquire(timeout=self.pool_timeout):
+            self.pool_stats.record_timeout()
+            raise ConnectionError(f"No database connection available after {self.pool_timeout:.1f}s.")
+        try:
+            conn = self._pooled_connection()
+        except Exception:
+            self._pool_slots.release()
+            raise
+        self.pool_stats.record_checkout(time.perf_counter() - start)
+        return conn
+
+    def release(self, conn) -> None:
+        self.pool_stats.record_release()
+        if not self.is_pooled:
+            self._conn_lock.release()
+            return
+        try:
+            self._return_pooled(conn)
+        finally:
+            self._pool_slots.release()
+
+    # Dialect
+    @abstractmethod
+    def schema_query(self) -> str:
+        """SQL returning (table, column) for every table of the database."""
+
+    @abstractmethod
+    def upsert(self, keys: Sequence[str], updates: Sequence[str], add: bool = False) -> str:
+        """
+        Clause appended to an INSERT so rows clashing on keys update the updates columns instead:
+        overwritten with the inserted values, or with add=True incremented by them.
+        """
+
+    @abstractmethod
+    def class_table_ddl(self, table: str) -> List[str]:
+        ...
+
+    @abstractmethod
+    def attendance_table_ddl(self, table: str) -> List[str]:
+        ...
+
+    def passwords_table_ddl(self) -> List[str]:
+        return ["""
+            CREATE TABLE IF NOT EXISTS class_passwords (
+                class_name VARCHAR(255) PRIMARY KEY,
+                password_hash VARCHAR(255) NOT NULL
+            );
+        """]
+
+    def summary_tables_ddl(self, student_table: str, day_table: str) -> List[str]:
+        return [f"""
+            CREATE TABLE IF NOT EXISTS `{student_table}` (
+                class_id VARCHAR(64) NOT NULL,
+                roll_no INT NOT NULL,
+                present INT NOT NULL DEFAULT 0,
+                absent INT NOT NULL DEFAULT 0,
+                PRIMARY KEY (class_id, roll_no)
+            );
+        """, f"""
+            CREATE TABLE IF NOT EXISTS `{day_table}` (
+                class_id VARCHAR(64) NOT NULL,
+                date DATE NOT NULL,
+                present INT NOT NULL DEFAULT 0,
+                absent INT NOT NULL DEFAULT 0,
+                PRIMARY KEY (class_id, date)
+            );
+        """]
+
+    def roster_versions_table_ddl(self, table: str) -> List[str]:
+        return [f"""
+            CREATE TABLE IF NOT EXISTS `{table}` (
+                class_id VARCHAR(64) PRIMARY KEY,
+                version INT NOT NULL DEFAULT 0
+            );
+        """]
+
+    def bitmap_table_ddl(self, table: str) -> List[str]:
+        return [f"""
+            CREATE TABLE IF NOT EXISTS `{table}` (
+                class_id VARCHAR(64) NOT NULL,
+                date DATE NOT NULL,
+                bitmap {self.blob_type} NOT NULL,
+                PRIMARY KEY (class_id, date)
+            );
+        """]
+
+    def add_columns(self, table: str, columns: Sequence[str], definition: str) -> List[str]:
+        return [f"ALTER TABLE `{table}` " + ", ".join(f"ADD COLUMN `{c}` {definition}" for c in columns) + ";"]
+
+    def drop_columns(self, table: str, columns: Sequence[str]) -> List[str]:
+        return [f"ALTER TABLE `{table}` " + ", ".join(f"DROP COLUMN `{c}`" for c in columns) + ";"]
+
+    def date_param(self, day):
+        """Bind value for a DATE column."""
+        return day
+
+    def is_duplicate_column(self, err: Exception) -> bool:
+        return False
+
+    def is_local_infile_refused(self, err: Exception) -> bool:
+        return False
+
+    def is_connection_lost(self, err: Exception) -> bool:
+        """True if err means the database could not be reached (worth retrying later), not a bad query."""
+        return isinstance(err, ConnectionError)
+
+class MySQLBackend(StorageBackend):
+    """mysql.connector, optionally through a MySQLConnectionPool (imported on construction)."""
+
+    name = "mysql"
+    supports_load_data = True
+    blob_type = "MEDIUMBLOB"     # BLOB caps a class-day at ~260k rolls
+    ER_DUP_FIELDNAME = 1060
+    # CR_CONNECTION_ERROR, CR_CONN_HOST_ERROR, CR_SERVER_GONE_ERROR, CR_SERVER_LOST, CR_SERVER_LOST_EXTENDED
+    CONNECTION_LOST_ERRNOS = frozenset({2002, 2003, 2006, 2013, 2055})
+    # server/client refusals of LOAD DATA LOCAL INFILE
+    LOCAL_INFILE_ERRNOS = frozenset({1148, 2068, 3948, 3950})
+
+    def __init__(self, host: str, user: str, password: str, database: str, pool_size: Optional[int] = None,
+                 pool_timeout: float = 10.0, health_check: bool = True, allow_local_infile: bool = False):
+        import mysql.connector
+        import mysql.connector.pooling
+        if pool_size is not None and not 1 <= pool_size <= mysql.connector.pooling.CNX_POOL_MAXSIZE:
+            raise ValueError(f"pool_size must be between 1 and {mysql.connector.pooling.CNX_POOL_MAXSIZE}.")
+        super().__init__(pool_size, pool_timeout)
+        self._mysql = mysql.connector
+        self.Error = mysql.connector.Error
+        self.host = host
+        self.user = user
+        self.password = password
+        self.database = database
+        self.health_check = health_check
+        self.allow_local_infile = allow_local_infile
+        self.conn = None
+        self._pool = None
+
+    def _connect_args(self) -> dict:
+        return dict(host=self.host, user=self.user, password=self.password, database=self.database,
+                    allow_local_infile=self.allow_local_infile)
+
+    def connect(self) -> bool:
+        if self.is_pooled and self._pool is not None:
+            return True
+        # a background connect may race the first checkout; only one of them opens the pool/connection
+        with self._conn_lock:
+            if self.is_pooled:
+                if self._pool is not None:
+                    return True
+                try:
+                    self._pool = self._mysql.pooling.MySQLConnectionPool(
+                        pool_name=f"attendance_{id(self)}",
+                        pool_size=self.pool_size,
+                        pool_reset_session=True,
+                        **self._connect_args(),
+                    )
+                    return True
+                except self.Error as e:
+                    raise ConnectionError(f"Error connecting to the database: {e}") from e
+
+            if self.conn is not None and self.conn.is_connected():
+                return True
+            try:
+                self.conn = self._mysql.connect(**self._connect_args())
+                return True
+            except self.Error as e:
+                raise ConnectionError(f"Error connecting to the database: {e}") from e
+
+    def close(self) -> None:
+        if self.conn:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+            self.conn = None
+        # Pooled connections are closed when the pool object is garbage collected.
+        self._pool = None
+
+    def _shared_connection(self):
+        self.connect()
+        return self.conn
+
+    def _pooled_connection(self):
+        self.connect()
+        try:
+            conn = self._pool.get_connection()
+            if self.health_check:
+                try:
+                    conn.ping(reconnect=True, attempts=2, delay=0)
+                except self.Error as e:
+                    self.pool_stats.record_health_failure()
+                    conn.close()
+                    raise ConnectionError(f"Pooled connection failed health check: {e}") from e
+        except self.Error as e:
+            raise ConnectionError(f"Error checking out a database connection: {e}") from e
+        return conn
+
+    def _return_pooled(self, conn) -> None:
+        conn.close()  # returns the connection to the pool
+
+    def cursor(self, conn):
+        return conn.cursor(buffered=True)
+
+    def stream_cursor(self, conn):
+        return conn.cursor(buffered=False)
+
+    def end_stream(self, conn, cursor) -> None:
+        # an unbuffered result must be drained before the connection can run anything else
+        conn.consume_results()
+        cursor.close()
+
+    def schema_query(self) -> str:
+        return """
+            SELECT TABLE_NAME, COLUMN_NAME FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE();
+        """
+
+    def upsert(self, keys: Sequence[str], updates: Sequence[str], add: bool = False) -> str:
+        return "ON DUPLICATE KEY UPDATE " + ", ".join(
+            f"{c} = {c} + VALUES({c})" if add else f"{c} = VALUES({c})" for c in updates)
+
+    def class_table_ddl(self, table: str) -> List[str]:
+        return [f"""
+            CREATE TABLE IF NOT EXISTS `{table}` (
+                Student_id INT AUTO_INCREMENT PRIMARY KEY,
+                Student_name VARCHAR(255) NOT NULL,
+                Roll_no INT NOT NULL UNIQUE
+            ) ENGINE=InnoDB;
+        """]
+
+    def attendance_table_ddl(self, table: str) -> List[str]:
+        return [f"""
+            CREATE TABLE IF NOT EXISTS `{table}` (
+                class_id VARCHAR(64) NOT NULL,
+                roll_no INT NOT NULL,
+                date DATE NOT NULL,
+                status VARCHAR(20) NOT NULL DEFAULT 'Absent',
+                PRIMARY KEY (class_id, roll_no, date),
+                KEY idx_class_date (class_id, date, status)
+            ) ENGINE=InnoDB;
+        """]
+
+    def is_duplicate_column(self, err: Exception) -> bool:
+        return getattr(err, "errno", None) == self.ER_DUP_FIELDNAME
+
+    def is_local_infile_refused(self, err: Exception) -> bool:
+        return getattr(err, "errno", None) in self.LOCAL_INFILE_ERRNOS
+
+    def is_connection_lost(self, err: Exception) -> bool:
+        return isinstance(err, ConnectionError) or getattr(err, "errno", None) in self.CONNECTION_LOST_ERRNOS
+
+class _SQLiteCursor:
+    """sqlite3 cursor that accepts the %s placeholders AttendanceDB writes."""
+
+    __slots__ = ("_cur", "_backend")
+
+    def __init__(self, cur: sqlite3.Cursor, backend: "SQLiteBackend"):
+        self._cur = cur
+        self._backend = backend
+
+    def execute(self, sql: str, params: Sequence = ()) -> "_SQLiteCursor":
+        self._cur.execute(self._backend.translate(sql), params)
+        return self
+
+    def executemany(self, sql: str, seq_of_params) -> "_SQLiteCursor":
+        self._cur.executemany(self._backend.translate(sql), seq_of_params)
+        return self
+
+    def fetchone(self):
+        return self._cur.fetchone()
+
+    def fetchmany(self, size: int = 1) -> list:
+        return self._cur.fetchmany(size)
+
+    def fetchall(self) -> list:
+        return self._cur.fetchall()
+
+    def __iter__(self):
+        return iter(self._cur)
+
+    @property
+    def rowcount(self) -> int:
+        return self._cur.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cur.lastrowid
+
+    @property
+    def description(self):
+        return self._cur.description
+
+    def close(self) -> None:
+        self._cur.close()
+
+class SQLiteBackend(StorageBackend):
+    """
+    Embedded SQLite database file, for installs without a MySQL server.
+    Connections run in WAL mode, so readers never block the writer, and keep a prepared-statement
+    cache of cached_statements entries; the %s -> ? translation of each query is memoised so the
+    same SQL text (and therefore the same prepared statement) is reused on every call.
+    With pool_size each thread keeps its own connection and at most pool_size run at once;
+    writers queue on the database lock for up to pool_timeout seconds. ":memory:" databases
+    cannot be shared between connections and always use a single serialised connection.
+    """
+
+    name = "sqlite"
+    Error = sqlite3.Error
+    insert_ignore = "INSERT OR IGNORE INTO"
+    TRANSLATION_CACHE_SIZE = 2048
+
+    def __init__(self, path: str, pool_size: Optional[int] = None, pool_timeout: float = 10.0,
+                 cached_statements: int = 256):
+        if path == ":memory:":
+            pool_size = None
+        if pool_size is not None and pool_size < 1:
+            raise ValueError("pool_size must be at least 1.")
+        super().__init__(pool_size, pool_timeout)
+        self.path = path
+        self.cached_statements = cached_statements
+        self.conn: Optional[sqlite3.Connection] = None
+        self._local = threading.local()
+        self._opened: List[sqlite3.Connection] = []
+        self._opened_lock = threading.Lock()
+        self._generation = 0
+        self._translations: dict = {}
+
+    def translate(self, sql: str) -> str:
+        out = self._translations.get(sql)
+        if out is None:
+            out = sql.replace("%s", "?")
+            if len(self._translations) >= self.TRANSLATION_CACHE_SIZE:
+                self._translations.clear()
+            self._translations[sql] = out
+        return out
+
+    def _open(self) -> sqlite3.Connection:
+        try:
+            if self.path != ":memory:":
+                directory = os.path.dirname(os.path.abspath(self.path))
+                if not os.path.isdir(directory):
+                    raise sqlite3.OperationalError(f"directory {directory} does not exist")
+            # IMMEDIATE: the implicit BEGIN before the first write takes the write lock up front,
+            # so concurrent writers wait on the busy timeout instead of failing mid-transaction
+            conn = sqlite3.connect(self.path, timeout=self.pool_timeout, isolation_level="IMMEDIATE",
+                                   check_same_thread=False, cached_statements=self.cached_statements)
+            if self.path != ":memory:":
+                conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute("PRAGMA synchronous=NORMAL;")
+            conn.execute("PRAGMA temp_store=MEMORY;")
+        except sqlite3.Error as e:
+            raise ConnectionError(f"Error opening the database {self.path}: {e}") from e
+        with self._opened_lock:
+            self._opened.append(conn)
+        return conn
+
+    def connect(self) -> bool:
+        if self.is_pooled:
+            self._pooled_connection()
+            return True
+        with self._conn_lock:
+            if self.conn is None:
+                self.conn = self._open()
+        return True
+
+    def close(self) -> None:
+        with self._opened_lock:
+            opened, self._opened = self._opened, []
+            self._generation += 1
+        for conn in opened:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        self.conn = None
+
+    def _shared_connection(self):
+        self.connect()
+        return self.conn
+
+    def _pooled_connection(self):
+        # one connection per thread, kept between checkouts so its statement cache stays warm
+        if getattr(self._local, "generation", None) != self._generation:
+            self._local.conn = self._open()
+            self._local.generation = self._generation
+        return self._local.conn
+
+    def _return_pooled(self, conn) -> None:
+        pass
+
+    def cursor(self, conn):
+        return _SQLiteCursor(conn.cursor(), self)
+
+    def schema_query(self) -> str:
+        return r"""
+            SELECT m.name, p.name FROM sqlite_master AS m JOIN pragma_table_info(m.name) AS p
+            WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite\_%' ESCAPE '\';
+        """
+
+    def upsert(self, keys: Sequence[str], updates: Sequence[str], add: bool = False) -> str:
+        return (f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET "
+                + ", ".join(f"{c} = {c} + excluded.{c}" if add else f"{c} = excluded.{c}" for c in updates))
+
+    def class_table_ddl(self, table: str) -> List[str]:
+        # INTEGER PRIMARY KEY aliases the rowid and is assigned automatically; UNIQUE indexes Roll_no
+        return [f"""
+            CREATE TABLE IF NOT EXISTS `{table}` (
+                Student_id INTEGER PRIMARY KEY,
+                Student_name VARCHAR(255) NOT NULL,
+                Roll_no INTEGER NOT NULL UNIQUE
+            );
+        """]
+
+    def attendance_table_ddl(self, table: str) -> List[str]:
+        # the (class_id, date, status) index also carries roll_no, so per-day and range reads are covered
+        return [f"""
+            CREATE TABLE IF NOT EXISTS `{table}` (
+                class_id VARCHAR(64) NOT NULL,
+                roll_no INTEGER NOT NULL,
+                date DATE NOT NULL,
+                status VARCHAR(20) NOT NULL DEFAULT 'Absent',
+                PRIMARY KEY (class_id, roll_no, date)
+            ) WITHOUT ROWID;
+        """, f"CREATE INDEX IF NOT EXISTS idx_class_date ON `{table}` (class_id, date, status);"]
+
+    def add_columns(self, table: str, columns: Sequence[str], definition: str) -> List[str]:
+        return [f"ALTER TABLE `{table}` ADD COLUMN `{c}` {definition};" for c in columns]
+
+    def drop_columns(self, table: str, columns: Sequence[str]) -> List[str]:
+        return [f"ALTER TABLE `{table}` DROP COLUMN `{c}`;" for c in columns]
+
+    def date_param(self, day):
+        # stored as ISO text, which sorts and compares like a DATE
+        return day.isoformat()
+
+    def is_duplicate_column(self, err: Exception) -> bool:
+        return isinstance(err, sqlite3.OperationalError) and "duplicate column name" in str(err)
@@ -0,0 +1,232 @@
+"""
+Compact encoding of one class's attendance on one day.
+
+A DayBitmap keeps two packed bitmaps indexed by roll - base_roll: which rolls are enrolled and
+which of them were 'Present'. Any other status ('Late', 'Excused', ...) is an exception entry
+pointing into a small status code table, so a typical class-day costs two bits per student.
+Counts are popcounts over the bitmaps and diffs XOR them, so neither visits every student.
+
+Serialised layout (little endian), as stored in AttendanceDB's attendance_bitmaps table:
+
+    "AB1"  base_roll:u32  span:u32  n_labels:u8
+    n_labels x (len:u8, utf-8 label)          status codes 2.. (0 = Absent, 1 = Present)
+    enrolled bitmap, ceil(span / 8) bytes     bit i (LSB first) is roll base_roll + i
+    present bitmap, ceil(span / 8) bytes
+    n_exceptions:u32, n_exceptions x (offset:u32, code:u8)
+"""
+import struct
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+ABSENT = "Absent"
+PRESENT = "Present"
+# default status code table; codes 2.. are stored per bitmap as exceptions
+STATUS_CODES = (ABSENT, PRESENT, "Late", "Excused")
+
+MAGIC = b"AB1"
+_HEADER = struct.Struct("<3sIIB")
+_COUNT = struct.Struct("<I")
+_EXCEPTION = struct.Struct("<IB")
+
+def popcount(bits: bytes) -> int:
+    """Number of set bits in a packed bitmap."""
+    value = int.from_bytes(bits, "little")
+    return value.bit_count() if hasattr(value, "bit_count") else bin(value).count("1")
+
+def _set_bits(value: int) -> Iterator[int]:
+    """Positions of the set bits of value, lowest first."""
+    while value:
+        low = value & -value
+        yield low.bit_length() - 1
+        value ^= low
+
+class DayBitmap:
+    """Packed statuses of one class-day; see the module docstring for the layout."""
+
+    def __init__(self, base_roll: int = 0, span: int = 0):
+        self.base_roll = base_roll
+        self.span = span
+        self.enrolled = bytearray((span + 7) // 8)
+        self.present = bytearray((span + 7) // 8)
+        self.other: Dict[int, str] = {}  # offset -> status other than Absent/Present
+
+    @classmethod
+    def from_statuses(cls, rows: Iterable[Tuple[int, str]]) -> "DayBitmap":
+        """Build from (roll, status) pairs; a None status counts as Absent."""
+        rows = [(int(roll), status) for roll, status in rows]
+        if not rows:
+            return cls()
+        low = min(r for r, _ in rows)
+        bitmap = cls(low, max(r for r, _ in rows) - low + 1)
+        for roll, status in rows:
+            bitmap.set(roll, status)
+        return bitmap
+
+    def _offset(self, roll: int) -> int:
+        offset = roll - self.base_roll
+        if not 0 <= offset < self.span:
+            raise KeyError(roll)
+        return offset
+
+    def _grow(self, roll: int) -> None:
+        """Widen the bitmaps so roll fits, re-basing when it is below base_roll."""
+        if self.span == 0:
+            self.base_roll, self.span = roll, 1
+            self.enrolled, self.present = bytearray(1), bytearray(1)
+            return
+        low = min(self.base_roll, roll)
+        high = max(self.base_roll + self.span - 1, roll)
+        shift = self.base_roll - low
+        span = high - low + 1
+        size = (span + 7) // 8
+        self.enrolled = bytearray((int.from_bytes(self.enrolled, "little") << shift).to_bytes(size, "little"))
+        self.present = bytearray((int.from_bytes(self.present, "little") << shift).to_bytes(size, "little"))
+        self.other = {offset + shift: label for offset, label in self.other.items()}
+        self.base_roll, self.span = low, span
+
+    def set(self, roll: int, status: Optional[str]) -> None:
+        status = status or ABSENT
+        if not self.base_roll <= roll < self.base_roll + self.span:
+            self._grow(roll)
+        offset = roll - self.base_roll
+        byte, mask = offset >> 3, 1 << (offset & 7)
+        self.enrolled[byte] |= mask
+        if status == PRESENT:
+            self.present[byte] |= mask
+        else:
+            self.present[byte] &= ~mask & 0xFF
+        if status in (ABSENT, PRESENT):
+            self.other.pop(offset, None)
+        else:
+            self.other[offset] = status
+
+    def status(self, roll: int) -> Optional[str]:
+        """Status of roll, or None when it is not enrolled on this day."""
+        try:
+            offset = self._offset(roll)
+        except KeyError:
+            return None
+        byte, mask = offset >> 3, 1 << (offset & 7)
+        if not self.enrolled[byte] & mask:
+            return None
+        if self.present[byte] & mask:
+            return PRESENT
+        return self.other.get(offset, ABSENT)
+
+    def __contains__(self, roll: int) -> bool:
+        return self.status(roll) is not None
+
+    def __len__(self) -> int:
+        return self.enrolled_count()
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, DayBitmap) and list(self.statuses()) == list(other.statuses())
+
+    def statuses(self) -> Iterator[Tuple[int, str]]:
+        """(roll, status) for every enrolled roll, in roll order."""
+        present = int.from_bytes(self.present, "little")
+        for offset in _set_bits(int.from_bytes(self.enrolled, "little")):
+            if present >> offset & 1:
+                yield self.base_roll + offset, PRESENT
+            else:
+                yield self.base_roll + offset, self.other.get(offset, ABSENT)
+
+    def present_rolls(self) -> List[int]:
+        return [self.base_roll + offset for offset in _set_bits(int.from_bytes(self.present, "little"))]
+
+    def enrolled_count(self) -> int:
+        return popcount(self.enrolled)
+
+    def present_count(self) -> int:
+        return popcount(self.present)
+
+    def absent_count(self) -> int:
+        """Enrolled students not marked 'Present' (Late, Excused, ... included)."""
+        return self.enrolled_count() - self.present_count()
+
+    def count(self, status: str) -> int:
+        if status == PRESENT:
+            return self.present_count()
+        if status == ABSENT:
+            return self.absent_count() - len(self.other)
+        return sum(1 for label in self.other.values() if label == status)
+
+    def diff(self, other: "DayBitmap") -> List[Tuple[int, Optional[str], Optional[str]]]:
+        """(roll, status here, status in other) for every roll whose status differs; None = not enrolled."""
+        base = min(self.base_roll, other.base_roll)
+
+        def aligned(bitmap: "DayBitmap", bits: bytearray) -> int:
+            return int.from_bytes(bits, "little") << (bitmap.base_roll - base)
+
+        changed = (aligned(self, self.present) ^ aligned(other, other.present)) \
+            | (aligned(self, self.enrolled) ^ aligned(other, other.enrolled))
+        rolls = {base + offset for offset in _set_bits(changed)}
+        # Late/Excused changes leave both bitmaps alone; compare the exception tables
+        rolls.update(self.base_roll + o for o in self.other)
+        rolls.update(other.base_roll + o for o in other.other)
+        out = []
+        for roll in sorted(rolls):
+            before, after = self.status(roll), other.status(roll)
+            if before != after:
+                out.append((roll, before, after))
+        return out
+
+    def encode(self) -> bytes:
+        used = set(self.other.values())
+        labels = [l for l in STATUS_CODES[2:] if l in used] + sorted(used.difference(STATUS_CODES))
+        if len(labels) > 253:
+            raise ValueError("Too many distinct attendance statuses for one day.")
+        codes = {label: i + 2 for i, label in enumerate(labels)}
+        out = bytearray(_HEADER.pack(MAGIC, self.base_roll, self.span, len(labels)))
+        for label in labels:
+            raw = label.encode("utf-8")
+            if len(raw) > 255:
+                raise ValueError(f"Status label too long: {label!r}")
+            out += bytes((len(raw),)) + raw
+        out += self.enrolled
+        out += self.present
+        out += _COUNT.pack(len(self.other))
+        for offset in sorted(self.other):
+            out += _EXCEPTION.pack(offset, codes[self.other[offset]])
+        return bytes(out)
+
+    @classmethod
+    def decode(cls, blob: bytes) -> "DayBitmap":
+        blob = bytes(blob)
+        try:
+            magic, base_roll, span, n_labels = _HEADER.unpack_from(blob, 0)
+            if magic != MAGIC:
+                raise ValueError(f"not an attendance bitmap (magic {magic!r})")
+            pos = _HEADER.size
+            labels = [ABSENT, PRESENT]
+            for _ in range(n_labels):
+                size = blob[pos]
+                labels.append(blob[pos + 1:pos + 1 + size].decode("utf-8"))
+                pos += 1 + size
+            bitmap = cls(base_roll, span)
+            size = (span + 7) // 8
+            bitmap.enrolled = bytearray(blob[pos:pos + size])
+            bitmap.present = bytearray(blob[pos + size:pos + 2 * size])
+            pos += 2 * size
+            (count,) = _COUNT.unpack_from(blob, pos)
+            pos += _COUNT.size
+            for _ in range(count):
+                offset, code = _EXCEPTION.unpack_from(blob, pos)
+                bitmap.other[offset] = labels[code]
+                pos += _EXCEPTION.size
+        except (struct.error, IndexError, UnicodeDecodeError) as e:
+            raise ValueError(f"Corrupt attendance bitmap: {e}") from None
+        if len(bitmap.enrolled) != size or len(bitmap.present) != size or pos != len(blob):
+            raise ValueError("Corrupt attendance bitmap: length mismatch.")
+        return bitmap
+
+    def to_numpy(self):
+        """(rolls, present) NumPy arrays for the enrolled students; needs NumPy."""
+        # imported here so importing AttendanceDB does not pay for NumPy
+        try:
+            import numpy as np
+        except ImportError:
+            raise RuntimeError("NumPy is not installed.") from None
+        enrolled = np.unpackbits(np.frombuffer(bytes(self.enrolled), dtype=np.uint8), bitorder="little")[:self.span]
+        present = np.unpackbits(np.frombuffer(bytes(self.present), dtype=np.uint8), bitorder="little")[:self.span]
+        offsets = np.flatnonzero(enrolled)
+        return offsets + self.base_roll, present[offsets].astype(bool)
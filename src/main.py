@@ -1,32 +1,97 @@
 import sys
 import csv
+import os
 import re
-from datetime import datetime
-from typing import List, Tuple, Optional
+import threading
+import time
+_IMPORT_STARTED = time.perf_counter()
+from array import array
+from datetime import date, datetime
+from typing import Dict, List, Tuple, Optional
 
 import Main_database as dbmod
+from attendance_grid import AttendanceGrid
+from offline_journal import OfflineWriter, WriteJournal
 
 from PyQt6.QtWidgets import (
     QApplication,QWidget,QLabel,QLineEdit,QPushButton,QVBoxLayout,QHBoxLayout,QListWidget,QStackedWidget,QGridLayout,QMessageBox,QFileDialog,
-    QScrollArea,QCheckBox,QFormLayout,QSpinBox,QTableWidget,QTableWidgetItem,QHeaderView,QDateEdit,QInputDialog,
+    QFormLayout,QSpinBox,QTableView,QListView,QHeaderView,QDateEdit,QInputDialog,
+    QProgressBar,QCheckBox,QComboBox,
 )
-from PyQt6.QtCore import Qt, QDate
+from PyQt6.QtCore import (
+    Qt, QDate, QObject, QRunnable, QThreadPool, QTimer, pyqtSignal, pyqtSlot, QAbstractTableModel, QAbstractListModel,
+    QModelIndex,
+)
+from PyQt6.QtGui import QBrush, QColor
+
+# ---------- Startup timing ----------
+class StartupTimer:
+    """
+    Checkpoints on the way to a usable window, measured from the start of this module's imports.
+    mark() times the critical path step by step; record() adds work done off it (the background
+    connect, pages built on first navigation).
+    """
+    def __init__(self, started: float):
+        self.last = self.started = started
+        self.steps: List[Tuple[str, float]] = []
+        self.background: List[Tuple[str, float]] = []
+
+    def mark(self, label: str) -> None:
+        now = time.perf_counter()
+        self.steps.append((label, now - self.last))
+        self.last = now
+
+    def record(self, label: str, seconds: float) -> None:
+        self.background.append((label, seconds))
+
+    def report(self) -> str:
+        lines = ["startup (ms)"]
+        lines += [f"  {label:<28}{seconds * 1000:>9.1f}" for label, seconds in self.steps]
+        lines.append(f"  {'= window shown':<28}{(self.last - self.started) * 1000:>9.1f}")
+        if self.background:
+            lines.append("off the critical path (ms)")
+            lines += [f"  {label:<28}{seconds * 1000:>9.1f}" for label, seconds in self.background]
+        return "\n".join(lines)
+
+# python main.py --startup-timing: print the breakdown once the connect has settled, then exit
+STARTUP_TIMING = "--startup-timing" in sys.argv or bool(os.environ.get("ATTENDANCE_STARTUP_TIMING"))
+STARTUP = StartupTimer(_IMPORT_STARTED)
+STARTUP.mark("imports")
 
 # ---------- CONFIG ----------
+DB_BACKEND = "mysql"  # "sqlite" for an embedded database file, no server needed
+DB_SQLITE_PATH = "attendance.sqlite3"
 DB_HOST = "localhost"
 DB_USER = "root"
 DB_PASSWORD = #ENTER PASSWORD HERE
 DB_NAME = "attendance"
 ADMIN_PASSWORD = "123"
+DB_STORAGE = "wide"  # "long" after running AttendanceDB.migrate_to_long_format()
+DB_POOL_SIZE = 4     # connections shared by this terminal; None for a single connection
+IMPORT_CHUNK_SIZE = 1000  # CSV rows committed per transaction
+# python main.py --query-stats: time every query and show a live summary in the status bar
+QUERY_STATS = "--query-stats" in sys.argv or bool(os.environ.get("ATTENDANCE_QUERY_STATS"))
+SLOW_QUERY_MS = 100
+SLOW_QUERY_LOG = os.environ.get("ATTENDANCE_SLOW_QUERY_LOG")  # file to append slow statements to
+OFFLINE_JOURNAL = "attendance_journal.sqlite3"  # marks made while the database is down; None to disable
+REPLAY_INTERVAL_MS = 15000  # how often queued marks are retried
 
 # instantiate DB wrapper
 db = dbmod.AttendanceDB(
     host=DB_HOST,
     user=DB_USER,
     password=DB_PASSWORD,
-    database=DB_NAME,
+    database=DB_SQLITE_PATH if DB_BACKEND == "sqlite" else DB_NAME,
     admin_password=ADMIN_PASSWORD,
+    storage=DB_STORAGE,
+    pool_size=DB_POOL_SIZE,
+    backend=DB_BACKEND,
 )
+if QUERY_STATS or SLOW_QUERY_LOG:
+    db.enable_query_stats(slow_ms=SLOW_QUERY_MS, slow_log=SLOW_QUERY_LOG)
+# marking, adding students and grid saves go through db_writer so they survive an outage
+db_writer = OfflineWriter(db, WriteJournal(OFFLINE_JOURNAL) if OFFLINE_JOURNAL else None)
+STARTUP.mark(f"database wrapper ({DB_BACKEND})")
 
 # ---------- Small utilities ----------
 def show_error(title: str, msg: str):
@@ -38,24 +103,272 @@ def show_info(title: str, msg: str):
 def is_valid_identifier(name: str) -> bool:
     return bool(re.match(r"^[A-Za-z][A-Za-z0-9_]*$", name))
 
+# ---------- Background DB tasks ----------
+class TaskSignals(QObject):
+    """Signals emitted by a DBTask; created on the GUI thread so slots run there."""
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+    progress = pyqtSignal(int, int)
+
+class DBTask(QRunnable):
+    """
+    Runs fn(*args, **kwargs) on a QThreadPool thread. With hooks=True fn also receives
+    progress(done, total) and cancel() keyword arguments for cooperative cancellation.
+    """
+    def __init__(self, fn, *args, hooks: bool = False, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = TaskSignals()
+        self._cancel = threading.Event()
+        if hooks:
+            self.kwargs["progress"] = self.signals.progress.emit
+            self.kwargs["cancel"] = self._cancel.is_set
+
+    def cancel(self):
+        self._cancel.set()
+
+    def run(self):
+        if self._cancel.is_set():
+            self.signals.cancelled.emit()
+            return
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except dbmod.OperationCancelled:
+            self.signals.cancelled.emit()
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+        else:
+            # a cancelled task's result is dropped so the page is not updated behind the user's back
+            if self._cancel.is_set():
+                self.signals.cancelled.emit()
+            else:
+                self.signals.finished.emit(result)
+
+# ---------- Table models ----------
+class AttendanceTableModel(QAbstractTableModel):
+    """
+    Qt view over an AttendanceGrid. Editable models make the name column editable and the
+    Attendance column checkable, and tint rows that differ from what was loaded.
+    """
+    HEADERS = ["Roll No", "Student Name", "Attendance"]
+    DIRTY_BRUSH = QBrush(QColor("#fff4ce"))
+
+    def __init__(self, editable: bool = False, parent=None):
+        super().__init__(parent)
+        self.editable = editable
+        self.grid = AttendanceGrid()
+
+    def load(self, rows):
+        self.beginResetModel()
+        self.grid.load(rows)
+        self.endResetModel()
+
+    def mark_clean(self):
+        self.grid.mark_clean()
+        if len(self.grid):
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self.grid) - 1, 2),
+                                  [Qt.ItemDataRole.BackgroundRole])
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.grid)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row, col = index.row(), index.column()
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            if col == 0:
+                return str(self.grid.roll(row))
+            if col == 1:
+                return self.grid.name(row)
+            return None if self.editable else self.grid.status(row)
+        if role == Qt.ItemDataRole.CheckStateRole and col == 2 and self.editable:
+            return Qt.CheckState.Checked if self.grid.is_present(row) else Qt.CheckState.Unchecked
+        if role == Qt.ItemDataRole.BackgroundRole and self.editable and self.grid.is_dirty(row):
+            return self.DIRTY_BRUSH
+        return None
+
+    def flags(self, index):
+        flags = Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled
+        if self.editable and index.column() == 1:
+            flags |= Qt.ItemFlag.ItemIsEditable
+        elif self.editable and index.column() == 2:
+            flags |= Qt.ItemFlag.ItemIsUserCheckable
+        return flags
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if not index.isValid() or not self.editable:
+            return False
+        row, col = index.row(), index.column()
+        if col == 1 and role == Qt.ItemDataRole.EditRole:
+            changed = self.grid.set_name(row, str(value))
+        elif col == 2 and role == Qt.ItemDataRole.CheckStateRole:
+            changed = self.grid.set_present(row, Qt.CheckState(value) == Qt.CheckState.Checked)
+        else:
+            return False
+        if changed:
+            self.dataChanged.emit(self.index(row, 0), self.index(row, 2))
+        return changed
+
+class RosterCheckModel(QAbstractListModel):
+    """Checkable "roll — name" rows for picking students; check state is one byte per row."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rolls = array("i")
+        self.names: List[str] = []
+        self.checked = bytearray()
+
+    def load(self, students: List[Tuple[int, str]]):
+        self.beginResetModel()
+        self.rolls = array("i", (int(r) for r, _ in students))
+        self.names = [n for _, n in students]
+        self.checked = bytearray(len(self.rolls))
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rolls)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        if role == Qt.ItemDataRole.DisplayRole:
+            return f"{self.rolls[row]} — {self.names[row]}"
+        if role == Qt.ItemDataRole.CheckStateRole:
+            return Qt.CheckState.Checked if self.checked[row] else Qt.CheckState.Unchecked
+        return None
+
+    def flags(self, index):
+        return Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsUserCheckable
+
+    def setData(self, index, value, role=Qt.ItemDataRole.CheckStateRole):
+        if not index.isValid() or role != Qt.ItemDataRole.CheckStateRole:
+            return False
+        self.checked[index.row()] = 1 if Qt.CheckState(value) == Qt.CheckState.Checked else 0
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.CheckStateRole])
+        return True
+
+    def checked_rolls(self) -> List[int]:
+        return [roll for roll, flag in zip(self.rolls, self.checked) if flag]
+
+    def clear_checks(self):
+        if any(self.checked):
+            self.checked = bytearray(len(self.rolls))
+            self.dataChanged.emit(self.index(0), self.index(len(self.rolls) - 1),
+                                  [Qt.ItemDataRole.CheckStateRole])
+
+    def set_checked_rolls(self, rolls) -> None:
+        wanted = set(rolls)
+        self.checked = bytearray(1 if roll in wanted else 0 for roll in self.rolls)
+        if self.rolls:
+            self.dataChanged.emit(self.index(0), self.index(len(self.rolls) - 1),
+                                  [Qt.ItemDataRole.CheckStateRole])
+
+class StatsTableModel(QAbstractTableModel):
+    """Read-only table of precomputed report rows; rows flagged in alerts are tinted."""
+    ALERT_BRUSH = QBrush(QColor("#f8d7da"))
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.headers: List[str] = []
+        self.rows: List[tuple] = []
+        self.alerts = bytearray()
+
+    def load(self, headers: List[str], rows: List[tuple], alerts: bytearray):
+        self.beginResetModel()
+        self.headers = headers
+        self.rows = rows
+        self.alerts = alerts
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.headers[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        value = self.rows[index.row()][index.column()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return f"{value:.1f}" if isinstance(value, float) else str(value)
+        if role == Qt.ItemDataRole.TextAlignmentRole and isinstance(value, (int, float)):
+            return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+        if role == Qt.ItemDataRole.BackgroundRole and self.alerts[index.row()]:
+            return self.ALERT_BRUSH
+        return None
+
+def make_roster_view(model: RosterCheckModel) -> QListView:
+    """List view that only lays out and paints the visible rows."""
+    view = QListView()
+    view.setModel(model)
+    view.setUniformItemSizes(True)
+    view.setLayoutMode(QListView.LayoutMode.Batched)
+    return view
+
+def make_attendance_view(model: AttendanceTableModel) -> QTableView:
+    """Table view with fixed row heights and column widths, so cost does not grow with the roster."""
+    view = QTableView()
+    view.setModel(model)
+    view.verticalHeader().hide()
+    view.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+    view.verticalHeader().setDefaultSectionSize(28)
+    header = view.horizontalHeader()
+    header.setSectionResizeMode(0, QHeaderView.ResizeMode.Interactive)
+    header.setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
+    header.setSectionResizeMode(2, QHeaderView.ResizeMode.Interactive)
+    header.resizeSection(0, 100)
+    header.resizeSection(2, 120)
+    return view
+
+def make_stats_view(model: StatsTableModel) -> QTableView:
+    """Fixed-size rows and columns like make_attendance_view; the last column takes the slack."""
+    view = QTableView()
+    view.setModel(model)
+    view.verticalHeader().hide()
+    view.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+    view.verticalHeader().setDefaultSectionSize(28)
+    view.horizontalHeader().setDefaultSectionSize(110)
+    view.horizontalHeader().setStretchLastSection(True)
+    return view
+
 # ---------- Transient state manager ----------
 class AppState:
     """Holds last_logged_in_class and last_student_list (Roll_no,name)"""
     last_logged_in_class: Optional[str] = None
     last_student_list: List[Tuple[int, str]] = []
     last_absent_list: List[int] = []
-    last_class_password: Optional[str] = None
+    # token of the login session (see AttendanceDB.login); the password itself is not kept
+    session_token: Optional[str] = None
 
     # Admin flag
     is_admin: bool = False
 
     @classmethod
-    def set_class_password(cls, pw: Optional[str]):
-        cls.last_class_password = pw
+    def set_session_token(cls, token: Optional[str]):
+        cls.session_token = token
 
     @classmethod
-    def get_class_password(cls) -> Optional[str]:
-        return cls.last_class_password
+    def get_session_token(cls) -> Optional[str]:
+        return cls.session_token
 
     @classmethod
     def set_logged_class(cls, name: Optional[str]):
@@ -136,13 +449,13 @@ GLOBAL_STYLE = """
         color: #666;
     }
 
-    QListWidget, QScrollArea, QTableWidget {
+    QListWidget, QListView, QScrollArea, QTableView {
         border: 1px solid #d2d9e1;
         border-radius: 6px;
         background-color: #ffffff;
     }
 
-    QTableWidget {
+    QTableView {
         gridline-color: #d0d7df;
         selection-background-color: #dcecff;
         alternate-background-color: #f7f9fc;
@@ -159,17 +472,17 @@ GLOBAL_STYLE = """
         color: black;
         font-size: 13px;
     }
-    QCheckBox::indicator {
+    QCheckBox::indicator, QListView::indicator, QTableView::indicator {
         width: 16px;
         height: 16px;
         border-radius: 3px;
         border: 1px solid #0078d4;
         background-color: white;
     }
-    QCheckBox::indicator:hover {
+    QCheckBox::indicator:hover, QListView::indicator:hover, QTableView::indicator:hover {
         border: 1px solid #3399ff;
     }
-    QCheckBox::indicator:checked {
+    QCheckBox::indicator:checked, QListView::indicator:checked, QTableView::indicator:checked {
         background-color: #0078d4;
         image: url(:/qt-project.org/styles/commonstyle/images/checkboxindicator.png);
     }
@@ -249,30 +562,24 @@ class LoginWidget(QWidget):
             )
             return
 
-        try:
-            # Admin sign-in detection
-            if password == ADMIN_PASSWORD:
-                AppState.set_is_admin(True)
-                AppState.set_logged_class(class_name)
-                AppState.set_class_password(password)
-                try:
-                    students = db.authenticate_user(class_name, password)
-                    AppState.set_students(students)
-                except Exception:
-                    AppState.set_students([])
+        def logged_in(result):
+            session, students = result
+            # the admin password opens an admin session (valid for every class)
+            AppState.set_is_admin(session.admin)
+            AppState.set_logged_class(class_name)
+            AppState.set_session_token(session.token)
+            AppState.set_students(students)
+            self.password_input.clear()
+            if session.admin:
                 show_info("Admin login", "Logged in with administrative access.")
-            else:
-                # Normal class login
-                students = db.authenticate_user(class_name, password)
-                AppState.set_is_admin(False)
-                AppState.set_logged_class(class_name)
-                AppState.set_class_password(password)
-                AppState.set_students(students)
-
             self.nav.goto_dashboard()
 
-        except Exception as e:
-            show_error("Login failed", str(e))
+        self.nav.run_db(
+            db_writer.login, class_name, password,
+            on_result=logged_in,
+            on_error=lambda msg: show_error("Login failed", msg),
+            busy_text="Signing in…",
+        )
 
     def on_create_class(self):
 
@@ -288,40 +595,196 @@ class LoginWidget(QWidget):
             )
             return
 
-        try:
+        pw, ok2 = QInputDialog.getText(
+            self,
+            "Set Class Password",
+            f"Enter password for '{class_name}':",
+            QLineEdit.EchoMode.Password,
+        )
+        pw = pw.strip() if ok2 else ""
 
+        def create():
             db.create_table_for_class(class_name)
+            if pw:
+                db.set_class_password(class_name, pw)
 
-            pw, ok2 = QInputDialog.getText(
-                self,
-                "Set Class Password",
-                f"Enter password for '{class_name}':",
-                QLineEdit.EchoMode.Password,
-            )
-
-            if ok2 and pw.strip():
-                db.set_class_password(class_name, pw.strip())
+        def created(_):
+            if pw:
                 show_info("Created", f"Class '{class_name}' created with its own password.")
             else:
                 show_info("Created", f"Class '{class_name}' created, but no password set yet.")
-
             self.class_input.setText(class_name)
 
-        except Exception as e:
-            show_error("Create failed", str(e))
+        self.nav.run_db(
+            create,
+            on_result=created,
+            on_error=lambda msg: show_error("Create failed", msg),
+            busy_text=f"Creating {class_name}…",
+        )
 
 # ---------- Main Window ----------
+def _lazy_page(name: str, widget_class):
+    """Navigator attribute that builds its page (widget_class() -> class) on first access."""
+    return property(lambda nav: nav._page(name, widget_class))
+
 class Navigator(QWidget):
-    """Manages screens and top-level app layout and styling."""
+    """
+    Manages screens and top-level app layout and styling. Only the login page is built up front;
+    the others are created and added to the stack the first time they are navigated to.
+    """
+    dashboard = _lazy_page("dashboard", lambda: DashboardWidget)
+    display = _lazy_page("display", lambda: DisplayWidget)
+    select_absent = _lazy_page("select_absent", lambda: SelectAbsentWidget)
+    add_student = _lazy_page("add_student", lambda: AddStudentWidget)
+    import_csv = _lazy_page("import_csv", lambda: ImportCSVWidget)
+    delete_page = _lazy_page("delete_page", lambda: DeleteWidget)
+    history = _lazy_page("history", lambda: HistoryWidget)
+    analytics = _lazy_page("analytics", lambda: AnalyticsWidget)
+
+    CONNECTING = "Connecting to database…"
+    QUERY_READOUT_SEP = "  ·  "
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Attendance Manager")
         self.setMinimumSize(900, 700)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(DB_POOL_SIZE or 1)
+        self._tasks = {}
+        self._pages = {}
+        self._shown = False
         self._build_ui()
-        try:
-            db.connect()
-        except Exception as e:
-            show_error("DB Connect", f"Could not connect at startup: {e}")
+        self._connect_in_background()
+        self._replay_task = None
+        self._replay_timer = QTimer(self)
+        self._replay_timer.timeout.connect(self._replay_pending)
+        self._replay_timer.start(REPLAY_INTERVAL_MS)
+        self.refresh_pending()
+        if QUERY_STATS:
+            self._query_timer = QTimer(self)
+            self._query_timer.timeout.connect(self._refresh_query_readout)
+            self._query_timer.start(1000)
+
+    def _page(self, name: str, widget_class):
+        page = self._pages.get(name)
+        if page is None:
+            started = time.perf_counter()
+            page = self._pages[name] = widget_class()(self)
+            self.stack.addWidget(page)
+            STARTUP.record(f"build {name} page", time.perf_counter() - started)
+        return page
+
+    # ----- startup connect -----
+    def _connect_in_background(self):
+        """
+        Open the database connection (or pool) on a pool thread so the window shows without
+        waiting for the server. Pages stay enabled: a task started meanwhile connects on demand.
+        """
+        self._connect_started = time.perf_counter()
+        self._connect_task = DBTask(db.connect)
+        self._connect_task.signals.finished.connect(self._on_connected)
+        self._connect_task.signals.failed.connect(self._on_connect_failed)
+        self.lbl_status.setText(self.CONNECTING)
+        self.pool.start(self._connect_task)
+
+    def _set_connection_status(self, text: str):
+        # tasks started while connecting put this back when they end, not "Connecting…"
+        for key, entry in self._tasks.items():
+            if entry[4] == self.CONNECTING:
+                self._tasks[key] = entry[:4] + (text,)
+        if self.lbl_status.text() == self.CONNECTING:
+            self.lbl_status.setText(text)
+
+    def _connect_settled(self):
+        STARTUP.record(f"connect ({DB_BACKEND})", time.perf_counter() - self._connect_started)
+        self._connect_task = None
+        self._report_startup()
+
+    def mark_shown(self):
+        """Called by main() once the window has been painted."""
+        self._shown = True
+        self._report_startup()
+
+    def _report_startup(self):
+        # the connect may settle before or after the first paint; report once both are in
+        if STARTUP_TIMING and self._shown and self._connect_task is None:
+            print(STARTUP.report(), file=sys.stderr)
+            QTimer.singleShot(0, QApplication.instance().quit)
+
+    @pyqtSlot(object)
+    def _on_connected(self, _):
+        self._set_connection_status("Connected")
+        self._connect_settled()
+
+    @pyqtSlot(str)
+    def _on_connect_failed(self, message):
+        self._set_connection_status("Database unavailable")
+        self.lbl_status.setToolTip(message)
+        self._connect_settled()
+        if db_writer.journal is not None:
+            db_writer.offline = True
+        if not STARTUP_TIMING:
+            if db_writer.journal is not None:
+                message += ("\n\nClasses that have logged in on this computer before can still log in and mark "
+                            "attendance; it is saved here and sent when the database is back.")
+            show_error("DB Connect", f"Could not connect at startup: {message}")
+
+    # ----- offline journal -----
+    def refresh_pending(self):
+        """Show the number of writes waiting in the offline journal (hidden when there are none)."""
+        pending, failed = db_writer.pending_count(), db_writer.failed_count()
+        self.lbl_pending.setText(f"{pending} pending" + (f", {failed} failed" if failed else ""))
+        tip = (f"{pending} write(s) saved on this computer while the database was "
+               f"unreachable; retried every {REPLAY_INTERVAL_MS // 1000}s.")
+        if failed:
+            tip += f"\n{failed} write(s) could not be applied; they are kept in {db_writer.journal.path}."
+        self.lbl_pending.setToolTip(tip)
+        self.lbl_pending.setVisible(pending > 0 or failed > 0)
+
+    def report_write(self, sent: bool, title: str, message: str):
+        """Confirm a write made through db_writer; a queued one says so and updates the pending badge."""
+        self.refresh_pending()
+        if sent:
+            show_info(title, message)
+        else:
+            show_info(f"{title} (offline)", f"{message}\n\nThe database is unreachable, so this was saved on "
+                                            f"this computer and will be sent when it is back.")
+
+    def _replay_pending(self):
+        if self._replay_task is not None or (not db_writer.offline and not db_writer.pending_count()):
+            return
+        # off the run_db path: a replay neither disables the pages nor shows a busy bar
+        self._replay_task = DBTask(db_writer.replay)
+        self._replay_task.signals.finished.connect(self._on_replayed)
+        self._replay_task.signals.failed.connect(self._on_replay_failed)
+        self.pool.start(self._replay_task)
+
+    @pyqtSlot(object)
+    def _on_replayed(self, report):
+        self._replay_task = None
+        self.refresh_pending()
+        if not report.offline and self.lbl_status.text() == "Database unavailable":
+            self.lbl_status.setText("Connected")
+        if report.conflicts:
+            show_info("Offline changes sent", "\n".join(report.lines()))
+        elif report.applied and not self._tasks:
+            self.lbl_status.setText(f"Sent {report.applied} offline change(s)")
+
+    @pyqtSlot(str)
+    def _on_replay_failed(self, message):
+        self._replay_task = None
+        self.refresh_pending()
+        self.lbl_pending.setToolTip(f"{self.lbl_pending.toolTip()}\nLast retry failed: {message}")
+
+    def _refresh_query_readout(self):
+        """Live query summary after the status text (while idle), full breakdown in its tooltip."""
+        stats = db.query_stats
+        if stats is None:
+            return
+        self.lbl_status.setToolTip("\n".join(stats.report(5)))
+        text = self.lbl_status.text().partition(self.QUERY_READOUT_SEP)[0]
+        if not self._tasks and text != self.CONNECTING:
+            self.lbl_status.setText(text + self.QUERY_READOUT_SEP + stats.summary())
 
     def _build_ui(self):
         main_v = QVBoxLayout()
@@ -333,37 +796,25 @@ class Navigator(QWidget):
         toolbar.addStretch()
         self.lbl_status = QLabel("Ready")
         toolbar.addWidget(self.lbl_status)
+        self.lbl_pending = QLabel()
+        self.lbl_pending.setStyleSheet("background:#f0ad4e; color:white; border-radius:8px; padding:2px 8px;")
+        self.lbl_pending.hide()
+        toolbar.addWidget(self.lbl_pending)
+        self.busy_bar = QProgressBar()
+        self.busy_bar.setFixedWidth(160)
+        self.busy_bar.setTextVisible(False)
+        self.busy_bar.hide()
+        toolbar.addWidget(self.busy_bar)
+        self.btn_cancel = QPushButton("Cancel")
+        self.btn_cancel.clicked.connect(self.cancel_tasks)
+        self.btn_cancel.hide()
+        toolbar.addWidget(self.btn_cancel)
         main_v.addLayout(toolbar)
 
-        # stacked pages
+        # stacked pages; the rest are added by _page() on first navigation
         self.stack = QStackedWidget()
-        # instantiate pages
         self.login = LoginWidget(self)
-        self.dashboard = None
-        self.display = None
-        self.select_absent = None
-        self.add_student = None
-        self.import_csv = None
-        self.delete_page = None
-        self.history = None
-
-        # Create pages
-        self.dashboard = DashboardWidget(self)
-        self.display = DisplayWidget(self)
-        self.select_absent = SelectAbsentWidget(self)
-        self.add_student = AddStudentWidget(self)
-        self.import_csv = ImportCSVWidget(self)
-        self.delete_page = DeleteWidget(self)
-        self.history = HistoryWidget(self)
-
-        self.stack.addWidget(self.login)         # index 0
-        self.stack.addWidget(self.dashboard)     # index 1
-        self.stack.addWidget(self.display)       # index 2
-        self.stack.addWidget(self.select_absent) # index 3
-        self.stack.addWidget(self.add_student)   # index 4
-        self.stack.addWidget(self.import_csv)    # index 5
-        self.stack.addWidget(self.delete_page)   # index 6
-        self.stack.addWidget(self.history)       # index 7
+        self.stack.addWidget(self.login)
 
         main_v.addWidget(self.stack)
         self.setLayout(main_v)
@@ -374,6 +825,92 @@ class Navigator(QWidget):
         # apply global style
         self.setStyleSheet(GLOBAL_STYLE)
 
+    # ----- background DB work -----
+    def run_db(self, fn, *args, on_result=None, on_error=None, on_progress=None,
+               busy_text: str = "Working…", cancellable: bool = False, **kwargs) -> DBTask:
+        """
+        Run a database call off the GUI thread. on_result(result), on_error(message) and
+        on_progress(done, total) are invoked on the GUI thread. Pages are disabled while
+        work is pending; cancellable tasks get progress/cancel hooks and a Cancel button.
+        """
+        task = DBTask(fn, *args, hooks=cancellable, **kwargs)
+        self._tasks[task.signals] = (task, on_result, on_error, on_progress, self.lbl_status.text())
+        task.signals.finished.connect(self._on_task_finished)
+        task.signals.failed.connect(self._on_task_failed)
+        task.signals.cancelled.connect(self._on_task_cancelled)
+        task.signals.progress.connect(self._on_task_progress)
+
+        self.lbl_status.setText(busy_text)
+        self.busy_bar.setRange(0, 0)  # indeterminate until the task reports a total
+        self.busy_bar.show()
+        self.btn_cancel.setVisible(cancellable or self.btn_cancel.isVisible())
+        self.stack.setEnabled(False)
+        self.pool.start(task)
+        return task
+
+    def cancel_tasks(self):
+        for task, *_ in self._tasks.values():
+            task.cancel()
+        self.lbl_status.setText("Cancelling…")
+
+    def _end_task(self):
+        entry = self._tasks.pop(self.sender(), None)
+        if not self._tasks:
+            self.busy_bar.hide()
+            self.btn_cancel.hide()
+            self.stack.setEnabled(True)
+            if entry:
+                self.lbl_status.setText(entry[4])
+        return entry
+
+    @pyqtSlot(object)
+    def _on_task_finished(self, result):
+        entry = self._end_task()
+        if entry and entry[1]:
+            try:
+                entry[1](result)
+            except Exception as e:
+                # an exception escaping a slot would abort the application
+                (entry[2] or (lambda msg: show_error("Error", msg)))(str(e))
+
+    @pyqtSlot(str)
+    def _on_task_failed(self, message):
+        entry = self._end_task()
+        if entry and entry[2]:
+            entry[2](message)
+        else:
+            show_error("Database error", message)
+
+    @pyqtSlot()
+    def _on_task_cancelled(self):
+        self._end_task()
+        self.lbl_status.setText("Cancelled")
+
+    @pyqtSlot(int, int)
+    def _on_task_progress(self, done, total):
+        entry = self._tasks.get(self.sender())
+        if total > 0:
+            self.busy_bar.setRange(0, total)
+            self.busy_bar.setValue(done)
+        if entry and entry[3]:
+            entry[3](done, total)
+
+    def require_session(self, class_name: Optional[str] = None, admin: bool = False) -> bool:
+        """
+        O(1) check of the login session (and its class, or admin rights) before a read or write;
+        a lapsed one goes back to login.
+        """
+        try:
+            session = db.check_session(AppState.get_session_token(), class_name)
+        except dbmod.SessionExpired as e:
+            show_error("Session", str(e))
+            self.goto_login()
+            return False
+        if admin and not session.admin:
+            show_error("Admin only", "This needs an administrator login.")
+            return False
+        return True
+
     def goto_login(self):
         self.stack.setCurrentWidget(self.login)
         self.lbl_status.setText("Login")
@@ -443,6 +980,13 @@ class Navigator(QWidget):
         self.stack.setCurrentWidget(self.history)
         self.lbl_status.setText("History")
 
+    def goto_analytics(self):
+        pre = AppState.get_logged_class() or ""
+        self._apply_class_field_state(self.analytics, prefill=pre)
+        self.analytics.apply_admin_state()
+        self.stack.setCurrentWidget(self.analytics)
+        self.lbl_status.setText("Analytics")
+
 # ---------- Widgets ----------
 class DashboardWidget(QWidget):
     def __init__(self, navigator):
@@ -492,6 +1036,13 @@ class DashboardWidget(QWidget):
         header.addWidget(self.date_edit)
         v.addLayout(header)
 
+        # attendance-to-date totals from the summary tables (hidden until they are built)
+        self.totals_label = QLabel("")
+        self.totals_label.setWordWrap(True)
+        self.totals_label.setStyleSheet("color:#444;")
+        self.totals_label.hide()
+        v.addWidget(self.totals_label)
+
         grid = QGridLayout()
         grid.setSpacing(15)
 
@@ -503,6 +1054,7 @@ class DashboardWidget(QWidget):
             ("Import CSV", lambda: self.nav.goto_import()),
             ("Delete Students", lambda: self.nav.goto_delete()),
             ("Attendance History", lambda: self.nav.goto_history()),
+            ("Analytics", lambda: self.nav.goto_analytics()),
         ]
 
         for i, (text, fn) in enumerate(buttons[:6]):
@@ -520,6 +1072,10 @@ class DashboardWidget(QWidget):
         hist_btn.setMinimumHeight(36)
         hist_btn.clicked.connect(buttons[6][1])
         center_layout.addWidget(hist_btn)
+        analytics_btn = QPushButton("Analytics")
+        analytics_btn.setMinimumHeight(36)
+        analytics_btn.clicked.connect(buttons[7][1])
+        center_layout.addWidget(analytics_btn)
         center_layout.addStretch()
         center_layout.setContentsMargins(0, 0, 0, 0)
         v.addWidget(center_container)
@@ -592,26 +1148,58 @@ class DashboardWidget(QWidget):
         for roll, name in students[:50]:
             self.preview_list.addItem(f"{roll} — {name}")
 
+        self.totals_label.hide()
+        if class_name:
+            self.nav.run_db(
+                lambda: db.fetch_attendance_summary(class_name) if db.has_summary() else None,
+                on_result=self._show_totals,
+                on_error=lambda msg: None,  # totals are optional; the dashboard works without them
+                busy_text=f"Dashboard — {class_name}",
+            )
+
+    def _show_totals(self, summary):
+        if not summary:
+            return
+        present = sum(r[2] for r in summary)
+        cells = present + sum(r[3] for r in summary)
+        days = max(r[2] + r[3] for r in summary)
+        import analytics  # deferred: not needed to show the login window
+        threshold = analytics.DEFAULT_THRESHOLD
+        low = [r[0] for r in summary if r[2] + r[3] and 100.0 * r[2] / (r[2] + r[3]) < threshold]
+        text = f"Attendance to date: {100.0 * present / cells if cells else 0.0:.1f}% over {days} day(s)"
+        if low:
+            shown = ", ".join(str(roll) for roll in low[:15]) + (" …" if len(low) > 15 else "")
+            text += f" — {len(low)} student(s) below {threshold:g}%: {shown}"
+        self.totals_label.setText(text)
+        self.totals_label.show()
+
     def on_mark_all_present(self):
         class_name = AppState.get_logged_class()
         if not class_name:
             show_error("Not logged in", "Please login first.")
             self.nav.goto_login()
             return
+        if not self.nav.require_session(class_name):
+            return
 
         date_qdate = self.date_edit.date()
         dt = datetime(date_qdate.year(), date_qdate.month(), date_qdate.day())
 
-        try:
-            db.mark_all_present(class_name, dt)
-            show_info("Success", f"All students marked Present on {dt.strftime('%Y-%m-%d')}.")
-            students = db.authenticate_user(class_name, AppState.get_class_password())
+        def mark():
+            return db_writer.mark_all_present(class_name, dt), db_writer.roster(class_name)
+
+        def marked(result):
+            sent, students = result
+            self.nav.report_write(sent, "Success", f"All students marked Present on {dt.strftime('%Y-%m-%d')}.")
             AppState.set_students(students)
             AppState.set_absent([])
-        except Exception as e:
-            show_error("Failed", str(e))
+
+        self.nav.run_db(mark, on_result=marked, on_error=lambda msg: show_error("Failed", msg),
+                        busy_text="Marking all present…")
 
     def on_logout(self):
+        db.logout(AppState.get_session_token())
+        AppState.set_session_token(None)
         # Clear admin flag on logout
         AppState.set_is_admin(False)
         AppState.set_logged_class(None)
@@ -626,7 +1214,9 @@ class DisplayWidget(QWidget):
     def __init__(self, navigator):
         super().__init__()
         self.nav = navigator
-        self.table: Optional[QTableWidget] = None
+        self.table: Optional[QTableView] = None
+        self.model = AttendanceTableModel(editable=True, parent=self)
+        self._loaded_for: Optional[Tuple[str, datetime]] = None
         self._build_ui()
 
     def _build_ui(self):
@@ -668,13 +1258,7 @@ class DisplayWidget(QWidget):
         row.addWidget(btn_export)
         v.addLayout(row)
 
-        self.table = QTableWidget()
-        self.table.setColumnCount(3)
-        self.table.setHorizontalHeaderLabels(["Roll No", "Student Name", "Attendance"])
-        header = self.table.horizontalHeader()
-        header.setSectionResizeMode(0, QHeaderView.ResizeMode.ResizeToContents)
-        header.setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
-        header.setSectionResizeMode(2, QHeaderView.ResizeMode.ResizeToContents)
+        self.table = make_attendance_view(self.model)
         v.addWidget(self.table)
 
         btn_back = QPushButton("Back")
@@ -703,102 +1287,51 @@ class DisplayWidget(QWidget):
 
         date_qdate = self.date_edit.date()
         dt = datetime(date_qdate.year(), date_qdate.month(), date_qdate.day())
-        colname = dt.strftime("%Y_%m_%d")
 
-        try:
-            db.connect()
-            if not db._column_exists(class_name, colname):
-                db.cursor.execute(
-                    f"ALTER TABLE `{class_name}` ADD COLUMN `{colname}` VARCHAR(20) DEFAULT 'Absent';"
-                )
-                db.conn.commit()
-
-            q = f"SELECT Roll_no, Student_name, `{colname}` FROM `{class_name}` ORDER BY Roll_no;"
-            db.cursor.execute(q)
-            rows = db.cursor.fetchall()
-
-            self.table.setRowCount(len(rows))
-            for r, row in enumerate(rows):
-                roll_item = QTableWidgetItem(str(row[0]))
-                roll_item.setFlags(Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled)
-
-                name_item = QTableWidgetItem(row[1] if row[1] is not None else "")
-                name_item.setFlags(
-                    Qt.ItemFlag.ItemIsSelectable
-                    | Qt.ItemFlag.ItemIsEnabled
-                    | Qt.ItemFlag.ItemIsEditable
-                )
-
-                att_text = row[2] if row[2] is not None else "Absent"
-                chk = QCheckBox()
-                chk.setChecked(att_text.lower() == "present")
-
-                container = QWidget()
-                layout = QHBoxLayout(container)
-                layout.addStretch()
-                layout.addWidget(chk)
-                layout.addStretch()
-                layout.setContentsMargins(0, 0, 0, 0)
-                self.table.setItem(r, 0, roll_item)
-                self.table.setItem(r, 1, name_item)
-                self.table.setCellWidget(r, 2, container)
+        self.nav.run_db(
+            db_writer.attendance, class_name, dt,
+            on_result=lambda rows: self._populate(class_name, dt, rows),
+            on_error=lambda msg: show_error("Load failed", msg),
+            busy_text=f"Loading {class_name}…",
+        )
 
-            AppState.set_logged_class(class_name)
-            AppState.set_students([(row[0], row[1]) for row in rows])
+    def _populate(self, class_name: str, dt: datetime, rows):
+        self.model.load(rows)
+        self._loaded_for = (class_name, dt)
 
-        except Exception as e:
-            show_error("Load failed", str(e))
+        AppState.set_logged_class(class_name)
+        AppState.set_students(self.model.grid.students())
 
     def save_changes(self):
-        class_name = self.class_input.text().strip()
-        if not class_name:
-            show_error("Missing", "Provide class name.")
+        if self.model.rowCount() == 0 or self._loaded_for is None:
+            show_info("No data", "Nothing to save.")
             return
 
-        date_qdate = self.date_edit.date()
-        dt = datetime(date_qdate.year(), date_qdate.month(), date_qdate.day())
-        colname = dt.strftime("%Y_%m_%d")
-
-        if self.table.rowCount() == 0:
-            show_info("No data", "Nothing to save.")
+        # save to the class/date the grid was loaded for, even if the inputs changed since
+        class_name, dt = self._loaded_for
+        if not self.nav.require_session(class_name):
+            return
+        rows = self.model.grid.dirty_rows()
+        if not rows:
+            show_info("Saved", "No changes to save.")
             return
 
-        try:
-            db.connect()
-            if not db._column_exists(class_name, colname):
-                db.cursor.execute(
-                    f"ALTER TABLE `{class_name}` ADD COLUMN `{colname}` VARCHAR(20) DEFAULT 'Absent';"
-                )
-                db.conn.commit()
-
-            for r in range(self.table.rowCount()):
-                roll = int(self.table.item(r, 0).text())
-                name_item = self.table.item(r, 1)
-                name_val = name_item.text().strip() if name_item else ""
-
-                container = self.table.cellWidget(r, 2)
-                chk = container.findChild(QCheckBox) if container else None
-                att_val = "Present" if (chk and chk.isChecked()) else "Absent"
-
-                if name_val:
-                    db.cursor.execute(
-                        f"UPDATE `{class_name}` SET Student_name=%s WHERE Roll_no=%s;",
-                        (name_val, roll),
-                    )
-
-                db.cursor.execute(
-                    f"UPDATE `{class_name}` SET `{colname}`=%s WHERE Roll_no=%s;",
-                    (att_val, roll),
-                )
-
-            db.conn.commit()
-            show_info("Saved", "Changes saved to database.")
+        def saved(changed):
+            self.model.mark_clean()
+            if changed is None:  # queued in the offline journal
+                self.nav.report_write(False, "Saved", f"Saved {len(rows)} edited row(s).")
+            else:
+                self.nav.report_write(True, "Saved", f"Saved {changed} changed row(s).")
 
-        except Exception as e:
-            show_error("Save failed", str(e))
+        self.nav.run_db(
+            db_writer.save_grid, class_name, rows, dt, self.model.grid.loaded_statuses(),
+            on_result=saved,
+            on_error=lambda msg: show_error("Save failed", msg),
+            busy_text="Saving…",
+        )
 
     def export_csv(self):
-        if self.table.rowCount() == 0:
+        if self.model.rowCount() == 0:
             show_info("No data", "No table data to export.")
             return
 
@@ -812,26 +1345,24 @@ class DisplayWidget(QWidget):
             with open(path, "w", newline="", encoding="utf-8") as fh:
                 writer = csv.writer(fh)
                 writer.writerow(["Roll_no", "Student_name", "Attendance"])
-                for r in range(self.table.rowCount()):
-                    roll = self.table.item(r, 0).text()
-                    name = self.table.item(r, 1).text()
-
-                    container = self.table.cellWidget(r, 2)
-                    chk = container.findChild(QCheckBox) if container else None
-                    att = "Present" if (chk and chk.isChecked()) else "Absent"
-
-                    writer.writerow([roll, name, att])
+                writer.writerows(self.model.grid.rows())
             show_info("Exported", f"Exported to {path}")
         except Exception as e:
             show_error("Export failed", str(e))
 
 # ---------- SelectAbsentWidget ----------
 class SelectAbsentWidget(QWidget):
+    """
+    Pick absentees for one date, or in range entry mode for every school day between two dates:
+    each day's checks are kept while switching days and everything is saved in one transaction.
+    """
 
     def __init__(self, navigator):
         super().__init__()
         self.nav = navigator
-        self.checkboxes = {}
+        self.roster = RosterCheckModel(self)
+        self._range_absent: Dict[date, List[int]] = {}
+        self._range_day: Optional[date] = None
         self._build_ui()
 
     def _build_ui(self):
@@ -860,19 +1391,38 @@ class SelectAbsentWidget(QWidget):
         self.date_edit = QDateEdit()
         self.date_edit.setCalendarPopup(True)
         self.date_edit.setDate(QDate.currentDate())
+        self.date_edit.dateChanged.connect(self._refresh_range_days)
         row.addWidget(self.date_edit)
+        self.end_label = QLabel("To:")
+        row.addWidget(self.end_label)
+        self.end_edit = QDateEdit()
+        self.end_edit.setCalendarPopup(True)
+        self.end_edit.setDate(QDate.currentDate())
+        self.end_edit.dateChanged.connect(self._refresh_range_days)
+        row.addWidget(self.end_edit)
         btn_load = QPushButton("Load Students")
         btn_load.clicked.connect(self.load_students)
         row.addWidget(btn_load)
         v.addLayout(row)
 
-        self.scroll = QScrollArea()
-        self.scroll.setWidgetResizable(True)
-        v.addWidget(self.scroll)
+        # range entry: one absent set per school day, edited one day at a time
+        range_row = QHBoxLayout()
+        self.range_check = QCheckBox("Range entry")
+        self.range_check.toggled.connect(self._set_range_mode)
+        range_row.addWidget(self.range_check)
+        self.day_label = QLabel("Day:")
+        range_row.addWidget(self.day_label)
+        self.day_combo = QComboBox()
+        self.day_combo.currentIndexChanged.connect(self._switch_range_day)
+        range_row.addWidget(self.day_combo, 1)
+        v.addLayout(range_row)
+
+        self.list_view = make_roster_view(self.roster)
+        v.addWidget(self.list_view)
 
         # actions
         btn_row = QHBoxLayout()
-        btn_mark = QPushButton("Mark Selected Absent")
+        self.btn_mark = btn_mark = QPushButton("Mark Selected Absent")
         btn_mark.clicked.connect(self.mark_selected_absent)
         btn_clear = QPushButton("Clear Selection")
         btn_clear.clicked.connect(self.clear_selection)
@@ -884,6 +1434,7 @@ class SelectAbsentWidget(QWidget):
         v.addLayout(btn_row)
 
         self.setLayout(v)
+        self._set_range_mode(False)
 
     def apply_admin_state(self):
         if AppState.is_admin_user():
@@ -893,6 +1444,50 @@ class SelectAbsentWidget(QWidget):
             self.class_input.setReadOnly(True)
             self.class_input.setStyleSheet("background-color:#f0f0f0; color:#555;")
 
+    @staticmethod
+    def _to_date(qdate: QDate) -> date:
+        return date(qdate.year(), qdate.month(), qdate.day())
+
+    def _set_range_mode(self, on: bool):
+        for w in (self.end_label, self.end_edit, self.day_label, self.day_combo):
+            w.setVisible(on)
+        self.btn_mark.setText("Save Range" if on else "Mark Selected Absent")
+        self._range_absent.clear()
+        self._range_day = None
+        self.roster.clear_checks()
+        if on:
+            self._refresh_range_days()
+
+    def _stash_range_day(self):
+        """Remember the checks of the day being edited."""
+        if self._range_day is None:
+            return
+        rolls = self.roster.checked_rolls()
+        if rolls:
+            self._range_absent[self._range_day] = rolls
+        else:
+            self._range_absent.pop(self._range_day, None)
+
+    def _refresh_range_days(self):
+        if not self.range_check.isChecked():
+            return
+        self._stash_range_day()
+        days = dbmod.AttendanceDB.school_days(self._to_date(self.date_edit.date()), self._to_date(self.end_edit.date()))
+        # absences entered for days that fell out of the range are dropped
+        self._range_absent = {d: r for d, r in self._range_absent.items() if d in days}
+        self._range_day = None
+        self.day_combo.blockSignals(True)
+        self.day_combo.clear()
+        for d in days:
+            self.day_combo.addItem(d.strftime("%a %Y-%m-%d"), d)
+        self.day_combo.blockSignals(False)
+        self._switch_range_day(0 if days else -1)
+
+    def _switch_range_day(self, index: int):
+        self._stash_range_day()
+        self._range_day = self.day_combo.itemData(index) if index >= 0 else None
+        self.roster.set_checked_rolls(self._range_absent.get(self._range_day, ()))
+
     def load_students(self):
         class_name = self.class_input.text().strip()
         if not class_name:
@@ -901,47 +1496,77 @@ class SelectAbsentWidget(QWidget):
         if not is_valid_identifier(class_name):
             show_error("Invalid", "Class name invalid.")
             return
-        try:
-            students = db.authenticate_user(class_name, AppState.get_class_password())
-            AppState.set_students(students)
+        self.nav.run_db(
+            db_writer.session_roster, AppState.get_session_token(), class_name,
+            on_result=lambda students: self._populate(class_name, students),
+            on_error=lambda msg: show_error("Load failed", msg),
+            busy_text=f"Loading {class_name}…",
+        )
 
-            container = QWidget()
-            cv = QVBoxLayout()
-            self.checkboxes.clear()
-            for roll, name in students:
-                cb = QCheckBox(f"{roll} — {name}")
-                self.checkboxes[roll] = cb
-                cv.addWidget(cb)
-            container.setLayout(cv)
-            self.scroll.setWidget(container)
-            AppState.set_logged_class(class_name)
-        except Exception as e:
-            show_error("Load failed", str(e))
+    def _populate(self, class_name: str, students):
+        AppState.set_students(students)
+        self.roster.load(students)
+        AppState.set_logged_class(class_name)
+        if self.range_check.isChecked():
+            # a freshly loaded roster starts the range over
+            self._set_range_mode(True)
 
     def clear_selection(self):
-        for cb in self.checkboxes.values():
-            cb.setChecked(False)
+        self.roster.clear_checks()
 
     def mark_selected_absent(self):
-        selected = [r for r, cb in self.checkboxes.items() if cb.isChecked()]
+        if self.range_check.isChecked():
+            self.save_range()
+            return
+        selected = self.roster.checked_rolls()
         if not selected:
             show_info("No selection", "No students selected.")
             return
         class_name = self.class_input.text().strip()
+        if not self.nav.require_session(class_name):
+            return
         date_qdate = self.date_edit.date()
         dt = datetime(date_qdate.year(), date_qdate.month(), date_qdate.day())
-        try:
-            if not db._column_exists(class_name, dt.strftime("%Y_%m_%d")):
-                db.cursor.execute(f"ALTER TABLE `{class_name}` ADD COLUMN `{dt.strftime('%Y_%m_%d')}` VARCHAR(20) DEFAULT 'Absent';")
-                db.conn.commit()
-            db.custom_marking_absent(class_name, selected, dt)
+
+        def mark():
+            # refresh saved students (a version check unless the roster changed)
+            return db_writer.custom_marking_absent(class_name, selected, dt), db_writer.roster(class_name)
+
+        def marked(result):
+            sent, students = result
             AppState.set_absent(selected)
-            show_info("Marked", f"Marked {len(selected)} students absent for {dt.strftime('%Y-%m-%d')}.")
-            # refresh saved students
-            students = db.authenticate_user(class_name, AppState.get_class_password())
+            self.nav.report_write(sent, "Marked", f"Marked {len(selected)} students absent for {dt.strftime('%Y-%m-%d')}.")
             AppState.set_students(students)
-        except Exception as e:
-            show_error("Mark failed", str(e))
+
+        self.nav.run_db(mark, on_result=marked, on_error=lambda msg: show_error("Mark failed", msg),
+                        busy_text="Marking absentees…")
+
+    def save_range(self):
+        class_name = self.class_input.text().strip()
+        if not class_name or not self.roster.rowCount():
+            show_info("No students", "Load the class before entering a range.")
+            return
+        if not self.nav.require_session(class_name):
+            return
+        self._stash_range_day()
+        start, end = self._to_date(self.date_edit.date()), self._to_date(self.end_edit.date())
+        if start > end:
+            show_error("Invalid", "The start date must not be after the end date.")
+            return
+        absent = dict(self._range_absent)
+
+        def mark():
+            days = db_writer.mark_attendance_range(class_name, start, end, absent)
+            return days, db_writer.roster(class_name)
+
+        def marked(result):
+            days, students = result
+            AppState.set_students(students)
+            count = sum(len(r) for r in absent.values())
+            show_info("Marked", f"Recorded {len(days)} day(s) from {start} to {end} with {count} absence(s).")
+
+        self.nav.run_db(mark, on_result=marked, on_error=lambda msg: show_error("Mark failed", msg),
+                        busy_text=f"Recording attendance {start} – {end}…")
 
 # ---------- AddStudentWidget ----------
 class AddStudentWidget(QWidget):
@@ -999,16 +1624,21 @@ class AddStudentWidget(QWidget):
         if not name or not class_name:
             show_error("Missing", "Provide student name and class.")
             return
-        try:
-            db.add_individual(class_name, name, roll)
-            show_info("Added", f"{name} added to {class_name}.")
-            # refresh
-            students = db.authenticate_user(class_name, AppState.get_class_password())
+        if not self.nav.require_session(class_name):
+            return
+
+        def add():
+            return db_writer.add_individual(class_name, name, roll), db_writer.roster(class_name)
+
+        def added(result):
+            sent, students = result
+            self.nav.report_write(sent, "Added", f"{name} added to {class_name}.")
             AppState.set_students(students)
             AppState.set_logged_class(class_name)
             self.nav.goto_dashboard()
-        except Exception as e:
-            show_error("Add failed", str(e))
+
+        self.nav.run_db(add, on_result=added, on_error=lambda msg: show_error("Add failed", msg),
+                        busy_text=f"Adding {name}…")
 
 # ---------- ImportCSVWidget ----------
 class ImportCSVWidget(QWidget):
@@ -1073,15 +1703,41 @@ class ImportCSVWidget(QWidget):
         if not path or not class_name:
             show_error("Missing", "Provide file path and class name.")
             return
-        try:
-            db.add_data_from_csv(path, class_name)
-            show_info("Imported", f"CSV imported into {class_name}.")
-            students = db.authenticate_user(class_name, AppState.get_class_password())
+        if not self.nav.require_session(class_name):
+            return
+        started = time.monotonic()
+
+        def do_import(progress, cancel):
+            # bad rows go to <file>.rejects.csv; an interrupted import resumes from <file>.checkpoint
+            report = db.import_csv(
+                path, class_name,
+                chunk_size=IMPORT_CHUNK_SIZE,
+                checkpoint_path=path + ".checkpoint",
+                reject_path=path + ".rejects.csv",
+                progress=progress,
+                cancel=cancel,
+            )
+            return report, db.fetch_roster(class_name)
+
+        def show_progress(done, total):
+            rate = done / max(time.monotonic() - started, 1e-6)
+            self.nav.lbl_status.setText(f"Importing… {done:,} / ~{total:,} rows ({rate:,.0f} rows/s)")
+
+        def imported(result):
+            report, students = result
+            show_info("Imported", report.summary() + ".")
             AppState.set_students(students)
             AppState.set_logged_class(class_name)
             self.nav.goto_dashboard()
-        except Exception as e:
-            show_error("Import failed", str(e))
+
+        self.nav.run_db(
+            do_import,
+            on_result=imported,
+            on_error=lambda msg: show_error("Import failed", msg),
+            on_progress=show_progress,
+            busy_text=f"Importing into {class_name}…",
+            cancellable=True,
+        )
 
 # ---------- DeleteWidget ----------
 class DeleteWidget(QWidget):
@@ -1089,7 +1745,7 @@ class DeleteWidget(QWidget):
     def __init__(self, navigator):
         super().__init__()
         self.nav = navigator
-        self.checkboxes = {}
+        self.roster = RosterCheckModel(self)
         self._build_ui()
 
     def _build_ui(self):
@@ -1113,9 +1769,8 @@ class DeleteWidget(QWidget):
         form.addWidget(btn_load)
         v.addLayout(form)
 
-        self.scroll = QScrollArea()
-        self.scroll.setWidgetResizable(True)
-        v.addWidget(self.scroll)
+        self.list_view = make_roster_view(self.roster)
+        v.addWidget(self.list_view)
 
         h = QHBoxLayout()
         btn_delete = QPushButton("Delete Selected")
@@ -1140,37 +1795,39 @@ class DeleteWidget(QWidget):
         if not class_name:
             show_error("Missing", "Provide class name.")
             return
-        try:
-            students = db.authenticate_user(class_name, AppState.get_class_password())
-            container = QWidget()
-            cv = QVBoxLayout()
-            self.checkboxes.clear()
-            for roll, name in students:
-                cb = QCheckBox(f"{roll} — {name}")
-                self.checkboxes[roll] = cb
-                cv.addWidget(cb)
-            container.setLayout(cv)
-            self.scroll.setWidget(container)
-            AppState.set_students(students)
-            AppState.set_logged_class(class_name)
-        except Exception as e:
-            show_error("Load failed", str(e))
+        self.nav.run_db(
+            db.session_roster, AppState.get_session_token(), class_name,
+            on_result=lambda students: self._populate(class_name, students),
+            on_error=lambda msg: show_error("Load failed", msg),
+            busy_text=f"Loading {class_name}…",
+        )
+
+    def _populate(self, class_name: str, students):
+        self.roster.load(students)
+        AppState.set_students(students)
+        AppState.set_logged_class(class_name)
 
     def on_delete(self):
-        selected = [r for r, cb in self.checkboxes.items() if cb.isChecked()]
+        selected = self.roster.checked_rolls()
         if not selected:
             show_info("No selection", "No students selected.")
             return
         class_name = self.class_input.text().strip()
-        try:
+        if not self.nav.require_session(class_name):
+            return
+
+        def delete():
             db.delete_data(class_name, selected)
-            show_info("Deleted", f"Deleted {len(selected)} records from {class_name}.")
             # refresh
-            students = db.authenticate_user(class_name, AppState.get_class_password())
+            return db.fetch_roster(class_name)
+
+        def deleted(students):
+            show_info("Deleted", f"Deleted {len(selected)} records from {class_name}.")
             AppState.set_students(students)
             self.nav.goto_dashboard()
-        except Exception as e:
-            show_error("Delete failed", str(e))
+
+        self.nav.run_db(delete, on_result=deleted, on_error=lambda msg: show_error("Delete failed", msg),
+                        busy_text="Deleting…")
 
 # ---------- HistoryWidget ----------
 class HistoryWidget(QWidget):
@@ -1179,6 +1836,7 @@ class HistoryWidget(QWidget):
         super().__init__()
         self.nav = navigator
         self.table = None
+        self.model = AttendanceTableModel(editable=False, parent=self)
         self._build_ui()
 
     def _build_ui(self):
@@ -1209,22 +1867,20 @@ class HistoryWidget(QWidget):
         row.addWidget(btn_load)
         v.addLayout(row)
 
-        self.table = QTableWidget()
-        self.table.setColumnCount(3)
-        self.table.setHorizontalHeaderLabels(["Roll No", "Student Name", "Attendance"])
-        h = self.table.horizontalHeader()
-        h.setSectionResizeMode(0, QHeaderView.ResizeMode.ResizeToContents)
-        h.setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
-        h.setSectionResizeMode(2, QHeaderView.ResizeMode.ResizeToContents)
+        self.table = make_attendance_view(self.model)
         v.addWidget(self.table)
 
         btn_back = QPushButton("Back")
         btn_back.clicked.connect(lambda: self.nav.goto_dashboard())
         btn_export = QPushButton("Export CSV")
         btn_export.clicked.connect(self.export_csv)
+        btn_archive = QPushButton("Archive History")
+        btn_archive.setToolTip("Write the class's whole attendance history as Parquet (or npz), one file per month")
+        btn_archive.clicked.connect(self.archive_history)
         h2 = QHBoxLayout()
         h2.addWidget(btn_back)
         h2.addWidget(btn_export)
+        h2.addWidget(btn_archive)
         v.addLayout(h2)
 
         self.setLayout(v)
@@ -1244,39 +1900,25 @@ class HistoryWidget(QWidget):
             return
         date_qdate = self.date_edit.date()
         dt = datetime(date_qdate.year(), date_qdate.month(), date_qdate.day())
-        colname = dt.strftime("%Y_%m_%d")
-        try:
-            db.connect()
-
-            if not db._column_exists(class_name, colname):
-                show_info("No data", f"No attendance recorded for {dt.strftime('%Y-%m-%d')} (column missing).")
-                q = f"SELECT Roll_no, Student_name FROM `{class_name}` ORDER BY Roll_no;"
-                db.cursor.execute(q)
-                rows = db.cursor.fetchall()
-                attendance_default = [(r[0], r[1], "Absent") for r in rows]
-            else:
-                q = f"SELECT Roll_no, Student_name, `{colname}` FROM `{class_name}` ORDER BY Roll_no;"
-                db.cursor.execute(q)
-                rows = db.cursor.fetchall()
-                attendance_default = [(r[0], r[1], r[2] if r[2] is not None else "Absent") for r in rows]
-            self.table.setRowCount(len(attendance_default))
-            for r, (roll, name, att) in enumerate(attendance_default):
-                it_roll = QTableWidgetItem(str(roll))
-                it_roll.setFlags(Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled)
-                it_name = QTableWidgetItem(name)
-                it_name.setFlags(Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled)
-                it_att = QTableWidgetItem(att)
-                it_att.setFlags(Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled)
-                self.table.setItem(r, 0, it_roll)
-                self.table.setItem(r, 1, it_name)
-                self.table.setItem(r, 2, it_att)
-            AppState.set_logged_class(class_name)
-            AppState.set_students([(row[0], row[1]) for row in attendance_default])
-        except Exception as e:
-            show_error("Load failed", str(e))
+        def fetch():
+            return db.has_attendance_date(class_name, dt), db.fetch_attendance(class_name, dt)
+
+        self.nav.run_db(
+            fetch,
+            on_result=lambda res: self._populate(class_name, dt, *res),
+            on_error=lambda msg: show_error("Load failed", msg),
+            busy_text=f"Loading history for {class_name}…",
+        )
+
+    def _populate(self, class_name: str, dt: datetime, recorded: bool, attendance_default):
+        if not recorded:
+            show_info("No data", f"No attendance recorded for {dt.strftime('%Y-%m-%d')}.")
+        self.model.load(attendance_default)
+        AppState.set_logged_class(class_name)
+        AppState.set_students(self.model.grid.students())
 
     def export_csv(self):
-        if self.table.rowCount() == 0:
+        if self.model.rowCount() == 0:
             show_info("No data", "No data to export.")
             return
         path, _ = QFileDialog.getSaveFileName(self, "Export CSV", "", "CSV Files (*.csv)")
@@ -1286,20 +1928,165 @@ class HistoryWidget(QWidget):
             with open(path, "w", newline="", encoding="utf-8") as fh:
                 writer = csv.writer(fh)
                 writer.writerow(["Roll_no", "Student_name", "Attendance"])
-                for r in range(self.table.rowCount()):
-                    roll = self.table.item(r, 0).text()
-                    name = self.table.item(r, 1).text()
-                    att = self.table.item(r, 2).text()
-                    writer.writerow([roll, name, att])
+                writer.writerows(self.model.grid.rows())
             show_info("Exported", f"Saved to {path}")
         except Exception as e:
             show_error("Export failed", str(e))
 
+    def archive_history(self):
+        class_name = self.class_input.text().strip()
+        if not class_name:
+            show_error("Missing", "Enter class name.")
+            return
+        root = QFileDialog.getExistingDirectory(self, "Archive attendance history into")
+        if not root:
+            return
+        import attendance_archive  # deferred: pulls in NumPy/pyarrow when installed
+        self.nav.run_db(
+            attendance_archive.archive_attendance, db, root, [class_name],
+            on_result=lambda report: show_info("Archived", report.summary()),
+            on_error=lambda msg: show_error("Archive failed", msg),
+            busy_text=f"Archiving {class_name}…",
+        )
+
+# ---------- AnalyticsWidget ----------
+class AnalyticsWidget(QWidget):
+    """Attendance percentage, absences and streaks per student (or per class) over a date range."""
+    STUDENT_HEADERS = ["Roll No", "Student Name", "Present", "Absent", "%", "Longest Streak", "Current Streak"]
+    CLASS_HEADERS = ["Class", "Students", "Days", "%", "Below Threshold"]
+
+    def __init__(self, navigator):
+        super().__init__()
+        self.nav = navigator
+        self.model = StatsTableModel(parent=self)
+        self._build_ui()
+
+    def _build_ui(self):
+        v = QVBoxLayout()
+        v.setContentsMargins(60, 40, 60, 40)
+        v.setSpacing(12)
+
+        title = QLabel("Attendance Analytics")
+        title.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        title.setProperty("role", "title")
+        v.addWidget(title)
+
+        row = QHBoxLayout()
+        row.addWidget(QLabel("Class:"))
+        self.class_input = QLineEdit()
+        row.addWidget(self.class_input)
+        row.addWidget(QLabel("From:"))
+        self.start_edit = QDateEdit(QDate.currentDate().addMonths(-3))
+        self.start_edit.setCalendarPopup(True)
+        self.start_edit.setDisplayFormat("yyyy-MM-dd")
+        row.addWidget(self.start_edit)
+        row.addWidget(QLabel("To:"))
+        self.end_edit = QDateEdit(QDate.currentDate())
+        self.end_edit.setCalendarPopup(True)
+        self.end_edit.setDisplayFormat("yyyy-MM-dd")
+        row.addWidget(self.end_edit)
+        row.addWidget(QLabel("Alert below:"))
+        self.threshold_spin = QSpinBox()
+        self.threshold_spin.setRange(0, 100)
+        self.threshold_spin.setSuffix(" %")
+        import analytics
+        self.threshold_spin.setValue(int(analytics.DEFAULT_THRESHOLD))
+        row.addWidget(self.threshold_spin)
+        v.addLayout(row)
+
+        buttons = QHBoxLayout()
+        btn_class = QPushButton("Class Report")
+        btn_class.clicked.connect(self.load_class_report)
+        buttons.addWidget(btn_class)
+        self.btn_all = QPushButton("All Classes")
+        self.btn_all.clicked.connect(self.load_school_report)
+        buttons.addWidget(self.btn_all)
+        v.addLayout(buttons)
+
+        self.summary_label = QLabel("")
+        self.summary_label.setWordWrap(True)
+        self.summary_label.setStyleSheet("font-weight:600; color:#444;")
+        v.addWidget(self.summary_label)
+
+        self.table = make_stats_view(self.model)
+        v.addWidget(self.table)
+
+        btn_back = QPushButton("Back")
+        btn_back.clicked.connect(lambda: self.nav.goto_dashboard())
+        v.addWidget(btn_back)
+        self.setLayout(v)
+
+    def apply_admin_state(self):
+        self.btn_all.setEnabled(AppState.is_admin_user())
+
+    def _range(self):
+        start, end = self.start_edit.date(), self.end_edit.date()
+        return (datetime(start.year(), start.month(), start.day()),
+                datetime(end.year(), end.month(), end.day()))
+
+    def load_class_report(self):
+        class_name = self.class_input.text().strip()
+        if not class_name:
+            show_error("Missing", "Enter class name.")
+            return
+        if not self.nav.require_session(class_name):
+            return
+        start, end = self._range()
+        threshold = float(self.threshold_spin.value())
+        import analytics
+        self.nav.run_db(
+            analytics.class_report, db, class_name, start, end,
+            on_result=lambda report: self._show_class(report, threshold),
+            on_error=lambda msg: show_error("Analytics failed", msg),
+            busy_text=f"Computing attendance for {class_name}…",
+        )
+
+    def load_school_report(self):
+        if not self.nav.require_session(admin=True):
+            return
+        start, end = self._range()
+        threshold = float(self.threshold_spin.value())
+        import analytics
+        self.nav.run_db(
+            analytics.school_report, db, start, end,
+            on_result=lambda reports: self._show_school(reports, threshold),
+            on_error=lambda msg: show_error("Analytics failed", msg),
+            busy_text="Computing attendance for all classes…",
+        )
+
+    def _show_class(self, report, threshold: float):
+        rows = []
+        alerts = bytearray(len(report.students))
+        for i, s in enumerate(report.students):
+            current = f"{s.present_streak} present" if s.present_streak else f"{s.absent_streak} absent"
+            rows.append((s.roll, s.name, s.present, s.absent, s.percentage, s.longest_streak, current))
+            alerts[i] = 1 if s.days and s.percentage < threshold else 0
+        self.model.load(self.STUDENT_HEADERS, rows, alerts)
+        self.summary_label.setText(
+            f"{report.class_name}: {report.percentage:.1f}% attendance over {len(report.days)} recorded day(s); "
+            f"{len(report.below(threshold))} of {len(report.students)} student(s) below {threshold:g}% "
+            f"({report.elapsed * 1000:.0f} ms)"
+        )
+
+    def _show_school(self, reports, threshold: float):
+        rows = [(r.class_name, len(r.students), len(r.days), r.percentage, len(r.below(threshold))) for r in reports]
+        alerts = bytearray(1 if r.days and r.percentage < threshold else 0 for r in reports)
+        self.model.load(self.CLASS_HEADERS, rows, alerts)
+        flagged = sum(row[4] for row in rows)
+        self.summary_label.setText(
+            f"{len(reports)} class(es); {flagged} student(s) below {threshold:g}% in total"
+        )
+
 # ---------- Run ----------
 def main():
-    app = QApplication(sys.argv)
+    app = QApplication([arg for arg in sys.argv if arg != "--startup-timing"])
+    STARTUP.mark("QApplication")
     win = Navigator()
+    STARTUP.mark("login window")
     win.show()
+    app.processEvents()
+    STARTUP.mark("first paint")
+    win.mark_shown()
     sys.exit(app.exec())
 
 if __name__ == "__main__":
@@ -0,0 +1,551 @@
+"""
+Offline write journal: attendance writes made while the database is unreachable are appended to a
+local SQLite file (synchronous=FULL, so each append is on disk before the teacher is told it was
+saved) and replayed once the database is back.
+
+OfflineWriter is what a front end calls instead of AttendanceDB for the journaled writes
+(mark_all_present, custom_marking_absent, add_individual, save_grid) and for the reads they need
+offline (login, rosters, a day's grid); range marking goes through it too, but is not journaled.
+replay() coalesces the journal per class and date - later writes fold into earlier ones, so a day
+marked all present and then edited twice is written once - and applies each class in one
+transaction. Conflicts (a status somebody else changed while we were offline, a roll no longer
+in the class, a roll added under another name, a class that is gone) are reported and kept in
+the journal's conflict log; the queued value wins where it can be applied.
+Writes that cannot be applied at all stay in the journal marked failed (with the error), out of
+later replays, until retry_failed() queues them again.
+"""
+import json
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import Main_database as dbmod
+
+OPS = ("mark_all_present", "custom_marking_absent", "add_individual", "save_grid")
+
+class JournalEntry:
+    __slots__ = ("seq", "op", "class_name", "day", "payload", "queued_at")
+
+    def __init__(self, seq: int, op: str, class_name: str, day: Optional[date], payload: dict, queued_at: float):
+        self.seq = seq
+        self.op = op
+        self.class_name = class_name
+        self.day = day
+        self.payload = payload
+        self.queued_at = queued_at
+
+class WriteJournal:
+    """
+    Append-only journal of pending writes, plus what offline use needs from the last time a class
+    was seen online (its roster and password hash) and a log of replay conflicts.
+    A pending write with a non-NULL failed column could not be applied; it is kept, not replayed.
+    One connection shared by all threads, serialised by a lock.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL;")
+        self._conn.execute("PRAGMA synchronous=FULL;")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS pending (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                op TEXT NOT NULL,
+                class_name TEXT NOT NULL,
+                day TEXT,
+                payload TEXT NOT NULL,
+                queued_at REAL NOT NULL,
+                failed TEXT
+            );
+            CREATE TABLE IF NOT EXISTS class_cache (
+                class_name TEXT PRIMARY KEY,
+                roster TEXT,
+                password_hash TEXT,
+                saved_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS conflicts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                class_name TEXT NOT NULL,
+                day TEXT,
+                message TEXT NOT NULL,
+                logged_at REAL NOT NULL
+            );
+        """)
+        # journals written before failed writes were kept
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(pending);")}
+        if "failed" not in columns:
+            self._conn.execute("ALTER TABLE pending ADD COLUMN failed TEXT;")
+
+    def append(self, op: str, class_name: str, day: Optional[date], payload: dict) -> int:
+        """Queue one write; returns its sequence number once it is durably stored."""
+        if op not in OPS:
+            raise ValueError(f"Unknown journal operation: {op!r}.")
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO pending (op, class_name, day, payload, queued_at) VALUES (?, ?, ?, ?, ?);",
+                (op, class_name, day.isoformat() if day else None, json.dumps(payload), time.time()))
+            return cur.lastrowid
+
+    def _entries(self, where: str, params: tuple) -> List[Tuple[JournalEntry, Optional[str]]]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT seq, op, class_name, day, payload, queued_at, failed FROM pending WHERE {where} ORDER BY seq;",
+                params).fetchall()
+        return [(JournalEntry(seq, op, cls, date.fromisoformat(day) if day else None, json.loads(payload), at), error)
+                for seq, op, cls, day, payload, at, error in rows]
+
+    def pending(self, class_name: Optional[str] = None) -> List[JournalEntry]:
+        """Queued writes still to be replayed, in the order they were made (as coalesce() needs them)."""
+        if class_name is None:
+            return [entry for entry, _ in self._entries("failed IS NULL", ())]
+        return [entry for entry, _ in self._entries("failed IS NULL AND class_name = ?", (class_name,))]
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pending WHERE failed IS NULL;").fetchone()[0]
+
+    def has_pending(self, class_name: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM pending WHERE failed IS NULL AND class_name = ? LIMIT 1;",
+                                      (class_name,)).fetchone() is not None
+
+    def failed(self, class_name: Optional[str] = None) -> List[Tuple[JournalEntry, str]]:
+        """Writes a replay could not apply, with the error, in the order they were made."""
+        if class_name is None:
+            return self._entries("failed IS NOT NULL", ())
+        return self._entries("failed IS NOT NULL AND class_name = ?", (class_name,))
+
+    def failed_count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pending WHERE failed IS NOT NULL;").fetchone()[0]
+
+    def mark_failed(self, seqs: Iterable[int], error: str) -> None:
+        """Keep these writes in the journal but out of replay, recording why they could not be applied."""
+        seqs = list(seqs)
+        with self._lock:
+            self._conn.execute("BEGIN;")
+            self._conn.executemany("UPDATE pending SET failed = ? WHERE seq = ?;", [(error, s) for s in seqs])
+            self._conn.execute("COMMIT;")
+
+    def retry_failed(self, class_name: Optional[str] = None) -> int:
+        """Queue failed writes (of class_name, or all) for the next replay again; returns how many."""
+        query, params = "UPDATE pending SET failed = NULL WHERE failed IS NOT NULL", ()
+        if class_name is not None:
+            query, params = query + " AND class_name = ?", (class_name,)
+        with self._lock:
+            return self._conn.execute(query + ";", params).rowcount
+
+    def remove(self, seqs: Iterable[int]) -> None:
+        seqs = list(seqs)
+        with self._lock:
+            self._conn.execute("BEGIN;")
+            self._conn.executemany("DELETE FROM pending WHERE seq = ?;", [(s,) for s in seqs])
+            self._conn.execute("COMMIT;")
+
+    def remember_class(self, class_name: str, roster: Optional[List[Tuple[int, str]]] = None,
+                       password_hash: Optional[str] = None) -> None:
+        """Cache a class's roster and/or password hash for offline use (None keeps the cached value)."""
+        with self._lock:
+            self._conn.execute("""
+                INSERT INTO class_cache (class_name, roster, password_hash, saved_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (class_name) DO UPDATE SET
+                    roster = COALESCE(excluded.roster, class_cache.roster),
+                    password_hash = COALESCE(excluded.password_hash, class_cache.password_hash),
+                    saved_at = excluded.saved_at;
+            """, (class_name, json.dumps(roster) if roster is not None else None, password_hash, time.time()))
+
+    def cached_roster(self, class_name: str) -> Optional[List[Tuple[int, str]]]:
+        with self._lock:
+            row = self._conn.execute("SELECT roster FROM class_cache WHERE class_name = ?;", (class_name,)).fetchone()
+        return [(int(r), n) for r, n in json.loads(row[0])] if row and row[0] else None
+
+    def cached_password_hash(self, class_name: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT password_hash FROM class_cache WHERE class_name = ?;",
+                                     (class_name,)).fetchone()
+        return row[0] if row else None
+
+    def log_conflicts(self, conflicts: List[Tuple[str, Optional[date], str]]) -> None:
+        if not conflicts:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO conflicts (class_name, day, message, logged_at) VALUES (?, ?, ?, ?);",
+                [(cls, day.isoformat() if day else None, message, now) for cls, day, message in conflicts])
+
+    def conflicts(self, limit: int = 100) -> List[Tuple[str, Optional[str], str, float]]:
+        """The most recent conflicts as (class, day, message, logged_at), newest first."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT class_name, day, message, logged_at FROM conflicts ORDER BY id DESC LIMIT ?;",
+                (limit,)).fetchall()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+class DayBatch:
+    """Net effect of the journaled writes for one class and date."""
+
+    def __init__(self):
+        self.all_present = False
+        self.statuses: Dict[int, str] = {}
+        self.names: Dict[int, str] = {}
+        # status each grid save expected to overwrite, from the first save that touched the roll
+        self.base: Dict[int, str] = {}
+        # rolls queued by add_individual after the day's last mark_all_present: online they were
+        # not there to be marked, so a new student among them stays 'Absent'
+        self.unmarked: Set[int] = set()
+
+class ClassBatch:
+    """
+    Net effect of the journaled writes for one class: students to add, then each date. Entries
+    must be added in sequence order; what a later write depends on (a student added after a day
+    was marked all present) is recorded on the day.
+    """
+
+    def __init__(self, class_name: str):
+        self.class_name = class_name
+        self.students: Dict[int, str] = {}
+        self.days: Dict[date, DayBatch] = {}
+        self.seqs: List[int] = []
+
+    def add(self, entry: JournalEntry) -> None:
+        self.seqs.append(entry.seq)
+        p = entry.payload
+        if entry.op == "add_individual":
+            roll = int(p["roll"])
+            self.students[roll] = p["name"]
+            for day in self.days.values():
+                if day.all_present:
+                    day.unmarked.add(roll)
+            return
+        day = self.days.setdefault(entry.day, DayBatch())
+        if entry.op == "mark_all_present":
+            day.all_present = True
+            day.statuses.clear()
+            day.unmarked.clear()
+        elif entry.op == "custom_marking_absent":
+            for roll in p["absent"]:
+                day.statuses[int(roll)] = "Absent"
+        else:
+            for roll, name, status in p["rows"]:
+                if status:
+                    day.statuses[int(roll)] = status
+                if name:
+                    day.names[int(roll)] = name
+            for roll, status in p.get("base", {}).items():
+                day.base.setdefault(int(roll), status)
+
+def coalesce(entries: Iterable[JournalEntry]) -> Dict[str, ClassBatch]:
+    batches: Dict[str, ClassBatch] = {}
+    for entry in entries:
+        batch = batches.get(entry.class_name)
+        if batch is None:
+            batch = batches[entry.class_name] = ClassBatch(entry.class_name)
+        batch.add(entry)
+    return batches
+
+class ReplayReport:
+    """What one replay() did."""
+
+    def __init__(self):
+        self.applied = 0        # journal entries written and removed
+        self.classes = 0
+        self.transactions = 0
+        self.remaining = 0      # entries still queued
+        self.failed = 0         # entries that could not be applied, kept in the journal as failed
+        self.offline = False    # stopped because the database is still unreachable
+        self.conflicts: List[Tuple[str, Optional[date], str]] = []
+        self.elapsed = 0.0
+
+    def lines(self) -> List[str]:
+        out = [f"replayed {self.applied} queued write(s) for {self.classes} class(es) in "
+               f"{self.transactions} transaction(s), {len(self.conflicts)} conflict(s), "
+               f"{self.remaining} still pending in {self.elapsed:.2f}s"]
+        if self.failed:
+            out.append(f"{self.failed} write(s) could not be applied and are kept in the journal")
+        if self.offline:
+            out.append("database still unreachable")
+        for cls, day, message in self.conflicts:
+            out.append(f"  {cls}{' ' + day.isoformat() if day else ''}: {message}")
+        return out
+
+def _as_datetime(day: date) -> datetime:
+    return datetime.combine(day, datetime.min.time())
+
+class OfflineWriter:
+    """
+    Sends writes to an AttendanceDB, or journals them when it is unreachable. Once anything is
+    queued for a class, later writes for that class are queued behind it until replay() has
+    applied it, so they reach the database in the order they were made. Without a journal it
+    is a plain pass-through.
+    """
+
+    def __init__(self, db: dbmod.AttendanceDB, journal: Optional[WriteJournal]):
+        self.db = db
+        self.journal = journal
+        self.offline = False
+        # (class, date) grids served from the cached roster; their statuses are guesses, not a base
+        self._guessed_days: set = set()
+        # held by direct writes and by each class replay, so neither overtakes the other
+        self._order = threading.Lock()
+
+    def pending_count(self) -> int:
+        return self.journal.pending_count() if self.journal is not None else 0
+
+    def failed_count(self) -> int:
+        return self.journal.failed_count() if self.journal is not None else 0
+
+    def _lost(self, err: Exception) -> bool:
+        if self.journal is not None and self.db.backend.is_connection_lost(err):
+            self.offline = True
+            return True
+        return False
+
+    def _write(self, op: str, class_name: str, day: Optional[date], payload: dict, fn):
+        """Run fn() (returning True) or journal the write (returning False)."""
+        if not self.db.IDENTIFIER_RE.match(class_name or ""):
+            raise ValueError(f"Invalid identifier: {class_name!r}.")
+        if self.journal is not None:
+            # the append is under the lock too, so a replay cannot finish the class in between
+            with self._order:
+                if not self.offline and not self.journal.has_pending(class_name):
+                    try:
+                        fn()
+                        return True
+                    except Exception as e:
+                        if not self._lost(e):
+                            raise
+                self.journal.append(op, class_name, day, payload)
+            return False
+        fn()
+        return True
+
+    # ----- writes: True when written, False when queued -----
+    def mark_all_present(self, class_name: str, dt: datetime) -> bool:
+        return self._write("mark_all_present", class_name, dt.date(), {},
+                           lambda: self.db.mark_all_present(class_name, dt))
+
+    def custom_marking_absent(self, class_name: str, absent_rolls: Iterable[int], dt: datetime) -> bool:
+        rolls = [int(r) for r in absent_rolls]
+        return self._write("custom_marking_absent", class_name, dt.date(), {"absent": rolls},
+                           lambda: self.db.custom_marking_absent(class_name, rolls, dt))
+
+    def add_individual(self, class_name: str, student_name: str, roll_no: int) -> bool:
+        return self._write("add_individual", class_name, None, {"name": student_name, "roll": int(roll_no)},
+                           lambda: self.db.add_individual(class_name, student_name, roll_no))
+
+    def save_grid(self, class_name: str, rows: List[Tuple[int, str, str]], dt: datetime,
+                  base: Optional[Dict[int, str]] = None) -> Optional[int]:
+        """
+        Save edited (roll, name, status) rows, as save_attendance_grid(diff=False); base is the
+        loaded status of each row (AttendanceGrid.loaded_statuses()), used to spot conflicts on replay.
+        Unlike the other writes, returns the number of rows that changed, or None when queued.
+        """
+        rows = [(int(r), n, st) for r, n, st in rows]
+        if (class_name, dt.date()) in self._guessed_days:
+            base = None
+        payload = {"rows": rows, "base": {str(r): st for r, st in (base or {}).items()}}
+        changed: List[int] = []
+        sent = self._write("save_grid", class_name, dt.date(), payload,
+                           lambda: changed.append(self.db.save_attendance_grid(class_name, rows, dt, diff=False)))
+        return changed[0] if sent else None
+
+    def mark_attendance_range(self, class_name: str, start: date, end: date,
+                              absent: Optional[Dict[date, Iterable[int]]] = None) -> List[date]:
+        """
+        AttendanceDB.mark_attendance_range, which is not journaled: refused (RuntimeError) while the
+        database is unreachable or writes for the class are queued, so it never overtakes them.
+        """
+        if not self.db.IDENTIFIER_RE.match(class_name or ""):
+            raise ValueError(f"Invalid identifier: {class_name!r}.")
+        if self.journal is None:
+            return self.db.mark_attendance_range(class_name, start, end, absent)
+        with self._order:
+            if self.offline:
+                raise RuntimeError("The database is unreachable; range entry needs a connection.")
+            if self.journal.has_pending(class_name):
+                raise RuntimeError(f"{class_name} has offline changes waiting to be sent; "
+                                   f"enter the range once they are.")
+            try:
+                return self.db.mark_attendance_range(class_name, start, end, absent)
+            except Exception as e:
+                self._lost(e)
+                raise
+
+    # ----- reads with an offline fallback -----
+    def login(self, class_name: str, password: str) -> Tuple[dbmod.LoginSession, List[Tuple[int, str]]]:
+        """AttendanceDB.login, falling back to the password hash and roster cached at the last online login."""
+        try:
+            session, roster = self.db.login(class_name, password)
+        except Exception as e:
+            if not self._lost(e):
+                raise
+            session = self.db.login_offline(class_name, password, self.journal.cached_password_hash(class_name))
+            try:
+                return session, self.roster(class_name)
+            except ConnectionError:
+                if not session.admin:
+                    raise
+                return session, []
+        if self.journal is not None and not session.admin:
+            self.journal.remember_class(class_name, roster, self.db.get_class_password_hash(class_name))
+        return session, self.pending_roster(class_name, roster)
+
+    def roster(self, class_name: str) -> List[Tuple[int, str]]:
+        """fetch_roster, or offline the cached roster; students queued by add_individual are included."""
+        if self.journal is None:
+            return self.db.fetch_roster(class_name)
+        try:
+            if self.offline:
+                raise ConnectionError("offline")
+            roster = self.db.fetch_roster(class_name)
+            self.journal.remember_class(class_name, roster)
+        except Exception as e:
+            if not self._lost(e):
+                raise
+            roster = self.journal.cached_roster(class_name)
+            if roster is None:
+                raise ConnectionError(f"Database unreachable and no saved roster for {class_name}.") from e
+        return self.pending_roster(class_name, roster)
+
+    def session_roster(self, token: Optional[str], class_name: str) -> List[Tuple[int, str]]:
+        self.db.check_session(token, class_name)
+        return self.roster(class_name)
+
+    def pending_roster(self, class_name: str, roster: List[Tuple[int, str]]) -> List[Tuple[int, str]]:
+        if self.journal is None or not self.journal.has_pending(class_name):
+            return roster
+        students = dict(roster)
+        for batch in coalesce(self.journal.pending(class_name)).values():
+            students.update(batch.students)
+        return sorted(students.items())
+
+    def attendance(self, class_name: str, dt: datetime) -> List[Tuple[int, str, str]]:
+        """
+        The day's (roll, name, status) rows as the display grid loads them (the date is opened
+        first). Offline, or while writes for the class are queued, the queued writes are applied
+        on top; offline the base is the cached roster, all 'Absent'.
+        """
+        queued = self.journal is not None and self.journal.has_pending(class_name)
+        try:
+            if self.offline:
+                raise ConnectionError("offline")
+            self.db.ensure_attendance_date(class_name, dt)
+            rows = self.db.fetch_attendance(class_name, dt)
+        except Exception as e:
+            if not self._lost(e):
+                raise
+            roster = self.journal.cached_roster(class_name)
+            if roster is None:
+                raise ConnectionError(f"Database unreachable and no saved roster for {class_name}.") from e
+            rows = [(roll, name, "Absent") for roll, name in roster]
+            self._guessed_days.add((class_name, dt.date()))
+            queued = True
+        if not queued:
+            return rows
+        batch = coalesce(self.journal.pending(class_name)).get(class_name)
+        if batch is None:
+            return rows
+        day = batch.days.get(dt.date()) or DayBatch()
+        known = {roll for roll, _, _ in rows}
+        rows += [(roll, name, "Absent") for roll, name in batch.students.items() if roll not in known]
+
+        def status_of(roll: int, status: str) -> str:
+            if roll in day.statuses:
+                return day.statuses[roll]
+            if day.all_present and (roll in known or roll not in day.unmarked):
+                return "Present"
+            return status
+        return sorted((roll, day.names.get(roll, name), status_of(roll, status)) for roll, name, status in rows)
+
+    # ----- replay -----
+    def replay(self) -> ReplayReport:
+        """Apply everything queued, one transaction per class; stops early if the database is still down."""
+        report = ReplayReport()
+        started = time.perf_counter()
+        if self.journal is None:
+            return report
+        try:
+            if self.offline and not self._reachable():
+                report.offline = True
+                return report
+            for class_name, batch in coalesce(self.journal.pending()).items():
+                with self._order:
+                    try:
+                        conflicts = self._apply(batch)
+                    except Exception as e:
+                        if self.db.backend.is_connection_lost(e):
+                            self.offline = True
+                            report.offline = True
+                            break
+                        # bad data, a missing class...: retrying will not help, so keep it aside and say why
+                        self.journal.mark_failed(batch.seqs, str(e))
+                        report.failed += len(batch.seqs)
+                        conflicts = [(class_name, None, f"not applied ({len(batch.seqs)} write(s) kept as failed): {e}")]
+                    else:
+                        self.journal.remove(batch.seqs)
+                        report.applied += len(batch.seqs)
+                        report.transactions += 1
+                    self.journal.log_conflicts(conflicts)
+                    report.conflicts += conflicts
+                    report.classes += 1
+            else:
+                self.offline = False
+        finally:
+            report.remaining = self.journal.pending_count()
+            report.elapsed = time.perf_counter() - started
+        return report
+
+    def _reachable(self) -> bool:
+        try:
+            with self.db.session() as cur:
+                cur.execute("SELECT 1;")
+                cur.fetchall()
+        except Exception as e:
+            if self.db.backend.is_connection_lost(e):
+                return False
+            raise
+        return True
+
+    def _apply(self, batch: ClassBatch) -> List[Tuple[str, Optional[date], str]]:
+        db, class_name = self.db, batch.class_name
+        conflicts = []
+        if class_name not in db.class_table_names() and not batch.students:
+            raise ValueError(f"class '{class_name}' no longer exists")
+        existing: Dict[int, str] = {}
+        with db.session():
+            if batch.students:
+                existing = dict(db.fetch_students(class_name)) if class_name in db.class_table_names() else {}
+                for roll, name in sorted(batch.students.items()):
+                    if existing.get(roll) not in (None, name):
+                        conflicts.append((class_name, None, f"roll {roll} already '{existing[roll]}', renamed to '{name}'"))
+                    db.add_individual(class_name, name, roll)
+            for day, changes in sorted(batch.days.items()):
+                dt = _as_datetime(day)
+                db.ensure_attendance_date(class_name, dt)
+                stored = {roll: status for roll, _, status in db.fetch_attendance(class_name, dt)}
+                for roll, status in sorted(changes.statuses.items()):
+                    if roll not in stored:
+                        conflicts.append((class_name, day, f"roll {roll} is not in the class; '{status}' not saved"))
+                    elif roll in changes.base and stored[roll] not in (changes.base[roll], status):
+                        conflicts.append((class_name, day, f"roll {roll} was changed to '{stored[roll]}' meanwhile; "
+                                                           f"overwritten with '{status}'"))
+                statuses = dict(changes.statuses)
+                if changes.all_present:
+                    db.mark_all_present(class_name, dt)
+                    # students added after the day was marked were not marked online either
+                    for roll in changes.unmarked:
+                        if roll not in existing:
+                            statuses.setdefault(roll, "Absent")
+                rows = [(roll, changes.names.get(roll, ""), status) for roll, status in statuses.items()]
+                rows += [(roll, name, "") for roll, name in changes.names.items() if roll not in statuses]
+                if rows:
+                    # rename-only rows have a blank status and keep the one the day already has
+                    db.save_attendance_grid(class_name, rows, dt, diff=True)
+        return conflicts
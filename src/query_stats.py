@@ -0,0 +1,304 @@
+import bisect
+import inspect
+import re
+import threading
+import time
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+# histogram bucket upper bounds in milliseconds; anything slower lands in the overflow bucket
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 10000)
+# operation recorded for statements issued outside any timed AttendanceDB method
+UNATTRIBUTED = "-"
+
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w`])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))*")
+_DATE_COLUMN_RE = re.compile(r"`\d{4}_\d{2}_\d{2}`")
+_SPACE_RE = re.compile(r"\s+")
+
+@lru_cache(maxsize=1024)
+def fingerprint(sql: str) -> str:
+    """
+    sql with literals, placeholders and per-day column names replaced by ?, runs of value tuples
+    collapsed to one and whitespace squeezed, so every call of the same statement shares a key.
+    """
+    text = _STRING_RE.sub("?", sql)
+    text = text.replace("%s", "?")
+    text = _NUMBER_RE.sub("?", text)
+    text = _DATE_COLUMN_RE.sub("`?`", text)
+    text = _PLACEHOLDER_LIST_RE.sub("(?)", text)
+    return _SPACE_RE.sub(" ", text).strip().rstrip(";")
+
+class LatencyHistogram:
+    """Count, total, max and bucketed durations (see BUCKETS_MS) of one kind of call."""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS_MS, seconds * 1000.0)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, pct: float) -> float:
+        """Upper bound in seconds of the bucket holding the pct-th percentile (max for the overflow bucket)."""
+        if not self.count:
+            return 0.0
+        rank = pct / 100.0 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(BUCKETS_MS[i] / 1000.0, self.max) if i < len(BUCKETS_MS) else self.max
+        return self.max
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "avg": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "max": self.max,
+            "buckets": dict(zip([f"<={b}ms" for b in BUCKETS_MS] + ["slower"], self.counts)),
+        }
+
+class QueryStats:
+    """
+    What AttendanceDB.enable_query_stats() collects: a latency histogram per public AttendanceDB
+    method (the whole call) and per method of the statements it ran, per-fingerprint statement
+    counters, and an optional slow-query log with one line per statement over slow_ms.
+    Only the outermost method of a call chain is timed, and its statements are attributed to it.
+    """
+
+    def __init__(self, slow_ms: float = 100.0, slow_log: Optional[str] = None):
+        self.slow_seconds = slow_ms / 1000.0
+        self.slow_log = slow_log
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._slow_fh = open(slow_log, "a", encoding="utf-8") if slow_log else None
+        self.operations: Dict[str, LatencyHistogram] = {}
+        self.statements: Dict[str, LatencyHistogram] = {}
+        self.fingerprints: Dict[str, list] = {}  # fingerprint -> [calls, seconds, rows, max seconds]
+        self.slow_queries = 0
+
+    # ----- attribution -----
+    @property
+    def operation(self) -> Optional[str]:
+        return getattr(self._local, "operation", None)
+
+    def time_method(self, name: str, method):
+        """Wrap a bound method so calls made while no other timed method is running are timed as name."""
+        local = self._local
+
+        def timed(*args, **kwargs):
+            if getattr(local, "operation", None) is not None:
+                return method(*args, **kwargs)
+            local.operation = name
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                local.operation = None
+                self._add(self.operations, name, elapsed)
+
+        timed.__name__ = name
+        timed.__doc__ = method.__doc__
+        timed.__wrapped__ = method
+        return timed
+
+    # ----- recording -----
+    def _add(self, table: Dict[str, LatencyHistogram], key: str, seconds: float) -> None:
+        with self._lock:
+            hist = table.get(key)
+            if hist is None:
+                hist = table[key] = LatencyHistogram()
+            hist.add(seconds)
+
+    def record(self, sql: str, seconds: float, rows: Optional[int], operation: Optional[str] = None) -> None:
+        """Account one executed statement to operation (by default the running one)."""
+        operation = operation or getattr(self._local, "operation", None) or UNATTRIBUTED
+        key = fingerprint(sql)
+        with self._lock:
+            hist = self.statements.get(operation)
+            if hist is None:
+                hist = self.statements[operation] = LatencyHistogram()
+            hist.add(seconds)
+            entry = self.fingerprints.get(key)
+            if entry is None:
+                entry = self.fingerprints[key] = [0, 0.0, 0, 0.0]
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] += rows if rows is not None and rows > 0 else 0
+            if seconds > entry[3]:
+                entry[3] = seconds
+            if seconds >= self.slow_seconds:
+                self.slow_queries += 1
+                if self._slow_fh is not None:
+                    self._slow_fh.write(f"{datetime.now().isoformat(timespec='milliseconds')}\t"
+                                        f"{seconds * 1000:.1f}ms\trows={'-' if rows is None or rows < 0 else rows}\t"
+                                        f"op={operation}\t{key}\n")
+                    self._slow_fh.flush()
+
+    def cursor(self, cur) -> "InstrumentedCursor":
+        return InstrumentedCursor(cur, self)
+
+    # ----- reading -----
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "operations": {name: h.snapshot() for name, h in self.operations.items()},
+                "statements": {name: h.snapshot() for name, h in self.statements.items()},
+                "slow_queries": self.slow_queries,
+                "slow_ms": self.slow_seconds * 1000.0,
+            }
+
+    def top_fingerprints(self, limit: int = 10) -> List[Tuple[str, int, float, int, float]]:
+        """(fingerprint, calls, total seconds, rows, max seconds) of the statements with the most total time."""
+        with self._lock:
+            ranked = sorted(self.fingerprints.items(), key=lambda kv: -kv[1][1])[:limit]
+            return [(key, calls, total, rows, slowest) for key, (calls, total, rows, slowest) in ranked]
+
+    def summary(self) -> str:
+        """One line for a status bar: statement count, slow statements and the slowest operation by p95."""
+        with self._lock:
+            queries = sum(h.count for h in self.statements.values())
+            worst = max(self.operations.items(), key=lambda kv: kv[1].percentile(95), default=None)
+            text = f"{queries:,} queries, {self.slow_queries} slow"
+            if worst is not None:
+                text += f", slowest {worst[0]} p95 {worst[1].percentile(95) * 1000:.0f} ms"
+            return text
+
+    def report(self, fingerprints: int = 10) -> List[str]:
+        with self._lock:
+            rows = sorted(self.operations.items(), key=lambda kv: -kv[1].total)
+            statements = {name: (h.count, h.total) for name, h in self.statements.items()}
+        out = [f"{'operation':<32}{'calls':>7}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}{'queries':>9}{'in SQL':>8}"]
+        for name, hist in rows:
+            count, sql_seconds = statements.get(name, (0, 0.0))
+            out.append(f"{name:<32}{hist.count:>7}{hist.percentile(50) * 1000:>9.1f}{hist.percentile(95) * 1000:>9.1f}"
+                       f"{hist.max * 1000:>9.1f}{count:>9}{sql_seconds / hist.total if hist.total else 0:>8.0%}")
+        if UNATTRIBUTED in statements:
+            out.append(f"{'(outside AttendanceDB methods)':<32}{'':>43}{statements[UNATTRIBUTED][0]:>9}")
+        top = self.top_fingerprints(fingerprints)
+        if top:
+            out.append(f"slowest statements by total time (slow = over {self.slow_seconds * 1000:.0f} ms: "
+                       f"{self.slow_queries})")
+            for key, calls, total, rows_, slowest in top:
+                out.append(f"  {total * 1000:9.1f} ms {calls:>7}x max {slowest * 1000:7.1f} ms  {key[:100]}")
+        return out
+
+    def reset(self) -> None:
+        with self._lock:
+            self.operations.clear()
+            self.statements.clear()
+            self.fingerprints.clear()
+            self.slow_queries = 0
+
+    def close(self) -> None:
+        with self._lock:
+            if self._slow_fh is not None:
+                self._slow_fh.close()
+                self._slow_fh = None
+
+class InstrumentedCursor:
+    """
+    Cursor proxy that reports each statement to a QueryStats. A statement's time includes fetching
+    its rows (SQLite does most of a SELECT's work there), so it is recorded when the next statement
+    starts or the cursor is flushed/closed; rows is rowcount, or the rows fetched for a SELECT.
+    """
+
+    __slots__ = ("_cur", "_stats", "_pending")
+
+    def __init__(self, cur, stats: QueryStats):
+        self._cur = cur
+        self._stats = stats
+        self._pending = None  # [sql, operation, seconds, rowcount, rows fetched]
+
+    def _timed(self, method, sql: str, params, args, kwargs):
+        self.flush()
+        operation = self._stats.operation
+        started = time.perf_counter()
+        try:
+            return method(sql, params, *args, **kwargs)
+        finally:
+            try:
+                rowcount = self._cur.rowcount
+            except Exception:
+                rowcount = None
+            self._pending = [sql, operation, time.perf_counter() - started, rowcount, 0]
+
+    def execute(self, sql: str, params=(), *args, **kwargs):
+        return self._timed(self._cur.execute, sql, params, args, kwargs)
+
+    def executemany(self, sql: str, seq_of_params, *args, **kwargs):
+        return self._timed(self._cur.executemany, sql, seq_of_params, args, kwargs)
+
+    def _fetched(self, started: float, rows: int) -> None:
+        if self._pending is not None:
+            self._pending[2] += time.perf_counter() - started
+            self._pending[4] += rows
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = self._cur.fetchone()
+        self._fetched(started, row is not None)
+        return row
+
+    def fetchmany(self, size: int = 1) -> list:
+        started = time.perf_counter()
+        rows = self._cur.fetchmany(size)
+        self._fetched(started, len(rows))
+        return rows
+
+    def fetchall(self) -> list:
+        started = time.perf_counter()
+        rows = self._cur.fetchall()
+        self._fetched(started, len(rows))
+        return rows
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def flush(self) -> None:
+        """Record the pending statement, if any."""
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            sql, operation, seconds, rowcount, fetched = pending
+            self._stats.record(sql, seconds, rowcount if rowcount is not None and rowcount >= 0 else fetched,
+                               operation)
+
+    def close(self) -> None:
+        self.flush()
+        self._cur.close()
+
+    def __getattr__(self, name):
+        return getattr(self._cur, name)
+
+def public_methods(cls) -> List[str]:
+    """Names of the plain public methods of cls that can be timed as a whole call (no generators/context managers)."""
+    names = []
+    for name in dir(cls):
+        if name.startswith("_"):
+            continue
+        attr = inspect.getattr_static(cls, name)
+        if not inspect.isfunction(attr):
+            continue
+        if inspect.isgeneratorfunction(inspect.unwrap(attr)):
+            continue
+        names.append(name)
+    return names
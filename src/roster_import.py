@@ -0,0 +1,157 @@
+import csv
+import json
+import os
+import time
+from typing import Iterator, List, Optional, Tuple
+
+# MySQL INT range for Roll_no
+ROLL_MIN, ROLL_MAX = 1, 2_147_483_647
+# how many rejected rows are kept in memory when no reject file is given
+REJECT_SAMPLE = 100
+
+class ImportReport:
+    """Counters and timings for one CSV import run."""
+
+    def __init__(self, path: str, class_name: str):
+        self.path = path
+        self.class_name = class_name
+        self.header_detected = False
+        self.resumed_from = 0      # data rows skipped thanks to a checkpoint
+        self.rows_read = 0         # data rows consumed in this run (valid + rejected)
+        self.rows_written = 0
+        self.rejected = 0
+        self.rejects: List[Tuple[int, List[str], str]] = []  # (line, row, reason) sample
+        self.reject_path: Optional[str] = None
+        self.chunks = 0
+        self.method = "batched"
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows_read / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> str:
+        text = (f"{self.rows_written:,} row(s) imported into {self.class_name} in {self.elapsed:.2f}s "
+                f"({self.rows_per_second:,.0f} rows/s), {self.rejected:,} rejected")
+        if self.resumed_from:
+            text += f", resumed after {self.resumed_from:,} row(s)"
+        if self.rejected and self.reject_path:
+            text += f"; rejects written to {self.reject_path}"
+        return text
+
+def parse_roster_row(row: List[str]) -> Tuple[str, int]:
+    """Validate one (Student_name, Roll_no) CSV row. Raises ValueError with a readable reason."""
+    if len(row) < 2:
+        raise ValueError("expected at least 2 columns (Student_name, Roll_no)")
+    name = row[0].strip()
+    if not name:
+        raise ValueError("empty Student_name")
+    if len(name) > 255:
+        raise ValueError("Student_name longer than 255 characters")
+    try:
+        roll = int(row[1].strip())
+    except ValueError:
+        raise ValueError(f"Roll_no {row[1]!r} is not an integer") from None
+    if not ROLL_MIN <= roll <= ROLL_MAX:
+        raise ValueError(f"Roll_no {roll} out of range")
+    return name, roll
+
+def looks_like_header(row: List[str]) -> bool:
+    """A first row whose Roll_no column is not a number is treated as a header."""
+    if len(row) < 2:
+        return False
+    try:
+        int(row[1].strip())
+        return False
+    except ValueError:
+        return True
+
+class ByteCountingLines:
+    """Iterate a file's lines as text while tracking how many bytes have been consumed."""
+
+    def __init__(self, path: str, encoding: str = "utf-8-sig"):
+        self._fh = open(path, "rb")
+        self.encoding = encoding
+        self.total_bytes = os.fstat(self._fh.fileno()).st_size
+        self.bytes_read = 0
+        self._first = True
+
+    def __iter__(self) -> Iterator[str]:
+        for raw in self._fh:
+            self.bytes_read += len(raw)
+            # utf-8-sig only matters for the first line (strips a BOM)
+            encoding = self.encoding if self._first else "utf-8"
+            self._first = False
+            yield raw.decode(encoding)
+
+    def close(self) -> None:
+        self._fh.close()
+
+class ImportCheckpoint:
+    """
+    JSON checkpoint recording how many data rows of a file have been committed, so an
+    interrupted import can resume. It is only honoured for the same file, size, mtime and class.
+    """
+
+    def __init__(self, checkpoint_path: str, source_path: str, class_name: str):
+        self.checkpoint_path = checkpoint_path
+        st = os.stat(source_path)
+        self.key = {
+            "source": os.path.abspath(source_path),
+            "size": st.st_size,
+            "mtime": st.st_mtime,
+            "class_name": class_name,
+        }
+
+    def load(self) -> int:
+        try:
+            with open(self.checkpoint_path, encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            return 0
+        if any(data.get(k) != v for k, v in self.key.items()):
+            return 0
+        return int(data.get("rows_done", 0))
+
+    def save(self, rows_done: int) -> None:
+        tmp = self.checkpoint_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(dict(self.key, rows_done=rows_done, saved_at=time.time()), fh)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, self.checkpoint_path)
+
+    def clear(self) -> None:
+        try:
+            os.remove(self.checkpoint_path)
+        except FileNotFoundError:
+            pass
+
+class RejectSink:
+    """Collects rejected rows, into a CSV file when a path is given, otherwise as an in-memory sample."""
+
+    def __init__(self, report: ImportReport, path: Optional[str], append: bool = False):
+        self.report = report
+        self.path = path
+        self._fh = None
+        self._writer = None
+        self._append = append
+
+    def add(self, line_no: int, row: List[str], reason: str) -> None:
+        self.report.rejected += 1
+        if self.path is None:
+            if len(self.report.rejects) < REJECT_SAMPLE:
+                self.report.rejects.append((line_no, row, reason))
+            return
+        if self._writer is None:
+            new_file = not (self._append and os.path.exists(self.path))
+            self._fh = open(self.path, "a" if self._append else "w", newline="", encoding="utf-8")
+            self._writer = csv.writer(self._fh)
+            if new_file:
+                self._writer.writerow(["line", "error", "row"])
+            self.report.reject_path = self.path
+        self._writer.writerow([line_no, reason, *row])
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
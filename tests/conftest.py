@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import Main_database as dbmod  # noqa: E402
+
+@pytest.fixture(params=["wide", "long"])
+def db(request, tmp_path):
+    """An empty AttendanceDB on a scratch SQLite file, once per storage layout."""
+    db = dbmod.AttendanceDB.sqlite(str(tmp_path / "attendance.sqlite3"), storage=request.param,
+                                   admin_password="admin-pw")
+    yield db
+    db.close()
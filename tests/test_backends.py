@@ -0,0 +1,106 @@
+import sqlite3
+import threading
+
+import pytest
+
+from backends import SQLiteBackend, StorageBackend
+
+@pytest.fixture
+def backend(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "b.sqlite3"))
+    yield backend
+    backend.close()
+
+def run(backend, sql, params=()):
+    conn = backend.checkout()
+    try:
+        cur = backend.cursor(conn)
+        cur.execute(sql, params)
+        rows = cur.fetchall()
+        conn.commit()
+        return rows
+    finally:
+        backend.release(conn)
+
+def test_translate_placeholders(backend):
+    assert backend.translate("SELECT a FROM t WHERE a = %s AND b IN (%s, %s);") == \
+        "SELECT a FROM t WHERE a = ? AND b IN (?, ?);"
+    assert backend.translate("SELECT 1;") == "SELECT 1;"
+
+def test_translate_is_memoised(backend):
+    sql = "SELECT %s;"
+    assert backend.translate(sql) is backend.translate(sql)
+
+def test_translation_cache_is_bounded(backend, monkeypatch):
+    monkeypatch.setattr(SQLiteBackend, "TRANSLATION_CACHE_SIZE", 4)
+    for i in range(10):
+        backend.translate(f"SELECT {i}, %s;")
+    assert len(backend._translations) <= 4
+
+def test_cursor_binds_percent_s_params(backend):
+    run(backend, "CREATE TABLE `t` (k INTEGER PRIMARY KEY, v TEXT);")
+    conn = backend.checkout()
+    try:
+        cur = backend.cursor(conn)
+        cur.executemany("INSERT INTO `t` (k, v) VALUES (%s, %s);", [(1, "a"), (2, "b")])
+        assert cur.rowcount == 2
+        conn.commit()
+    finally:
+        backend.release(conn)
+    assert run(backend, "SELECT v FROM `t` WHERE k = %s;", (2,)) == [("b",)]
+
+@pytest.mark.parametrize("add, expected", [(False, 5), (True, 8)], ids=["overwrite", "add"])
+def test_upsert(backend, add, expected):
+    run(backend, "CREATE TABLE `s` (k INTEGER PRIMARY KEY, n INTEGER);")
+    sql = f"INSERT INTO `s` (k, n) VALUES (%s, %s) {backend.upsert(('k',), ('n',), add=add)};"
+    run(backend, sql, (1, 3))
+    run(backend, sql, (1, 5))
+    assert run(backend, "SELECT n FROM `s`;") == [(expected,)]
+
+def test_schema_query_lists_tables_and_columns(backend):
+    run(backend, "CREATE TABLE `c1` (Roll_no INTEGER, Student_name TEXT);")
+    assert sorted(run(backend, backend.schema_query())) == [("c1", "Roll_no"), ("c1", "Student_name")]
+
+def test_error_classification(backend):
+    run(backend, "CREATE TABLE `t` (a INTEGER);")
+    with pytest.raises(sqlite3.OperationalError) as err:
+        run(backend, "ALTER TABLE `t` ADD COLUMN a INTEGER;")
+    assert backend.is_duplicate_column(err.value)
+    assert backend.is_connection_lost(ConnectionError("gone"))
+    assert not backend.is_connection_lost(ValueError("bad input"))
+
+def test_missing_directory_is_a_connection_error(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "no" / "such" / "dir.sqlite3"))
+    with pytest.raises(ConnectionError):
+        backend.connect()
+
+def test_pooled_connections_are_per_thread(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "p.sqlite3"), pool_size=2)
+    seen = []
+
+    def worker():
+        conn = backend.checkout()
+        seen.append(conn)
+        backend.release(conn)
+
+    try:
+        threads = [threading.Thread(target=worker) for _ in range(2)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert seen[0] is not seen[1]
+        assert backend.pool_stats.snapshot()["checkouts"] == 2
+    finally:
+        backend.close()
+
+def test_memory_database_is_never_pooled():
+    assert not SQLiteBackend(":memory:", pool_size=4).is_pooled
+
+def test_incomplete_backend_fails_at_construction():
+    class Partial(StorageBackend):
+        def connect(self) -> bool:
+            return True
+
+    with pytest.raises(TypeError, match="abstract"):
+        Partial()
@@ -0,0 +1,93 @@
+import importlib.util
+import random
+import sys
+
+import pytest
+
+from bitset import ABSENT, PRESENT, STATUS_CODES, DayBitmap
+
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+
+CASES = {
+    "empty_class": [],
+    "single_student": [(7, PRESENT)],
+    # 13 rolls: the last bitmap byte is only partly used
+    "non_multiple_of_8": [(roll, PRESENT if roll % 3 else ABSENT) for roll in range(1, 14)],
+    "every_status_code": [(roll, STATUS_CODES[roll % len(STATUS_CODES)]) for roll in range(100, 112)],
+    "custom_label": [(1, PRESENT), (2, "Médical"), (3, ABSENT), (9, "Late")],
+    "gaps_in_rolls": [(5, PRESENT), (40, ABSENT), (41, "Excused"), (1000, PRESENT)],
+}
+
+def _present(bitmap: DayBitmap, path: str):
+    """(roll, present?) for every enrolled roll, read through the given path."""
+    if path == "numpy":
+        rolls, present = bitmap.to_numpy()
+        return list(zip(rolls.tolist(), present.tolist()))
+    return [(roll, status == PRESENT) for roll, status in bitmap.statuses()]
+
+PATHS = [
+    "python",
+    pytest.param("numpy", marks=pytest.mark.skipif(not HAS_NUMPY, reason="NumPy is not installed")),
+]
+
+@pytest.mark.parametrize("path", PATHS)
+@pytest.mark.parametrize("rows", list(CASES.values()), ids=list(CASES))
+def test_round_trip(rows, path):
+    bitmap = DayBitmap.from_statuses(rows)
+    decoded = DayBitmap.decode(bitmap.encode())
+    assert decoded == bitmap
+    assert list(decoded.statuses()) == sorted(rows)
+    assert _present(decoded, path) == [(roll, status == PRESENT) for roll, status in sorted(rows)]
+    assert decoded.enrolled_count() == len(rows)
+    assert decoded.present_count() == sum(1 for _, s in rows if s == PRESENT)
+    assert decoded.absent_count() == sum(1 for _, s in rows if s != PRESENT)
+    for label in set(STATUS_CODES) | {s for _, s in rows}:
+        assert decoded.count(label) == sum(1 for _, s in rows if s == label)
+
+def test_none_status_is_absent():
+    assert list(DayBitmap.from_statuses([(1, None)]).statuses()) == [(1, ABSENT)]
+
+def test_set_below_base_rebases():
+    bitmap = DayBitmap.from_statuses([(10, PRESENT), (12, "Late")])
+    bitmap.set(3, "Excused")
+    assert list(DayBitmap.decode(bitmap.encode()).statuses()) == [(3, "Excused"), (10, PRESENT), (12, "Late")]
+
+def test_diff():
+    before = DayBitmap.from_statuses([(1, PRESENT), (2, ABSENT), (3, "Late")])
+    after = DayBitmap.from_statuses([(1, PRESENT), (2, PRESENT), (3, "Excused"), (4, ABSENT)])
+    assert before.diff(after) == [(2, ABSENT, PRESENT), (3, "Late", "Excused"), (4, None, ABSENT)]
+    assert before.diff(before) == []
+
+def test_random_round_trip_and_diff():
+    rng = random.Random(1234)
+    labels = [ABSENT, PRESENT, PRESENT, PRESENT, "Late", "Excused", "Médical"]
+    for _ in range(500):
+        base = rng.randint(1, 5000)
+        width = rng.randint(1, 700)
+        rolls = rng.sample(range(base, base + width), rng.randint(0, min(width, 300)))
+        rows = [(r, rng.choice(labels)) for r in rolls]
+        bitmap = DayBitmap.from_statuses(rows)
+        assert list(DayBitmap.decode(bitmap.encode()).statuses()) == sorted(rows)
+        changed = DayBitmap.from_statuses(rows)
+        edits = {}
+        for _ in range(rng.randint(0, 20)):
+            roll = rng.randint(base - 50, base + 800)
+            edits[roll] = rng.choice(labels)
+            changed.set(roll, edits[roll])
+        before = dict(rows)
+        assert bitmap.diff(changed) == [(r, before.get(r), s) for r, s in sorted(edits.items()) if before.get(r) != s]
+        assert DayBitmap.decode(changed.encode()) == changed
+
+@pytest.mark.parametrize("blob", [b"", b"AB1\x00", b"XX1" + bytes(9)], ids=["empty", "truncated", "bad_magic"])
+def test_decode_rejects_corrupt(blob):
+    with pytest.raises(ValueError):
+        DayBitmap.decode(blob)
+
+def test_decode_rejects_trailing_bytes():
+    with pytest.raises(ValueError):
+        DayBitmap.decode(DayBitmap.from_statuses([(1, PRESENT)]).encode() + b"\x00")
+
+def test_to_numpy_without_numpy(monkeypatch):
+    monkeypatch.setitem(sys.modules, "numpy", None)
+    with pytest.raises(RuntimeError):
+        DayBitmap.from_statuses([(1, PRESENT)]).to_numpy()
@@ -0,0 +1,202 @@
+import sqlite3
+from datetime import date, datetime
+
+import pytest
+
+from offline_journal import OfflineWriter, WriteJournal
+
+D1, D2 = datetime(2024, 3, 4), datetime(2024, 3, 5)
+
+class Link:
+    """Takes the database down (every session fails as a lost connection) and brings it back."""
+
+    def __init__(self, db):
+        self.db = db
+        self._session = db.session
+
+    def down(self):
+        def lost():
+            raise ConnectionError("server gone")
+        self.db.session = lost
+
+    def up(self):
+        self.db.session = self._session
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = WriteJournal(str(tmp_path / "journal.sqlite3"))
+    yield journal
+    journal.close()
+
+@pytest.fixture
+def klass(db):
+    db.create_table_for_class("c1")
+    for roll in range(1, 6):
+        db.add_individual("c1", f"S{roll}", roll)
+    return db
+
+@pytest.fixture
+def link(klass):
+    link = Link(klass)
+    yield link
+    link.up()
+
+@pytest.fixture
+def writer(klass, journal):
+    writer = OfflineWriter(klass, journal)
+    writer.roster("c1")  # caches the roster, as an online login does
+    return writer
+
+def statuses(db, dt):
+    return {roll: status for roll, _, status in db.fetch_attendance("c1", dt)}
+
+def test_append_keeps_order_and_payload(journal):
+    journal.append("mark_all_present", "c1", D1.date(), {})
+    journal.append("add_individual", "c1", None, {"name": "New", "roll": 6})
+    journal.append("mark_all_present", "c2", D1.date(), {})
+    entries = journal.pending("c1")
+    assert [(e.op, e.day) for e in entries] == [("mark_all_present", D1.date()), ("add_individual", None)]
+    assert entries[1].payload == {"name": "New", "roll": 6}
+    assert journal.pending_count() == 3 and journal.has_pending("c2") and not journal.has_pending("c3")
+
+def test_append_rejects_unknown_operations(journal):
+    with pytest.raises(ValueError, match="Unknown journal operation"):
+        journal.append("drop_table", "c1", None, {})
+
+def test_old_journal_gains_failed_column(tmp_path):
+    path = str(tmp_path / "old.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE pending (seq INTEGER PRIMARY KEY AUTOINCREMENT, op TEXT NOT NULL, "
+                 "class_name TEXT NOT NULL, day TEXT, payload TEXT NOT NULL, queued_at REAL NOT NULL);")
+    conn.execute("INSERT INTO pending (op, class_name, day, payload, queued_at) "
+                 "VALUES ('mark_all_present', 'c1', '2024-03-04', '{}', 0);")
+    conn.commit()
+    conn.close()
+    journal = WriteJournal(path)
+    try:
+        assert [e.op for e in journal.pending()] == ["mark_all_present"]
+        assert journal.failed_count() == 0
+    finally:
+        journal.close()
+
+def test_writes_go_straight_through_online(writer, journal):
+    assert writer.mark_all_present("c1", D1) is True
+    assert writer.save_grid("c1", [(1, "", "Absent"), (2, "", "Present")], D1) == 1
+    assert journal.pending_count() == 0
+    assert statuses(writer.db, D1)[1] == "Absent"
+
+def test_lost_connection_queues_and_later_writes_wait(writer, journal, link):
+    link.down()
+    assert writer.mark_all_present("c1", D1) is False
+    assert writer.offline
+    link.up()
+    writer.offline = False
+    # the connection is back, but c1 still has a queued write: this one must not overtake it
+    assert writer.custom_marking_absent("c1", [2], D1) is False
+    assert [e.op for e in journal.pending("c1")] == ["mark_all_present", "custom_marking_absent"]
+    assert writer.save_grid("c1", [(3, "", "Absent")], D1) is None
+
+def test_replay_coalesces_a_day_into_one_transaction(writer, journal, link):
+    link.down()
+    writer.mark_all_present("c1", D1)
+    writer.custom_marking_absent("c1", [2, 3], D1)
+    writer.save_grid("c1", [(3, "Renamed", "Present")], D1)
+    writer.mark_all_present("c1", D2)
+    link.up()
+    report = writer.replay()
+    assert (report.applied, report.classes, report.transactions, report.remaining) == (4, 1, 1, 0)
+    assert not report.conflicts and not writer.offline
+    assert statuses(writer.db, D1) == {1: "Present", 2: "Absent", 3: "Present", 4: "Present", 5: "Present"}
+    assert dict(writer.db.fetch_roster("c1"))[3] == "Renamed"
+    assert set(statuses(writer.db, D2).values()) == {"Present"}
+
+def test_replay_stops_while_still_offline(writer, journal, link):
+    link.down()
+    writer.mark_all_present("c1", D1)
+    report = writer.replay()
+    assert report.offline and report.applied == 0 and report.remaining == 1
+    assert "database still unreachable" in report.lines()
+
+def test_replay_reports_conflicts(writer, journal, link):
+    grid = writer.attendance("c1", D1)  # loaded online: everyone 'Absent'
+    base = {roll: status for roll, _, status in grid}
+    link.down()
+    writer.save_grid("c1", [(1, "", "Present"), (99, "", "Present")], D1, base)
+    link.up()
+    writer.db.save_attendance_grid("c1", [(1, "", "Late")], D1, diff=True)  # somebody else, meanwhile
+    report = writer.replay()
+    messages = [message for _, _, message in report.conflicts]
+    assert messages == ["roll 1 was changed to 'Late' meanwhile; overwritten with 'Present'",
+                        "roll 99 is not in the class; 'Present' not saved"]
+    assert statuses(writer.db, D1)[1] == "Present"
+    assert [row[2] for row in journal.conflicts()] == messages[::-1]
+
+def test_failed_batch_is_kept_until_retried(writer, journal, link):
+    link.down()
+    writer.mark_all_present("ghost", D1)
+    writer.mark_all_present("c1", D1)
+    link.up()
+    report = writer.replay()
+    assert (report.applied, report.failed, report.remaining) == (1, 1, 0)
+    assert "1 write(s) could not be applied and are kept in the journal" in report.lines()
+    [(entry, error)] = journal.failed()
+    assert entry.class_name == "ghost" and "no longer exists" in error
+    assert writer.replay().applied == 0  # failed writes are left out of later replays
+    writer.db.create_table_for_class("ghost")
+    assert journal.retry_failed("ghost") == 1
+    report = writer.replay()
+    assert (report.applied, report.failed) == (1, 0) and journal.failed_count() == 0
+
+@pytest.mark.parametrize("queued", [False, True], ids=["online", "replayed"])
+def test_student_added_after_mark_all_present_stays_absent(writer, link, queued):
+    if queued:
+        link.down()
+    writer.mark_all_present("c1", D1)
+    writer.add_individual("c1", "New kid", 6)
+    writer.mark_all_present("c1", D2)
+    if queued:
+        expected = {**{roll: "Present" for roll in range(1, 6)}, 6: "Absent"}
+        assert statuses_from(writer.attendance("c1", D1)) == expected  # the offline grid agrees
+        assert statuses_from(writer.attendance("c1", D2))[6] == "Present"
+        link.up()
+        assert writer.replay().applied == 3
+    assert statuses(writer.db, D1) == {**{roll: "Present" for roll in range(1, 6)}, 6: "Absent"}
+    assert statuses(writer.db, D2) == {roll: "Present" for roll in range(1, 7)}
+
+def statuses_from(rows):
+    return {roll: status for roll, _, status in rows}
+
+def test_offline_grid_applies_queued_writes(writer, link):
+    link.down()
+    writer.add_individual("c1", "New kid", 6)
+    writer.custom_marking_absent("c1", [2], D1)
+    rows = writer.attendance("c1", D1)
+    assert rows[-1] == (6, "New kid", "Absent")
+    assert statuses_from(rows)[2] == "Absent"
+    assert (6, "New kid") in writer.roster("c1")
+
+def test_offline_grid_needs_a_cached_roster(klass, journal, link):
+    writer = OfflineWriter(klass, journal)
+    link.down()
+    with pytest.raises(ConnectionError, match="no saved roster"):
+        writer.attendance("c1", D1)
+
+def test_range_marking_is_refused_behind_queued_writes(writer, link):
+    start, end = date(2024, 3, 4), date(2024, 3, 8)
+    link.down()
+    writer.mark_all_present("c1", D1)
+    with pytest.raises(RuntimeError, match="unreachable"):
+        writer.mark_attendance_range("c1", start, end)
+    link.up()
+    writer.offline = False
+    with pytest.raises(RuntimeError, match="offline changes waiting"):
+        writer.mark_attendance_range("c1", start, end)
+    writer.replay()
+    assert len(writer.mark_attendance_range("c1", start, end, {date(2024, 3, 6): [1]})) == 5
+    assert statuses(writer.db, datetime(2024, 3, 6))[1] == "Absent"
+
+def test_without_a_journal_writes_pass_through(klass):
+    writer = OfflineWriter(klass, None)
+    assert writer.mark_all_present("c1", D1) is True
+    assert writer.save_grid("c1", [(1, "", "Absent")], D1) == 1
+    assert writer.pending_count() == 0 and writer.replay().applied == 0
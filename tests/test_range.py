@@ -0,0 +1,82 @@
+from datetime import date, datetime
+
+import pytest
+
+import Main_database as dbmod
+
+START, END = date(2024, 3, 1), date(2024, 3, 12)  # Friday .. Tuesday, one weekend
+
+@pytest.fixture
+def klass(db):
+    db.create_table_for_class("c1")
+    for roll in range(1, 7):
+        db.add_individual("c1", f"S{roll}", roll)
+    return db
+
+def at(day: date) -> datetime:
+    return datetime.combine(day, datetime.min.time())
+
+def statuses(db, day: date):
+    return {roll: status for roll, _, status in db.fetch_attendance("c1", at(day))}
+
+def test_school_days_skip_weekends():
+    days = dbmod.AttendanceDB.school_days(START, END)
+    assert days[:2] == [date(2024, 3, 1), date(2024, 3, 4)]
+    assert len(days) == 8
+    assert len(dbmod.AttendanceDB.school_days(START, END, skip_weekends=False)) == 12
+
+def test_marks_every_day_with_absences(klass):
+    absent = {date(2024, 3, 4): [2, 3], datetime(2024, 3, 5): [6]}
+    days = klass.mark_attendance_range("c1", START, END, absent)
+    assert days == dbmod.AttendanceDB.school_days(START, END)
+    for day in days:
+        missing = set(absent.get(day, absent.get(at(day), [])))
+        assert statuses(klass, day) == {r: "Absent" if r in missing else "Present" for r in range(1, 7)}
+    assert not klass.has_attendance_date("c1", at(date(2024, 3, 2)))
+
+def test_matches_day_by_day_marking(klass, tmp_path):
+    other = dbmod.AttendanceDB.sqlite(str(tmp_path / "other.sqlite3"), storage=klass.storage)
+    try:
+        other.create_table_for_class("c1")
+        for roll in range(1, 7):
+            other.add_individual("c1", f"S{roll}", roll)
+        absent = {date(2024, 3, 6): [1, 4, 99]}
+        klass.mark_attendance_range("c1", START, END, absent)
+        for day in dbmod.AttendanceDB.school_days(START, END):
+            other.mark_all_present("c1", at(day))
+            other.custom_marking_absent("c1", absent.get(day, []), at(day))
+            assert klass.fetch_attendance("c1", at(day)) == other.fetch_attendance("c1", at(day))
+    finally:
+        other.close()
+
+def test_overwrites_existing_statuses(klass):
+    klass.ensure_attendance_date("c1", at(date(2024, 3, 4)))
+    klass.set_attendance("c1", 2, "Late", at(date(2024, 3, 4)))
+    klass.mark_attendance_range("c1", START, END)
+    assert statuses(klass, date(2024, 3, 4))[2] == "Present"
+
+def test_batches_of_rows(klass):
+    klass.BATCH_ROWS = 2
+    klass.mark_attendance_range("c1", START, END, {date(2024, 3, 7): [1, 2, 3, 5]})
+    assert sorted(r for r, s in statuses(klass, date(2024, 3, 7)).items() if s == "Absent") == [1, 2, 3, 5]
+
+def test_keeps_the_summary_current(klass):
+    klass.rebuild_summary()
+    klass.mark_attendance_range("c1", START, END, {date(2024, 3, 4): [1]})
+    incremental = klass.fetch_attendance_summary("c1"), klass.fetch_day_summary("c1")
+    klass.rebuild_summary()
+    assert incremental == (klass.fetch_attendance_summary("c1"), klass.fetch_day_summary("c1"))
+    assert incremental[0][0][2:] == (7, 1)
+
+@pytest.mark.parametrize("start, end, absent, message", [
+    (END, START, None, "Start date must not be after end date"),
+    (START, END, {date(2024, 3, 2): [1]}, "not being marked: 2024-03-02"),
+    (START, END, {date(2024, 4, 1): [1]}, "not being marked: 2024-04-01"),
+], ids=["reversed", "weekend_absence", "absence_outside_range"])
+def test_rejects_bad_input(klass, start, end, absent, message):
+    with pytest.raises(ValueError, match=message):
+        klass.mark_attendance_range("c1", start, end, absent)
+    assert not klass.has_attendance_date("c1", at(date(2024, 3, 4)))
+
+def test_weekend_only_range_marks_nothing(klass):
+    assert klass.mark_attendance_range("c1", date(2024, 3, 2), date(2024, 3, 3)) == []
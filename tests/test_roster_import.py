@@ -0,0 +1,95 @@
+import os
+
+import pytest
+
+import Main_database as dbmod
+from roster_import import parse_roster_row
+
+def write_csv(path, lines):
+    with open(path, "w", encoding="utf-8", newline="") as fh:
+        fh.write("\n".join(lines) + "\n")
+    return str(path)
+
+@pytest.fixture
+def roster(tmp_path):
+    return write_csv(tmp_path / "roster.csv", ["Student_name,Roll_no"] + [f"Student {i},{i}" for i in range(1, 26)])
+
+@pytest.mark.parametrize("row, reason", [
+    (["OnlyName"], "expected at least 2 columns"),
+    (["", "3"], "empty Student_name"),
+    (["A", "x"], "is not an integer"),
+    (["A", "0"], "out of range"),
+    (["A" * 256, "4"], "longer than 255"),
+])
+def test_parse_roster_row_rejects(row, reason):
+    with pytest.raises(ValueError, match=reason):
+        parse_roster_row(row)
+
+def test_parse_roster_row_strips():
+    assert parse_roster_row(["  Ann ", " 7 "]) == ("Ann", 7)
+
+def test_import_in_chunks(db, roster):
+    report = db.import_csv(roster, "c1", chunk_size=10)
+    assert report.header_detected
+    assert (report.rows_read, report.rows_written, report.rejected, report.chunks) == (25, 25, 0, 3)
+    assert db.fetch_roster("c1") == [(i, f"Student {i}") for i in range(1, 26)]
+
+def test_rejects_are_reported_not_fatal(db, tmp_path):
+    path = write_csv(tmp_path / "bad.csv", ["Ann,1", "Bob,zz", ",3", "Cy,4"])
+    report = db.import_csv(path, "c1")
+    assert not report.header_detected
+    assert (report.rows_written, report.rejected) == (2, 2)
+    assert [(line, reason) for line, _, reason in report.rejects] == [
+        (2, "Roll_no 'zz' is not an integer"), (3, "empty Student_name")]
+    assert db.fetch_roster("c1") == [(1, "Ann"), (4, "Cy")]
+
+def test_rejects_to_file(db, tmp_path):
+    path = write_csv(tmp_path / "bad.csv", ["Ann,1", "Bob,zz"])
+    rejects = str(tmp_path / "rejects.csv")
+    report = db.import_csv(path, "c1", reject_path=rejects)
+    assert report.reject_path == rejects
+    with open(rejects, encoding="utf-8") as fh:
+        assert fh.read().splitlines() == ["line,error,row", "2,Roll_no 'zz' is not an integer,Bob,zz"]
+
+def test_strict_raises(db, tmp_path):
+    path = write_csv(tmp_path / "bad.csv", ["Ann,1", "Bob,zz"])
+    with pytest.raises(ValueError, match="CSV line 2"):
+        db.import_csv(path, "c1", strict=True)
+
+def test_reimport_updates_names(db, tmp_path):
+    db.import_csv(write_csv(tmp_path / "a.csv", ["Ann,1", "Bob,2"]), "c1")
+    db.import_csv(write_csv(tmp_path / "b.csv", ["Bobby,2", "Cy,3"]), "c1")
+    assert db.fetch_roster("c1") == [(1, "Ann"), (2, "Bobby"), (3, "Cy")]
+
+def test_cancel_then_resume_from_checkpoint(db, roster, tmp_path):
+    checkpoint = str(tmp_path / "import.ckpt")
+    polls = []
+
+    def cancel_after_first_chunk():
+        polls.append(1)
+        return len(polls) == 1
+
+    with pytest.raises(dbmod.OperationCancelled):
+        db.import_csv(roster, "c1", chunk_size=10, checkpoint_path=checkpoint, cancel=cancel_after_first_chunk)
+    assert os.path.exists(checkpoint)
+    assert len(db.fetch_roster("c1")) == 10
+
+    report = db.import_csv(roster, "c1", chunk_size=10, checkpoint_path=checkpoint)
+    assert report.resumed_from == 10
+    assert (report.rows_read, report.rows_written) == (15, 15)
+    assert db.fetch_roster("c1") == [(i, f"Student {i}") for i in range(1, 26)]
+    assert not os.path.exists(checkpoint)
+
+def test_checkpoint_ignored_for_changed_file(db, roster, tmp_path):
+    checkpoint = str(tmp_path / "import.ckpt")
+    with pytest.raises(dbmod.OperationCancelled):
+        db.import_csv(roster, "c1", chunk_size=10, checkpoint_path=checkpoint, cancel=lambda: True)
+    write_csv(roster, ["Student_name,Roll_no", "Zed,99"])
+    report = db.import_csv(roster, "c1", chunk_size=10, checkpoint_path=checkpoint)
+    assert report.resumed_from == 0 and report.rows_written == 1
+
+def test_progress_reports_rows(db, roster):
+    seen = []
+    db.import_csv(roster, "c1", chunk_size=10, progress=lambda done, total: seen.append((done, total)))
+    assert [done for done, _ in seen] == [10, 20, 25]
+    assert seen[-1] == (25, 25)
@@ -0,0 +1,128 @@
+import hashlib
+
+import pytest
+
+import Main_database as dbmod
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(dbmod.time, "monotonic", clock)
+    return clock
+
+@pytest.fixture
+def auth_db(db):
+    # full-strength PBKDF2 takes a good fraction of a second per hash
+    db.PASSWORD_ITERATIONS = 1000
+    for class_name in ("ca", "cb"):
+        db.create_table_for_class(class_name)
+        db.add_individual(class_name, f"{class_name} student", 1)
+    db.set_class_password("ca", "pw-a")
+    return db
+
+def test_hash_is_salted_pbkdf2(auth_db):
+    stored = auth_db.get_class_password_hash("ca")
+    scheme, iterations, salt, digest = stored.split("$")
+    assert (scheme, iterations, len(salt), len(digest)) == ("pbkdf2_sha256", "1000", 32, 64)
+    assert auth_db._hash_password("pw-a") != auth_db._hash_password("pw-a")
+
+@pytest.mark.parametrize("password, ok", [("pw-a", True), ("pw-b", False), ("", False)])
+def test_verify_password(auth_db, password, ok):
+    assert auth_db._verify_password(password, auth_db.get_class_password_hash("ca")) is ok
+
+def test_verify_rejects_malformed_hash(auth_db):
+    assert not auth_db._verify_password("pw-a", "pbkdf2_sha256$notanumber$00$00")
+
+def test_login_returns_session_and_roster(auth_db):
+    session, roster = auth_db.login("ca", "pw-a")
+    assert (session.class_name, session.admin) == ("ca", False)
+    assert roster == [(1, "ca student")]
+    assert auth_db.check_session(session.token, "ca") is session
+
+@pytest.mark.parametrize("class_name, password, message", [
+    ("ca", "wrong", "incorrect password"),
+    ("cb", "pw-a", "No password set for class 'cb'"),
+    ("nosuch", "pw-a", "not found"),
+    ("nosuch", "admin-pw", "not found"),
+    ("class_passwords", "admin-pw", "not found"),
+    ("bad name", "admin-pw", "Invalid identifier"),
+], ids=["wrong_password", "no_password", "unknown_class", "admin_unknown_class", "admin_system_table",
+        "admin_invalid_name"])
+def test_login_failures(auth_db, class_name, password, message):
+    with pytest.raises(ValueError, match=message):
+        auth_db.login(class_name, password)
+    assert len(auth_db.sessions) == 0
+
+def test_no_password_before_any_is_set(db):
+    db.create_table_for_class("c1")
+    with pytest.raises(ValueError, match="No password set"):
+        db.login("c1", "anything")
+
+def test_admin_session_spans_classes(auth_db):
+    session, roster = auth_db.login("cb", "admin-pw")
+    assert session.admin and roster == [(1, "cb student")]
+    assert auth_db.check_session(session.token, "ca") is session
+
+def test_session_is_scoped_to_its_class(auth_db):
+    session, _ = auth_db.login("ca", "pw-a")
+    with pytest.raises(dbmod.SessionExpired, match="for class 'ca'"):
+        auth_db.check_session(session.token, "cb")
+    assert auth_db.session_roster(session.token, "ca") == [(1, "ca student")]
+
+@pytest.mark.parametrize("token", [None, "", "not-a-token"])
+def test_unknown_tokens_are_rejected(auth_db, token):
+    with pytest.raises(dbmod.SessionExpired):
+        auth_db.check_session(token)
+
+def test_logout_ends_the_session(auth_db):
+    session, _ = auth_db.login("ca", "pw-a")
+    auth_db.logout(session.token)
+    with pytest.raises(dbmod.SessionExpired):
+        auth_db.check_session(session.token)
+
+def test_session_expires_without_checks(auth_db, clock):
+    auth_db.sessions.ttl = 60.0
+    session, _ = auth_db.login("ca", "pw-a")
+    clock.now += 59
+    auth_db.check_session(session.token)  # a check extends the session
+    clock.now += 59
+    auth_db.check_session(session.token)
+    clock.now += 61
+    with pytest.raises(dbmod.SessionExpired, match="expired"):
+        auth_db.check_session(session.token)
+
+def test_expired_sessions_are_swept_on_login(auth_db, clock):
+    auth_db.sessions.ttl = 60.0
+    auth_db.login("ca", "pw-a")
+    clock.now += 61
+    auth_db.login("ca", "pw-a")
+    assert len(auth_db.sessions) == 1
+
+def test_legacy_sha256_hash_is_upgraded(auth_db):
+    with auth_db.session() as cur:
+        cur.execute("UPDATE class_passwords SET password_hash = %s WHERE class_name = %s;",
+                    (hashlib.sha256(b"old-pw").hexdigest(), "ca"))
+    auth_db.login("ca", "old-pw")
+    stored = auth_db.get_class_password_hash("ca")
+    assert stored.startswith("pbkdf2_sha256$1000$")
+    assert auth_db.login("ca", "old-pw")[0].class_name == "ca"
+
+def test_weaker_hash_is_rehashed_at_login(auth_db):
+    auth_db.PASSWORD_ITERATIONS = 2000
+    assert auth_db._needs_rehash(auth_db.get_class_password_hash("ca"))
+    auth_db.login("ca", "pw-a")
+    assert auth_db.get_class_password_hash("ca").startswith("pbkdf2_sha256$2000$")
+
+def test_offline_login_uses_cached_hash(auth_db):
+    stored = auth_db.get_class_password_hash("ca")
+    assert auth_db.login_offline("ca", "pw-a", stored).class_name == "ca"
+    assert auth_db.login_offline("ca", "admin-pw", None).admin
+    with pytest.raises(ValueError, match="incorrect password"):
+        auth_db.login_offline("ca", "pw-a", None)
@@ -0,0 +1,89 @@
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+
+CLASSES = ("c1", "c2")
+DAYS = [datetime(2024, 1, 1) + timedelta(days=i) for i in range(10)]
+
+@pytest.fixture
+def school(db):
+    for class_name in CLASSES:
+        db.create_table_for_class(class_name)
+        for roll in range(1, 11):
+            db.add_individual(class_name, f"S{roll}", roll)
+    return db
+
+def snapshot(db):
+    """Both summary tables as the public readers return them, per class."""
+    return {c: (db.fetch_attendance_summary(c), db.fetch_day_summary(c)) for c in CLASSES}
+
+def assert_matches_rebuild(db):
+    incremental = snapshot(db)
+    db.rebuild_summary()
+    assert incremental == snapshot(db)
+
+def test_requires_a_rebuild_first(school):
+    assert not school.has_summary()
+    with pytest.raises(RuntimeError, match="rebuild_summary"):
+        school.fetch_attendance_summary("c1")
+
+def test_rebuild_counts_existing_history(school):
+    school.mark_all_present("c1", DAYS[0])
+    school.mark_all_present("c1", DAYS[1])
+    school.custom_marking_absent("c1", [2, 3], DAYS[1])
+    assert school.rebuild_summary() == len(CLASSES)
+    summary = {roll: (present, absent) for roll, _, present, absent in school.fetch_attendance_summary("c1")}
+    assert summary[1] == (2, 0) and summary[2] == (1, 1)
+    assert school.fetch_day_summary("c1") == [(DAYS[0].date(), 10, 0), (DAYS[1].date(), 8, 2)]
+
+def test_marking_is_tracked(school):
+    school.rebuild_summary()
+    school.mark_all_present("c1", DAYS[0])
+    school.custom_marking_absent("c1", [4], DAYS[0])
+    school.set_attendance("c1", 5, "Late", DAYS[0])
+    assert school.fetch_day_summary("c1", date(2024, 1, 1), date(2024, 1, 1)) == [(DAYS[0].date(), 8, 2)]
+    assert_matches_rebuild(school)
+
+def test_grid_saves_are_tracked(school):
+    school.rebuild_summary()
+    school.mark_all_present("c2", DAYS[2])
+    school.save_attendance_grid("c2", [(1, "", "Absent"), (2, "Two", "")], DAYS[2])
+    school.save_attendance_grid("c2", [(3, "", "Absent"), (3, "", "Present"), (99, "", "Absent")], DAYS[2], diff=False)
+    assert_matches_rebuild(school)
+
+def test_roster_changes_are_tracked(school, tmp_path):
+    school.rebuild_summary()
+    school.mark_all_present("c1", DAYS[0])
+    school.add_individual("c1", "New", 11)
+    school.delete_data("c1", [1, 2])
+    path = tmp_path / "roster.csv"
+    path.write_text("".join(f"X{i},{i}\n" for i in range(8, 15)), encoding="utf-8")
+    school.import_csv(str(path), "c1", chunk_size=3)
+    school.mark_all_present("c1", DAYS[1])
+    assert_matches_rebuild(school)
+
+def test_random_writes_match_rebuild(school):
+    rng = random.Random(7)
+    school.mark_all_present("c1", DAYS[0])
+    school.rebuild_summary()
+    for _ in range(200):
+        c, dt, op = rng.choice(CLASSES), rng.choice(DAYS), rng.randrange(8)
+        if op == 0:
+            school.mark_all_present(c, dt)
+        elif op == 1:
+            school.custom_marking_absent(c, rng.sample(range(1, 11), 3), dt)
+        elif op == 2 and school.has_attendance_date(c, dt):
+            school.set_attendance(c, rng.randint(1, 10), rng.choice(["Present", "Absent", "Late"]), dt)
+        elif op == 3:
+            school.save_attendance_grid(c, [(r, "", rng.choice(["Present", "Absent"])) for r in rng.sample(range(1, 11), 4)], dt)
+        elif op == 4:
+            school.save_attendance_grid(c, [(r, f"N{r}", rng.choice(["Present", "Absent", ""]))
+                                            for r in rng.sample(range(1, 13), 3)], dt, diff=False)
+        elif op == 5:
+            school.open_school_day(dt)
+        elif op == 6:
+            school.add_individual(c, "New", rng.randint(1, 14))
+        elif op == 7 and rng.random() < 0.2:
+            school.delete_data(c, rng.sample(range(1, 15), 2))
+    assert_matches_rebuild(school)